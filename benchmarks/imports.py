@@ -0,0 +1,53 @@
+"""Measures the time to import mbtpi, and to reach a resource function through it, in fresh interpreters. Fails if
+importing the package takes longer than BUDGET milliseconds or loads any of the HEAVY modules, which are meant to be
+imported only when first needed.
+
+Run from the repository root:  python benchmarks/imports.py [runs]"""
+import os
+import statistics
+import subprocess
+import sys
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# most milliseconds 'import mbtpi' may take, and modules it must not import
+BUDGET = 20
+HEAVY = ("requests", "urllib3", "dotenv", "httpx", "numpy", "sqlite3")
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import mbtpi
+imported = time.perf_counter()
+heavy = ",".join(name for name in %r if name in sys.modules)
+mbtpi.stops
+accessed = time.perf_counter()
+print((imported - start) * 1e3, (accessed - start) * 1e3, heavy)
+""" % (HEAVY,)
+
+
+def measure():
+    """Returns (import ms, first access ms, heavy modules loaded by the import) from a fresh interpreter"""
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join([SOURCE, os.path.join(SOURCE, "mbtpi")]))
+    output = subprocess.run([sys.executable, "-c", SCRIPT], capture_output=True, text=True, env=environment,
+                            check=True).stdout.split()
+    return float(output[0]), float(output[1]), output[2] if len(output) > 2 else ""
+
+
+def main(runs):
+    results = [measure() for _ in range(runs)]
+    imports = statistics.median(result[0] for result in results)
+    accesses = statistics.median(result[1] for result in results)
+    heavy = sorted({name for result in results for name in result[2].split(",") if name})
+
+    print("import mbtpi                 %6.1f ms (median of %d)" % (imports, runs))
+    print("import mbtpi; mbtpi.stops    %6.1f ms" % accesses)
+    print("heavy modules imported       %s" % (", ".join(heavy) or "none"))
+
+    if imports > BUDGET or heavy:
+        print("FAILED: importing mbtpi must take under %d ms and import none of %s" % (BUDGET, ", ".join(HEAVY)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
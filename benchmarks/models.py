@@ -0,0 +1,100 @@
+"""Compares memory and construction time of the slotted models (attribute values extracted into one tuple,
+relationship ids parsed into slots) against eager __dict__ classes built the way the models were before (every
+attribute copied onto the object, links kept). The default rows keep links, as the package does.
+
+Run from the repository root:  python benchmarks/models.py [count]"""
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "mbtpi"))
+
+import model  # noqa: E402
+from schedule import SCHEDULE  # noqa: E402
+from vehicle import VEHICLE  # noqa: E402
+
+
+class EAGER_VEHICLE(object):
+    """Baseline copying every attribute and relationship id into the instance __dict__"""
+
+    def __init__(self, json):
+        self.type = json["type"]
+        self.id = json["id"]
+        self.links = json["links"]
+        for name, relationship in json["relationships"].items():
+            setattr(self, name, relationship["data"]["id"])
+        for name, value in json["attributes"].items():
+            setattr(self, name, value)
+
+
+class EAGER_SCHEDULE(object):
+    """Baseline keeping the raw relationships and copying every attribute into the instance __dict__"""
+
+    def __init__(self, json):
+        self.type = json["type"]
+        self.id = json["id"]
+        self.relationships = json["relationships"]
+        for name, value in json["attributes"].items():
+            setattr(self, name, value)
+
+
+def schedule_resource(i):
+    return {"id": "schedule-%d" % i, "type": "schedule", "links": {"self": "/schedules/schedule-%d" % i},
+            "attributes": {"arrival_time": "2023-06-01T08:%02d:00-04:00" % (i % 60), "departure_time":
+                           "2023-06-01T08:%02d:30-04:00" % (i % 60), "direction_id": i % 2, "drop_off_type": 0,
+                           "pickup_type": 0, "stop_headsign": None, "stop_sequence": i % 40, "timepoint": True},
+            "relationships": {"route": {"data": {"id": "Red", "type": "route"}},
+                              "stop": {"data": {"id": "stop-%d" % (i % 300), "type": "stop"}},
+                              "trip": {"data": {"id": "trip-%d" % (i // 40), "type": "trip"}}}}
+
+
+def vehicle_resource(i):
+    return {"id": "y%d" % i, "type": "vehicle", "links": {"self": "/vehicles/y%d" % i},
+            "attributes": {"bearing": i % 360, "carriages": [], "current_status": "IN_TRANSIT_TO",
+                           "current_stop_sequence": i % 30, "direction_id": i % 2, "label": str(i),
+                           "latitude": 42.35 + i * 1e-5, "longitude": -71.06 - i * 1e-5,
+                           "occupancy_status": None, "speed": None, "updated_at": "2023-06-01T08:00:00-04:00"},
+            "relationships": {"route": {"data": {"id": "Red", "type": "route"}},
+                              "stop": {"data": {"id": "stop-%d" % (i % 300), "type": "stop"}},
+                              "trip": {"data": {"id": "trip-%d" % i, "type": "trip"}}}}
+
+
+def retained(cls, payload):
+    """Bytes still allocated once the response is decoded into cls objects and the response itself is dropped"""
+    gc.collect()
+    tracemalloc.start()
+    objects = [cls(resource) for resource in json.loads(payload)["data"]]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def construction(cls, resources, repeat=5):
+    """Best seconds to build one object per resource"""
+    return min(timeit.repeat(lambda: [cls(resource) for resource in resources], number=1, repeat=repeat))
+
+
+def main(count):
+    for cls, eager, make in [(SCHEDULE, EAGER_SCHEDULE, schedule_resource),
+                             (VEHICLE, EAGER_VEHICLE, vehicle_resource)]:
+        payload = json.dumps({"data": [make(i) for i in range(count)]})
+        resources = json.loads(payload)["data"]
+
+        print("%s x %d" % (cls.__name__, count))
+        rows = [("eager __dict__", eager, True), ("slotted", cls, True), ("slotted, KEEP_LINKS=False", cls, False)]
+        for label, row_cls, keep_links in rows:
+            model.KEEP_LINKS = keep_links
+            size = retained(row_cls, payload)
+            seconds = construction(row_cls, resources)
+            print("  %-28s %8.1f MB  %6.0f B/object  %7.1f ms build" % (label, size / 1e6, size / count,
+                                                                        seconds * 1e3))
+        model.KEEP_LINKS = True
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,427 @@
+"""Benchmark suite replaying recorded MBTA V3 responses from a local stand-in for the API.
+
+Measures, for the package source it is pointed at:
+  - latency and throughput of each endpoint function, end to end from the call to the returned objects
+  - construction time and retained memory per object of each model class, ALERT to VEHICLE
+
+Responses are replayed from benchmarks/recordings/<endpoint>.json.gz, written by the record command from the live
+API. Endpoints without a recording are served a synthetic payload of similar size and shape, generated from a fixed
+seed so that every run and every commit sees the same bytes. The stand-in answers any query on an endpoint with its
+recording, and a request for one id with the first resource of it.
+
+Run from the repository root:
+  python benchmarks/suite.py record                    save live responses (requires MBTA_API_KEY)
+  python benchmarks/suite.py run [--output FILE]       benchmark the working tree
+  python benchmarks/suite.py compare BASE [HEAD]       benchmark two commits and compare, e.g. compare main .
+  python benchmarks/suite.py diff BASE.json HEAD.json  compare two saved results
+
+'.' stands for the working tree. Other revisions are checked out into temporary git worktrees, and each is run in
+its own interpreter. compare and diff exit with status 1 if any measurement regressed by more than THRESHOLD.
+Commits older than MBTA_API_URL support cannot be pointed at the stand-in and only get the model measurements."""
+import argparse
+import gc
+import gzip
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib import import_module
+from threading import Thread
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+RECORDINGS = os.path.join(ROOT, "benchmarks", "recordings")
+LIVE_API = "https://api-v3.mbta.com/"
+
+# endpoint -> query recorded from the live API, and the number of resources synthesized without a recording
+ENDPOINTS = {
+    "alerts": ({}, 150),
+    "facilities": ({}, 1000),
+    "lines": ({}, 120),
+    "predictions": ({"filter[route]": "Red,Orange,Blue"}, 3000),
+    "routes": ({}, 200),
+    "route_patterns": ({}, 600),
+    "schedules": ({"filter[route]": "Red,Orange,Blue"}, 20000),
+    "services": ({"filter[route]": "Red,Orange,Blue"}, 60),
+    "shapes": ({"filter[route]": "Red,Orange,Blue"}, 40),
+    "stops": ({}, 10000),
+    "trips": ({"filter[route]": "Red,Orange,Blue"}, 3000),
+    "vehicles": ({}, 600),
+}
+
+# benchmark name -> (endpoint served, call made through the package)
+CALLS = {
+    "alerts": ("alerts", lambda mbtpi: mbtpi.alerts()),
+    "all_stops": ("stops", lambda mbtpi: mbtpi.all_stops()),
+    "facilities": ("facilities", lambda mbtpi: mbtpi.facilities()),
+    "lines": ("lines", lambda mbtpi: mbtpi.lines()),
+    "predictions": ("predictions", lambda mbtpi: mbtpi.predictions(route="Red,Orange,Blue")),
+    "routes": ("routes", lambda mbtpi: mbtpi.routes()),
+    "route_patterns": ("route_patterns", lambda mbtpi: mbtpi.route_patterns()),
+    "schedules": ("schedules", lambda mbtpi: mbtpi.schedules(route="Red,Orange,Blue")),
+    "services": ("services", lambda mbtpi: mbtpi.services(route="Red,Orange,Blue")),
+    "shapes": ("shapes", lambda mbtpi: mbtpi.shapes(route="Red,Orange,Blue")),
+    "stop_by_id": ("stops", lambda mbtpi: mbtpi.stop_by_id("place-pktrm")),
+    "trips": ("trips", lambda mbtpi: mbtpi.trips(route="Red,Orange,Blue")),
+    "vehicles": ("vehicles", lambda mbtpi: mbtpi.vehicles()),
+}
+
+# model class -> (module defining it, endpoint whose resources it is built from)
+MODELS = {
+    "ALERT": ("alert", "alerts"),
+    "FACILITY": ("facility", "facilities"),
+    "LINE": ("line", "lines"),
+    "PREDICTION": ("prediction", "predictions"),
+    "ROUTE": ("route", "routes"),
+    "ROUTE_PATTERN": ("routepattern", "route_patterns"),
+    "SCHEDULE": ("schedule", "schedules"),
+    "SERVICE": ("service", "services"),
+    "SHAPE": ("shape", "shapes"),
+    "STOP": ("stop", "stops"),
+    "TRIP": ("trip", "trips"),
+    "VEHICLE": ("vehicle", "vehicles"),
+}
+
+# seconds spent calling each endpoint function, and fewest calls made however long they take
+SECONDS = 2
+MIN_CALLS = 5
+
+# status codes older trees read from the environment instead of defining them
+STATUS_CODES = {"OK": 200, "NOT_MODIFIED": 304, "BAD_REQUEST": 400, "FORBIDDEN": 403, "NOT_FOUND": 404,
+                "NOT_ACCEPTABLE": 406, "TOO_MANY_REQUESTS": 429}
+
+# fraction a measurement may worsen by before compare reports it as a regression
+THRESHOLD = 0.10
+
+
+def one(kind, item):
+    return {"data": {"id": item, "type": kind}}
+
+
+def encode_polyline(points):
+    """Encodes [latitude, longitude] points as a Google encoded polyline"""
+    output = []
+    previous = (0, 0)
+    for point in points:
+        current = (round(point[0] * 1e5), round(point[1] * 1e5))
+        for delta in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        previous = current
+    return "".join(output)
+
+
+def synthetic_resource(endpoint, i, rng):
+    """Returns resource i of a synthetic response from an endpoint, shaped like the live API's"""
+    minute = "2024-06-03T%02d:%02d:00-04:00" % (5 + i // 60 % 19, i % 60)
+    stop, trip, route = "stop-%d" % (i % 800), "trip-%d" % (i // 25), ("Red", "Orange", "Blue")[i % 3]
+    latitude, longitude = 42.2 + rng.random() * 0.3, -71.2 + rng.random() * 0.3
+    attributes, relationships = {}, {}
+
+    if endpoint == "alerts":
+        attributes = {"active_period": [{"start": minute, "end": None}], "banner": None, "cause": "MAINTENANCE",
+                      "created_at": minute, "description": "Shuttle buses replace service. " * 8, "effect": "SHUTTLE",
+                      "header": "Shuttle buses replace %s Line service between stops" % route,
+                      "informed_entity": [{"activities": ["BOARD", "EXIT"], "route": route, "route_type": 1,
+                                           "stop": "stop-%d" % (i + k)} for k in range(6)],
+                      "lifecycle": "ONGOING", "service_effect": "%s Line shuttle" % route, "severity": 7,
+                      "short_header": "Shuttle buses replace service", "timeframe": "ongoing", "updated_at": minute,
+                      "url": "https://www.mbta.com/alerts"}
+    elif endpoint == "facilities":
+        attributes = {"latitude": latitude, "long_name": "Elevator %d" % i, "longitude": longitude,
+                      "properties": [{"name": "enclosed", "value": 1}, {"name": "excludes-stop", "value": i}],
+                      "short_name": "Elevator", "type": "ELEVATOR"}
+        relationships = {"stop": one("stop", stop)}
+    elif endpoint == "lines":
+        attributes = {"color": "DA291C", "long_name": "Line %d" % i, "short_name": str(i), "sort_order": i,
+                      "text_color": "FFFFFF"}
+    elif endpoint == "predictions":
+        attributes = {"arrival_time": minute, "departure_time": minute, "direction_id": i % 2,
+                      "schedule_relationship": None, "status": None, "stop_sequence": i % 25 * 10}
+        relationships = {"route": one("route", route), "stop": one("stop", stop), "trip": one("trip", trip),
+                         "vehicle": one("vehicle", "y%d" % (i // 25))}
+    elif endpoint == "routes":
+        attributes = {"color": "DA291C", "description": "Rapid Transit", "direction_destinations": ["South", "North"],
+                      "direction_names": ["South", "North"], "fare_class": "Rapid Transit", "long_name": "Route %d" % i,
+                      "short_name": str(i), "sort_order": i, "text_color": "FFFFFF", "type": i % 4}
+        relationships = {"line": one("line", "line-%d" % i)}
+    elif endpoint == "route_patterns":
+        attributes = {"canonical": i % 4 == 0, "direction_id": i % 2, "name": "Pattern %d" % i, "sort_order": i,
+                      "time_desc": None, "typicality": 1}
+        relationships = {"representative_trip": one("trip", trip), "route": one("route", route)}
+    elif endpoint == "schedules":
+        attributes = {"arrival_time": minute, "departure_time": minute, "direction_id": i % 2, "drop_off_type": 0,
+                      "pickup_type": 0, "stop_headsign": None, "stop_sequence": i % 25 * 10, "timepoint": False}
+        relationships = {"route": one("route", route), "stop": one("stop", stop), "trip": one("trip", trip)}
+    elif endpoint == "services":
+        days = ["2024-%02d-%02d" % (1 + k % 12, 1 + k % 28) for k in range(20)]
+        attributes = {"added_dates": days, "added_dates_notes": [None] * 20, "description": "Weekday schedule",
+                      "end_date": "2024-08-23", "rating_description": "Summer", "rating_end_date": "2024-08-23",
+                      "rating_start_date": "2024-06-02", "removed_dates": days, "removed_dates_notes": [None] * 20,
+                      "schedule_name": "Weekday", "schedule_type": "Weekday", "schedule_typicality": 1,
+                      "start_date": "2024-06-03", "valid_days": [1, 2, 3, 4, 5]}
+    elif endpoint == "shapes":
+        points = [(latitude + k * 1e-4 * rng.random(), longitude + k * 1e-4 * rng.random()) for k in range(800)]
+        attributes = {"polyline": encode_polyline(points)}
+    elif endpoint == "stops":
+        attributes = {"address": None, "at_street": None, "description": "Stop %d - Platform" % i,
+                      "latitude": latitude, "location_type": i % 2, "longitude": longitude,
+                      "municipality": "Boston", "name": "Stop %d" % i, "on_street": None, "platform_code": None,
+                      "platform_name": "Platform", "vehicle_type": 1, "wheelchair_boarding": 1}
+        relationships = {"parent_station": one("stop", "place-%d" % (i // 4))}
+    elif endpoint == "trips":
+        attributes = {"bikes_allowed": 1, "block_id": "B%d" % (i // 10), "direction_id": i % 2,
+                      "headsign": "Terminal %d" % (i % 7), "name": "", "wheelchair_accessible": 1}
+        relationships = {"route": one("route", route), "route_pattern": one("route_pattern", "%s-1-0" % route),
+                         "service": one("service", "service-%d" % (i % 60)),
+                         "shape": one("shape", "shape-%d" % (i % 40))}
+    elif endpoint == "vehicles":
+        attributes = {"bearing": i % 360, "carriages": [], "current_status": "IN_TRANSIT_TO",
+                      "current_stop_sequence": i % 25 * 10, "direction_id": i % 2, "label": str(1000 + i),
+                      "latitude": latitude, "longitude": longitude, "occupancy_status": None, "speed": None,
+                      "updated_at": minute}
+        relationships = {"route": one("route", route), "stop": one("stop", stop), "trip": one("trip", trip)}
+
+    kind = endpoint[:-1] if endpoint != "facilities" else "facility"
+    resource = {"attributes": attributes, "id": "%s-%d" % (kind, i), "type": kind,
+                "links": {"self": "/%s/%s-%d" % (endpoint, kind, i)}}
+    if endpoint == "stops" and i == 0:
+        resource["id"] = "place-pktrm"
+    if relationships:
+        resource["relationships"] = relationships
+    return resource
+
+
+def payload(endpoint) -> bytes:
+    """Returns the recorded response of an endpoint, or a synthetic one if it hasn't been recorded"""
+    path = os.path.join(RECORDINGS, endpoint + ".json.gz")
+    if os.path.exists(path):
+        with gzip.open(path, "rb") as file:
+            return file.read()
+    rng = random.Random(endpoint)
+    count = ENDPOINTS[endpoint][1]
+    return json.dumps({"data": [synthetic_resource(endpoint, i, rng) for i in range(count)],
+                       "jsonapi": {"version": "1.0"}}).encode()
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers requests for an endpoint with its payload, and requests for one id with its first resource"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    bodies = {}
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        body = self.bodies.get(parts[0] + "/{id}" if len(parts) > 1 else parts[0])
+        if body is None:
+            self.reply(404, json.dumps({"errors": [{"status": "404", "code": "not_found"}]}).encode())
+            return
+        self.reply(200, body)
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve() -> str:
+    """Starts the stand-in on a free port in a daemon thread, and returns its URL"""
+    StandIn.bodies = {endpoint: payload(endpoint) for endpoint in ENDPOINTS}
+    for endpoint in ENDPOINTS:
+        first = json.loads(StandIn.bodies[endpoint])["data"][0]
+        StandIn.bodies[endpoint + "/{id}"] = json.dumps({"data": first, "jsonapi": {"version": "1.0"}}).encode()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return "http://127.0.0.1:%d/" % server.server_port
+
+
+def measure_call(function) -> dict:
+    """Calls function repeatedly for SECONDS seconds (at least MIN_CALLS times) after a warm-up call, and returns
+    the latency distribution in milliseconds and the calls per second"""
+    function()
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < MIN_CALLS or time.perf_counter() - start < SECONDS:
+        called = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - called)
+    latencies.sort()
+    return {"calls": len(latencies), "mean_ms": statistics.fmean(latencies) * 1e3,
+            "p50_ms": latencies[len(latencies) // 2] * 1e3,
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1e3,
+            "per_second": len(latencies) / sum(latencies)}
+
+
+def measure_model(cls, body) -> dict:
+    """Returns the microseconds to build an object of cls, and the bytes retained per object once the decoded
+    response is dropped"""
+    resources = json.loads(body)["data"]
+    count = len(resources)
+    seconds = min(timeit.repeat(lambda: [cls(resource) for resource in resources], number=1, repeat=5))
+    del resources
+
+    gc.collect()
+    tracemalloc.start()
+    objects = [cls(resource) for resource in json.loads(body)["data"]]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return {"count": count, "build_us": seconds / count * 1e6, "bytes_per_object": size / count}
+
+
+def run(source) -> dict:
+    """Benchmarks the package in source (the directory holding mbtpi) against the stand-in"""
+    for name in ("MBTA_CACHE_PATH", "MBTA_MEMORY_CACHE_SIZE"):
+        os.environ.pop(name, None)
+    for name, value in STATUS_CODES.items():
+        os.environ.setdefault(name, str(value))
+    url = os.environ["MBTA_API_URL"] = serve()
+    sys.path[:0] = [source, os.path.join(source, "mbtpi")]
+    mbtpi = import_module("mbtpi")
+    results = {"python": sys.version.split()[0], "endpoints": {}, "models": {}, "errors": {}}
+
+    if import_module("urls").urls.stop_url().startswith(url):
+        for name, (endpoint, call) in CALLS.items():
+            print("  %-16s" % name, end="", flush=True)
+            try:
+                result = measure_call(lambda: call(mbtpi))
+            except Exception as error:
+                results["errors"][name] = repr(error)
+                print(" failed: %r" % error)
+                continue
+            result["bytes"] = len(StandIn.bodies[endpoint])
+            results["endpoints"][name] = result
+            print(" %8.2f ms p50 %8.2f ms p95 %8.1f calls/s" % (result["p50_ms"], result["p95_ms"],
+                                                                 result["per_second"]))
+    else:
+        results["errors"]["endpoints"] = "base URL can't be set with MBTA_API_URL"
+        print("  endpoints skipped: the base URL can't be set with MBTA_API_URL")
+
+    for name, (module, endpoint) in MODELS.items():
+        print("  %-16s" % name, end="", flush=True)
+        try:
+            result = measure_model(getattr(import_module(module), name), StandIn.bodies[endpoint])
+        except Exception as error:
+            results["errors"][name] = repr(error)
+            print(" failed: %r" % error)
+            continue
+        results["models"][name] = result
+        print(" %8.2f us/object %8.0f B/object" % (result["build_us"], result["bytes_per_object"]))
+    return results
+
+
+def record():
+    """Saves the live response of every endpoint into RECORDINGS"""
+    import requests
+    sys.path.insert(0, os.path.join(ROOT, "src", "mbtpi"))
+    from urls import api_key
+
+    os.makedirs(RECORDINGS, exist_ok=True)
+    for endpoint, (params, _) in ENDPOINTS.items():
+        response = requests.get(LIVE_API + endpoint + "/", params=params, headers={"x-api-key": api_key()},
+                                timeout=60)
+        response.raise_for_status()
+        with gzip.open(os.path.join(RECORDINGS, endpoint + ".json.gz"), "wb") as file:
+            file.write(response.content)
+        print("  %-16s %6d resources %8.1f MB" % (endpoint, len(response.json()["data"]), len(response.content) / 1e6))
+
+
+def run_revision(revision) -> dict:
+    """Benchmarks a git revision, or the working tree for '.', in a fresh interpreter and returns its results"""
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "results.json")
+        tree = ROOT
+        if revision != ".":
+            tree = os.path.join(directory, "tree")
+            subprocess.run(["git", "-C", ROOT, "worktree", "add", "--detach", "--quiet", tree, revision], check=True)
+        try:
+            print("%s:" % revision)
+            subprocess.run([sys.executable, os.path.abspath(__file__), "run", "--source", os.path.join(tree, "src"),
+                            "--output", output], check=True)
+        finally:
+            if revision != ".":
+                subprocess.run(["git", "-C", ROOT, "worktree", "remove", "--force", tree], check=True)
+        with open(output) as file:
+            return json.load(file)
+
+
+def compare(base, head) -> bool:
+    """Prints the change of every measurement from base to head, and returns whether any regressed by more than
+    THRESHOLD"""
+    regressed = False
+    # section -> metric compared, and whether larger values are better
+    metrics = {"endpoints": ("p50_ms", False), "models": ("build_us", False)}
+    rows = [(section, name, metric, higher) for section, (metric, higher) in metrics.items()
+            for name in head.get(section, {}) if name in base.get(section, {})]
+    rows += [("models", name, "bytes_per_object", False) for name in head.get("models", {})
+             if name in base.get("models", {})]
+
+    print("%-10s %-16s %-17s %12s %12s %8s" % ("", "", "", base.get("commit", "base")[:12],
+                                               head.get("commit", "head")[:12], "change"))
+    for section, name, metric, higher in rows:
+        before, after = base[section][name][metric], head[section][name][metric]
+        change = (after - before) / before if before else 0.0
+        worse = change < -THRESHOLD if higher else change > THRESHOLD
+        regressed = regressed or worse
+        print("%-10s %-16s %-17s %12.2f %12.2f %+7.1f%%%s" % (section, name, metric, before, after, change * 100,
+                                                             "  REGRESSED" if worse else ""))
+    return regressed
+
+
+def commit(source) -> str:
+    """Returns the commit checked out in the tree holding source, marked dirty if it has uncommitted changes"""
+    head = subprocess.run(["git", "-C", source, "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    dirty = subprocess.run(["git", "-C", source, "status", "--porcelain", "--", "."], capture_output=True,
+                           text=True).stdout.strip()
+    return head + ("-dirty" if dirty else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("record")
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--source", default=os.path.join(ROOT, "src"))
+    run_parser.add_argument("--output")
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head", nargs="?", default=".")
+    diff_parser = commands.add_parser("diff")
+    diff_parser.add_argument("base")
+    diff_parser.add_argument("head")
+    arguments = parser.parse_args()
+
+    if arguments.command == "record":
+        record()
+    elif arguments.command == "run":
+        results = run(os.path.abspath(arguments.source))
+        results["commit"] = commit(arguments.source)
+        if arguments.output:
+            with open(arguments.output, "w") as file:
+                json.dump(results, file, indent=1)
+    elif arguments.command == "compare":
+        base = run_revision(arguments.base)
+        head = run_revision(arguments.head)
+        sys.exit(1 if compare(base, head) else 0)
+    else:
+        with open(arguments.base) as base, open(arguments.head) as head:
+            sys.exit(1 if compare(json.load(base), json.load(head)) else 0)
+
+
+if __name__ == "__main__":
+    main()
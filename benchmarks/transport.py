@@ -0,0 +1,123 @@
+"""Compares request throughput and connections opened for the default requests session, the configured connection
+pool, and the httpx transport, against a local stand-in for the API that serves a recorded-size vehicles response.
+
+The stand-in speaks plain HTTP/1.1, so the httpx row uses the httpx client over HTTP/1.1 and needs only httpx. HTTP/2
+multiplexing needs the TLS endpoint of the real API: with --live the row uses HTTP/2, which requires MBTA_API_KEY and
+'pip install httpx[http2]'.
+
+Run from the repository root:  python benchmarks/transport.py [requests] [threads] [--live]"""
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "mbtpi"))
+
+# seconds the stand-in takes to answer, roughly the API's server time
+LATENCY = 0.005
+
+
+def vehicles_payload(count=500):
+    return json.dumps({"data": [{"id": "y%d" % i, "type": "vehicle", "links": {"self": "/vehicles/y%d" % i},
+                                 "attributes": {"bearing": i % 360, "current_status": "IN_TRANSIT_TO",
+                                                "label": str(i), "latitude": 42.35, "longitude": -71.06,
+                                                "updated_at": "2023-06-01T08:00:00-04:00"},
+                                 "relationships": {"route": {"data": {"id": "Red", "type": "route"}}}}
+                                for i in range(count)]}).encode()
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers every GET with the vehicles payload, gzip compressed if asked, and counts connections and bytes"""
+    protocol_version = "HTTP/1.1"
+    payload = vehicles_payload()
+    compressed = gzip.compress(payload)
+    lock = Lock()
+    connections = 0
+    sent = 0
+
+    def setup(self):
+        super().setup()
+        with StandIn.lock:
+            StandIn.connections += 1
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        body = self.payload
+        self.send_response(200)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = self.compressed
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", "application/vnd.api+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with StandIn.lock:
+            StandIn.sent += len(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label, count, threads, setup):
+    """Makes count distinct requests from threads threads through universals.get after calling setup()"""
+    import universals
+    import urls
+    setup()
+    StandIn.connections = StandIn.sent = 0
+    url = urls.urls.vehicle_url()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda i: universals.get(url, universals.set_params(label=str(i))), range(count)))
+    seconds = time.perf_counter() - start
+
+    print("  %-34s %7.0f req/s  %4d connections  %6.1f MB received" % (label, count / seconds,
+                                                                        StandIn.connections, StandIn.sent / 1e6))
+
+
+def main(count, threads, live):
+    if not live:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["MBTA_API_URL"] = "http://127.0.0.1:%d/" % server.server_port
+
+    import urls
+    from requests.adapters import HTTPAdapter
+
+    def default_session():
+        urls.configure()
+        # the adapter requests.Session mounts by default: 10 pooled connections, no timeout
+        urls.session.mount("http://", HTTPAdapter())
+        urls.session.mount("https://", HTTPAdapter())
+
+    def httpx_client():
+        if live:
+            urls.configure(pool_size=threads, http2=True)
+            return
+        # configure() only builds the httpx client for HTTP/2, which the stand-in doesn't speak
+        import httpx
+        urls.configure(pool_size=threads)
+        connect_timeout, read_timeout = urls.transport["timeout"]
+        limits = httpx.Limits(max_connections=threads, max_keepalive_connections=threads)
+        urls.transport["http2"] = httpx.Client(limits=limits, headers=urls.transport["headers"],
+                                               timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+
+    print("%d requests from %d threads%s" % (count, threads, " against the live API" if live else ""))
+    run("requests, default pool (10)", count, threads, default_session)
+    run("requests, pool %d" % threads, count, threads, lambda: urls.configure(pool_size=threads))
+    run("requests, pool %d, no gzip" % threads, count, threads, lambda: urls.configure(pool_size=threads, gzip=False))
+    try:
+        run("httpx, pool %d, %s" % (threads, "HTTP/2" if live else "HTTP/1.1"), count, threads, httpx_client)
+    except ImportError as error:
+        print("  httpx skipped: %s" % error)
+    urls.configure()
+
+
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if argument != "--live"]
+    main(int(arguments[0]) if arguments else 2000, int(arguments[1]) if len(arguments) > 1 else 32,
+         "--live" in sys.argv)
@@ -1,13 +1,48 @@
-from alert import ALERT, alerts, alert_by_id, all_alerts
-from facility import FACILITY, facilities, facility_by_id, all_facilities
-from line import LINE, lines, line_by_id, all_lines
-from livefacility import LIVE_FACILITY, live_facilities, live_facility_by_id
-from prediction import PREDICTION, predictions
-from route import ROUTE, routes, route_by_id, all_routes
-from routepattern import ROUTE_PATTERN, route_patterns, route_pattern_by_id, all_route_patterns
-from schedule import SCHEDULE, schedules
-from service import SERVICE, services, service_by_id
-from shape import SHAPE, shapes, shape_by_id
-from stop import STOP, stops, stop_by_id, all_stops
-from trip import TRIP, trips, trip_by_id
-from vehicle import VEHICLE, vehicles, vehicle_by_id, all_vehicles
+from importlib import import_module
+
+# module -> public names it defines. A module is imported the first time one of its names is accessed (PEP 562), so
+# importing the package loads nothing else
+EXPORTS = {
+    "alert": ("ALERT", "alerts", "alert_by_id", "alerts_by_ids", "all_alerts", "stream_alerts"),
+    "bulk": ("Found", "clear_objects"),
+    "coalesce": ("Coalescer", "AsyncCoalescer", "coalesced_predictions", "coalesced_schedules", "coalesced_alerts"),
+    "departures": ("Departure", "DepartureBoard", "departures"),
+    "facility": ("FACILITY", "facilities", "facility_by_id", "all_facilities"),
+    "geometry": ("decode_polylines", "decode_shapes", "cumulative_distance", "snap"),
+    "line": ("LINE", "lines", "line_by_id", "lines_by_ids", "all_lines"),
+    "livefacility": ("LIVE_FACILITY", "live_facilities", "live_facility_by_id", "live_facilities_by_ids"),
+    "prediction": ("PREDICTION", "predictions", "stream_predictions"),
+    "route": ("ROUTE", "routes", "route_by_id", "routes_by_ids", "all_routes"),
+    "routepattern": ("ROUTE_PATTERN", "route_patterns", "route_pattern_by_id", "route_patterns_by_ids",
+                     "all_route_patterns"),
+    "schedule": ("SCHEDULE", "schedules"),
+    "service": ("SERVICE", "services", "service_by_id", "services_by_ids"),
+    "shape": ("SHAPE", "shapes", "shape_by_id"),
+    "spatial": ("SpatialIndex", "stop_index", "facility_index"),
+    "stop": ("STOP", "stops", "stop_by_id", "stops_by_ids", "all_stops"),
+    "stream": ("Stream",),
+    "timetable": ("ScheduleIndex", "schedule_index"),
+    "tracker": ("VehicleTracker", "Delta"),
+    "trip": ("TRIP", "trips", "trip_by_id", "trips_by_ids"),
+    "vehicle": ("VEHICLE", "vehicles", "vehicle_by_id", "vehicles_by_ids", "all_vehicles", "stream_vehicles"),
+}
+
+# public name -> module defining it
+MODULES = {name: module for module, names in EXPORTS.items() for name in names}
+
+__all__ = list(MODULES)
+
+
+def __getattr__(name):
+    """Imports the module defining a public name on first access, and keeps the value for later accesses"""
+    module = MODULES.get(name)
+    if module is None:
+        raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """Lists the public names along with the attributes already loaded"""
+    return sorted(set(globals()) | set(MODULES))
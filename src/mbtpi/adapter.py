@@ -0,0 +1,14 @@
+from requests.adapters import HTTPAdapter
+
+
+class TimeoutAdapter(HTTPAdapter):
+    """HTTPAdapter applying a default (connect, read) timeout to requests made without one"""
+
+    def __init__(self, timeout: tuple, **kwargs):
+        """Stores the default timeout. Other arguments are passed to HTTPAdapter"""
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        """Sends the request with the default timeout unless it was given one"""
+        return super().send(request, timeout=timeout if timeout is not None else self.timeout, **kwargs)
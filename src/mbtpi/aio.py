@@ -0,0 +1,362 @@
+from urls import urls, settings
+from ratelimit import limiter, backoff, retry_deadline, can_retry
+from universals import (set_params, build_objects, build_object, resource_types, PendingRequest, TOO_MANY_REQUESTS,
+                        DEFAULT_PAGE_LIMIT, next_page)
+from columns import to_columns
+from alert import ALERT
+from facility import FACILITY
+from line import LINE
+from livefacility import LIVE_FACILITY
+from prediction import PREDICTION
+from route import ROUTE
+from routepattern import ROUTE_PATTERN
+from schedule import SCHEDULE
+from service import SERVICE
+from shape import SHAPE
+from stop import STOP
+from trip import TRIP
+from vehicle import VEHICLE
+import asyncio
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# most requests in flight at once, and most connections kept open to the API
+MAX_CONCURRENCY = 64
+MAX_CONNECTIONS = 100
+
+# the client and semaphore are bound to the event loop that created them, as are the requests in flight:
+# request key -> [task, number of callers awaiting it]
+_state = {"loop": None, "client": None, "semaphore": None, "in_flight": {}}
+
+
+def client():
+    """Returns the httpx.AsyncClient shared by every request made from the running event loop, creating it (and the
+    semaphore capping concurrent requests) on first use"""
+    if httpx is None:
+        raise ImportError("mbtpi.aio requires httpx. Install it with 'pip install httpx'.")
+
+    loop = asyncio.get_running_loop()
+    if _state["loop"] is not loop:
+        transport = settings()
+        keep_alive = MAX_CONNECTIONS if transport["keep_alive"] else 0
+        limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=keep_alive)
+        connect_timeout, read_timeout = transport["timeout"]
+        _state["loop"] = loop
+        _state["client"] = httpx.AsyncClient(limits=limits, headers=transport["headers"],
+                                             timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                                             http2=transport["http2"] is not None)
+        _state["semaphore"] = asyncio.Semaphore(MAX_CONCURRENCY)
+        _state["in_flight"] = {}
+    return _state["client"]
+
+
+async def aclose():
+    """Closes the shared client and its connection pool"""
+    if _state["client"] is not None:
+        await _state["client"].aclose()
+    _state.update(loop=None, client=None, semaphore=None, in_flight={})
+
+
+async def get(path, params=None):
+    """Async version of universals.get. Makes a request to the given path with the given params over the shared
+    client. Returns response in a JSON format if request is valid. Otherwise, raises an error.
+
+    Shares the response caches, rate limiter and 429 retries of the threaded path. Identical requests made by several
+    tasks at once are sent once, and every task gets its JSON or its error. A cancelled task stops waiting without
+    cancelling the request for the others; the request is cancelled once no task is waiting for it."""
+    request = PendingRequest(path, params)
+    if request.result is not None:
+        return request.result
+
+    client()
+    in_flight = _state["in_flight"]
+    key = request.key
+    entry = in_flight.get(key)
+    if entry is None:
+        task = asyncio.ensure_future(send(request))
+        entry = in_flight[key] = [task, 0]
+        task.add_done_callback(lambda _: in_flight.pop(key, None) if in_flight.get(key) is entry else None)
+
+    entry[1] += 1
+    try:
+        return await asyncio.shield(entry[0])
+    except asyncio.CancelledError:
+        if not entry[0].done():
+            entry[1] -= 1
+            if entry[1] == 0:
+                entry[0].cancel()
+        raise
+
+
+async def send(request):
+    """Makes the request of get(), without sharing it with other tasks"""
+    http = client()
+    deadline = retry_deadline()
+    attempt = 0
+    while True:
+        wait = limiter.delay()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        async with _state["semaphore"]:
+            sent = request.sending(attempt)
+            response = await http.get(request.path, params=request.params, headers=request.headers())
+            request.received(response, sent)
+        limiter.update(response.headers)
+
+        if response.status_code != TOO_MANY_REQUESTS:
+            break
+        wait = backoff(attempt, response.headers)
+        if not can_retry(deadline, wait):
+            break
+        request.retrying(wait, attempt)
+        await asyncio.sleep(wait)
+        attempt += 1
+
+    return request.finish(response)
+
+
+def require_filter(params, names, message):
+    """Raises a ValueError with the message if none of the named params are given"""
+    if all(params.get(name) is None for name in names):
+        raise ValueError(message)
+
+
+async def iterate_responses(path, params):
+    """Async version of universals.iterate_responses. Yields the JSON of every page of results, requesting the next
+    page while the current one is consumed."""
+    if "page[limit]" not in params:
+        params = dict(params)
+        params["page[limit]"] = DEFAULT_PAGE_LIMIT
+
+    page = asyncio.ensure_future(get(path, params))
+    try:
+        while page is not None:
+            json_response = await page
+            next_url = json_response.get("links", {}).get("next")
+            page = asyncio.ensure_future(get(*next_page(next_url, params))) if next_url else None
+
+            yield json_response
+    finally:
+        if page is not None:
+            page.cancel()
+
+
+async def iterate_pages(path, params):
+    """Async version of universals.iterate_pages. Yields each resource of every page of results."""
+    async for json_response in iterate_responses(path, params):
+        for resource in json_response["data"]:
+            yield resource
+
+
+async def build_pages(path, params, cls):
+    """Async version of universals.build_pages. Yields a cls object for each resource of every page of results, with
+    relationships to the 'included' resources of its page resolved to objects."""
+    async for json_response in iterate_responses(path, params):
+        for obj in build_objects(json_response, cls):
+            yield obj
+
+
+async def list_request(path, cls, params, json):
+    """Requests a list endpoint and returns its JSON, or the cls objects built from it.
+
+    Handles the options of the threaded list functions: only= requests just the named fields, format="columns" returns
+    a dict of NumPy arrays, and paginate=True returns an async iterator over every page of results (or, with
+    format="columns", the arrays of every page)."""
+    params = dict(params)
+    only = params.pop("only", None)
+    result_format = params.pop("format", None)
+    paginate = params.pop("paginate", False)
+    resource_type = next(name for name, value in resource_types.items() if value is cls)
+    if only is not None:
+        params["fields_" + resource_type] = cls.fields(only)
+        params["include"] = None
+
+    if paginate:
+        params = set_params(**params)
+        if result_format == "columns":
+            return to_columns([resource async for resource in iterate_pages(path, params)], resource_type)
+        elif json:
+            return iterate_pages(path, params)
+        return build_pages(path, params, cls)
+
+    json_response = await get(path, set_params(**params))
+    if result_format == "columns":
+        return to_columns(json_response["data"], resource_type)
+    return json_response if json else build_objects(json_response, cls)
+
+
+async def id_request(path, cls, params, json):
+    """Requests a single resource and returns its JSON, or the cls object built from it"""
+    json_response = await get(path, set_params(**params))
+    return json_response if json else build_object(json_response, cls)
+
+
+async def alerts(json: bool = False, **params):
+    """Async version of alert.alerts. Accepts the same parameters."""
+    return await list_request(urls.alert_url(), ALERT, params, json)
+
+
+async def alert_by_id(alert_id: int, json: bool = False, **params):
+    """Async version of alert.alert_by_id. Accepts the same parameters."""
+    return await id_request(urls.alert_by_id_url(alert_id), ALERT, params, json)
+
+
+async def all_alerts(json: bool = False):
+    """Async version of alert.all_alerts"""
+    return await alerts(json=json)
+
+
+async def facilities(json: bool = False, **params):
+    """Async version of facility.facilities. Accepts the same parameters."""
+    return await list_request(urls.facility_url(), FACILITY, params, json)
+
+
+async def facility_by_id(facility_id: str, json: bool = False, **params):
+    """Async version of facility.facility_by_id. Accepts the same parameters."""
+    return await id_request(urls.facility_by_id_url(facility_id), FACILITY, params, json)
+
+
+async def all_facilities(json: bool = False):
+    """Async version of facility.all_facilities"""
+    return await facilities(json=json)
+
+
+async def lines(json: bool = False, **params):
+    """Async version of line.lines. Accepts the same parameters."""
+    return await list_request(urls.line_url(), LINE, params, json)
+
+
+async def line_by_id(line_id: str, json: bool = False, **params):
+    """Async version of line.line_by_id. Accepts the same parameters."""
+    return await id_request(urls.line_by_id_url(line_id), LINE, params, json)
+
+
+async def all_lines(json: bool = False):
+    """Async version of line.all_lines"""
+    return await lines(json=json)
+
+
+async def live_facilities(filter_id: list[str] | str, json: bool = False, **params):
+    """Async version of livefacility.live_facilities. Accepts the same parameters."""
+    return await list_request(urls.live_facility_url(), LIVE_FACILITY, dict(params, filter_id=filter_id), json)
+
+
+async def live_facility_by_id(facility_id: str, json: bool = False, **params):
+    """Async version of livefacility.live_facility_by_id. Accepts the same parameters."""
+    return await id_request(urls.live_facility_by_id_url(facility_id), LIVE_FACILITY, params, json)
+
+
+async def predictions(json: bool = False, **params):
+    """Async version of prediction.predictions. Accepts the same parameters. A filter[] must be applied."""
+    require_filter(params, ["latitude", "longitude", "radius", "direction_id", "route_type", "stop", "route", "trip",
+                            "route_pattern"],
+                   "At least one filter[] must be present for predictions to be returned.")
+    if bool(params.get("latitude")) != bool(params.get("longitude")):
+        raise ValueError("If setting latitude or longitude filters, both must be provided.")
+
+    return await list_request(urls.predictions_url(), PREDICTION, params, json)
+
+
+async def routes(json: bool = False, **params):
+    """Async version of route.routes. Accepts the same parameters."""
+    return await list_request(urls.route_url(), ROUTE, params, json)
+
+
+async def route_by_id(route_id: str, json: bool = False, **params):
+    """Async version of route.route_by_id. Accepts the same parameters."""
+    return await id_request(urls.route_by_id_url(route_id), ROUTE, params, json)
+
+
+async def all_routes(json: bool = False):
+    """Async version of route.all_routes"""
+    return await routes(json=json)
+
+
+async def route_patterns(json: bool = False, **params):
+    """Async version of routepattern.route_patterns. Accepts the same parameters."""
+    return await list_request(urls.route_pattern_url(), ROUTE_PATTERN, params, json)
+
+
+async def route_pattern_by_id(route_pattern_id: str, json: bool = False, **params):
+    """Async version of routepattern.route_pattern_by_id. Accepts the same parameters."""
+    return await id_request(urls.route_pattern_by_id_url(route_pattern_id), ROUTE_PATTERN, params, json)
+
+
+async def all_route_patterns(json: bool = False):
+    """Async version of routepattern.all_route_patterns"""
+    return await route_patterns(json=json)
+
+
+async def schedules(json: bool = False, **params):
+    """Async version of schedule.schedules. Accepts the same parameters. A route, stop, or trip filter[] must be
+    applied."""
+    require_filter(params, ["route", "stop", "trip"],
+                   "At least one route, stop, or trip filter[] must be present for schedules to be returned.")
+    return await list_request(urls.schedules_url(), SCHEDULE, params, json)
+
+
+async def services(json: bool = False, **params):
+    """Async version of service.services. Accepts the same parameters. A filter[] must be applied."""
+    require_filter(params, ["filter_id", "route"], "At least one filter[] must be present for services to be returned.")
+    return await list_request(urls.service_url(), SERVICE, params, json)
+
+
+async def service_by_id(service_id: str, json: bool = False, **params):
+    """Async version of service.service_by_id. Accepts the same parameters."""
+    return await id_request(urls.service_by_id_url(service_id), SERVICE, params, json)
+
+
+async def shapes(route: list[str] | str, json: bool = False, **params):
+    """Async version of shape.shapes. Accepts the same parameters."""
+    return await list_request(urls.shape_url(), SHAPE, dict(params, route=route), json)
+
+
+async def shape_by_id(shape_id: str, json: bool = False, **params):
+    """Async version of shape.shape_by_id. Accepts the same parameters."""
+    return await id_request(urls.shape_by_id_url(shape_id), SHAPE, params, json)
+
+
+async def stops(json: bool = False, **params):
+    """Async version of stop.stops. Accepts the same parameters."""
+    return await list_request(urls.stop_url(), STOP, params, json)
+
+
+async def stop_by_id(stop_id: str, json: bool = False, **params):
+    """Async version of stop.stop_by_id. Accepts the same parameters."""
+    return await id_request(urls.stop_by_id_url(stop_id), STOP, params, json)
+
+
+async def all_stops(json: bool = False):
+    """Async version of stop.all_stops"""
+    return await stops(json=json)
+
+
+async def trips(json: bool = False, **params):
+    """Async version of trip.trips. Accepts the same parameters. At least one id, route, route_pattern, or name
+    filter[] must be applied."""
+    require_filter(params, ["filter_id", "route", "route_pattern", "name"],
+                   "At least one id, route, route_pattern, or name filter[] must be present for trips to be returned.")
+    return await list_request(urls.trip_url(), TRIP, params, json)
+
+
+async def trip_by_id(trip_id: str, json: bool = False, **params):
+    """Async version of trip.trip_by_id. Accepts the same parameters."""
+    return await id_request(urls.trip_by_id_url(trip_id), TRIP, params, json)
+
+
+async def vehicles(json: bool = False, **params):
+    """Async version of vehicle.vehicles. Accepts the same parameters."""
+    return await list_request(urls.vehicle_url(), VEHICLE, params, json)
+
+
+async def vehicle_by_id(vehicle_id: str, json: bool = False, **params):
+    """Async version of vehicle.vehicle_by_id. Accepts the same parameters."""
+    return await id_request(urls.vehicle_by_id_url(vehicle_id), VEHICLE, params, json)
+
+
+async def all_vehicles(json: bool = False):
+    """Async version of vehicle.all_vehicles"""
+    return await vehicles(json=json)
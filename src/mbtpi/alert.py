@@ -1,21 +1,37 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute, stripped
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from bulk import by_ids, Found
+from stream import Stream
 
 
-class ALERT(object):
+class ALERT(Model):
     """Represents a MBTA alert. Takes in json with 'id', 'links', 'type' keys, 'relationships' and 'attributes' dict"""
+    __slots__ = ("stops", "routes", "trips", "facilities")
+
+    active_period = Attribute()
+    banner = Attribute()
+    cause = Attribute()
+    created_at = Attribute()
+    description = Attribute(convert=stripped)
+    effect = Attribute()
+    header = Attribute(convert=stripped)
+    informed_entity = Attribute()
+    lifecycle = Attribute()
+    service_effect = Attribute()
+    severity = Attribute()
+    short_header = Attribute(convert=stripped)
+    timeframe = Attribute()
+    updated_at = Attribute()
+    url = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.id = json["id"]
-        self.links = json["links"]
-        self.type = json["type"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and header of the alert"""
         return self.id + ": " + self.header
@@ -31,29 +47,14 @@ class ALERT(object):
         if "facilities" in json:
             self.facilities = json["facilities"]["data"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the alert"""
-        self.active_period = json["active_period"]
-        self.banner = json["banner"]
-        self.cause = json["cause"]
-        self.created_at = json["created_at"]
-        self.description = json["description"].strip()
-        self.effect = json["effect"]
-        self.header = json["header"].strip()
-        self.informed_entity = json["informed_entity"]
-        self.lifecycle = json["lifecycle"]
-        self.service_effect = json["service_effect"]
-        self.severity = json["severity"]
-        self.short_header = json["short_header"].strip()
-        self.timeframe = json["timeframe"]
-        self.updated_at = json["updated_at"]
-        self.url = json["url"]
-
     def full_description(self):
         """Returns the alert header and its description"""
         return self.header + "\n" + self.description
 
 
+resource_types["alert"] = ALERT
+
+
 def alerts(page_offset: int = None,
            page_limit: int = None,
            sort: str = None,
@@ -71,27 +72,36 @@ def alerts(page_offset: int = None,
            datetime: str = None,
            lifecycle: list[str] = None,
            severity: list[str] = None,
+           only: list[str] = None,
+           paginate: bool = False,
            json: bool = False):
     """Makes a request to the API.
     Default behavior returns unsorted list of ALERT objects containing all alerts from API.
     Accepts all parameters that can be passed to the /alerts endpoint.
 
     :param json: return JSON instead of ALERT objects
+    :param only: names of the ALERT fields to request. Sets fields_alert to match and skips include
+    :param paginate: follow every page of results, lazily yielding ALERT objects (or JSON) one at a time
     """
-    alert_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                               fields_alert=fields_alert, include=include, activity=activity, route_type=route_type,
-                               direction_id=direction_id, route=route, stop=stop, trip=trip, facility=facility,
-                               filter_id=filter_id, banner=banner, datetime=datetime, lifecycle=lifecycle,
-                               severity=severity)
-    json_response = get(alert_session, urls.alert_url())
+    if only is not None:
+        fields_alert, include = ALERT.fields(only), None
+
+    alert_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                              fields_alert=fields_alert, include=include, activity=activity, route_type=route_type,
+                              direction_id=direction_id, route=route, stop=stop, trip=trip, facility=facility,
+                              filter_id=filter_id, banner=banner, datetime=datetime, lifecycle=lifecycle,
+                              severity=severity)
+    if paginate:
+        if json:
+            return iterate_pages(urls.alert_url(), alert_params)
+        return build_pages(urls.alert_url(), alert_params, ALERT)
+
+    json_response = get(urls.alert_url(), alert_params)
 
     if json:
         return json_response
     else:
-        alerts = []
-        for json in json_response["data"]:
-            alerts.append(ALERT(json))
-        return alerts
+        return build_objects(json_response, ALERT)
 
 
 def alert_by_id(alert_id: int,
@@ -105,13 +115,26 @@ def alert_by_id(alert_id: int,
     :param alert_id: id of alert to return
     :param json: return JSON instead of ALERT object
     """
-    alert_session = set_params(session, fields_alert=fields_alert, include=include)
-    json_response = get(alert_session, urls.alert_by_id_url(alert_id))
+    alert_params = set_params(fields_alert=fields_alert, include=include)
+    json_response = get(urls.alert_by_id_url(alert_id), alert_params)
 
     if json:
         return json_response
     else:
-        return ALERT(json_response["data"])
+        return build_object(json_response, ALERT)
+
+
+def alerts_by_ids(alert_ids: list[int] | str,
+                  fields_alert: list[str] | str = None,
+                  include: list[str] = None) -> Found:
+    """Makes requests to the API for many alerts at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of ALERT objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param alert_ids: ids of alerts to return, as a list or comma-separated string
+    """
+    return by_ids(alerts, "alert", alert_ids, fields_alert=fields_alert, include=include)
 
 
 def all_alerts(json: bool = False):
@@ -120,3 +143,33 @@ def all_alerts(json: bool = False):
     :param json: return JSON instead of ALERT objects
     """
     return alerts(json=json)
+
+
+def stream_alerts(fields_alert: list[str] | str = None,
+                  include: list[str] = None,
+                  activity: list[str] | str = None,
+                  route_type: str = None,
+                  direction_id: str = None,
+                  route: list[str] | str = None,
+                  stop: list[str] | str = None,
+                  trip: list[str] | str = None,
+                  facility: list[str] | str = None,
+                  filter_id: list[str] | str = None,
+                  banner: bool = None,
+                  datetime: str = None,
+                  lifecycle: list[str] = None,
+                  severity: list[str] = None,
+                  start: bool = True):
+    """Streams alerts from the API as server-sent events.
+    Default behavior returns a started Stream whose store holds an ALERT object for each alert, kept up to date as the
+    API reports changes. Accepts all filter parameters that can be passed to the /alerts endpoint.
+
+    :param start: connect immediately. Otherwise, call start() on the returned Stream
+    """
+    alert_params = set_params(fields_alert=fields_alert, include=include, activity=activity, route_type=route_type,
+                              direction_id=direction_id, route=route, stop=stop, trip=trip, facility=facility,
+                              filter_id=filter_id, banner=banner, datetime=datetime, lifecycle=lifecycle,
+                              severity=severity)
+    alert_stream = Stream(urls.alert_url(), alert_params, ALERT)
+
+    return alert_stream.start() if start else alert_stream
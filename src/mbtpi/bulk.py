@@ -0,0 +1,94 @@
+from universals import chunk_ids
+from memcache import MemoryCache, MINUTE, DAY
+from concurrent.futures import ThreadPoolExecutor
+
+# resource type -> seconds an object fetched by id is served from memory. Types left out are always requested
+TTLS = {
+    "vehicle": 5,
+    "alert": 30,
+    "live_facility": MINUTE,
+    "line": DAY,
+    "route": DAY,
+    "route_pattern": DAY,
+    "service": DAY,
+    "stop": DAY,
+    "trip": DAY,
+}
+
+# most objects kept per resource type
+MAX_OBJECTS = 10_000
+
+# requests the chunks of one lookup at the same time
+fetcher = ThreadPoolExecutor(max_workers=8, thread_name_prefix="mbtpi-bulk")
+
+# resource type -> MemoryCache of objects keyed by id
+object_caches = {}
+
+
+class Found(list):
+    """Objects fetched by id, in the order the ids were given with None in place of each id the API doesn't know.
+    The unknown ids are listed, once each, in missing."""
+    __slots__ = ("missing",)
+
+    def __init__(self, objects=(), missing=()):
+        """Stores the objects and the ids that weren't found"""
+        super().__init__(objects)
+        self.missing = list(missing)
+
+
+def object_cache(resource_type: str) -> MemoryCache:
+    """Returns the cache of objects of a resource type, creating it on first use"""
+    cache = object_caches.get(resource_type)
+    if cache is None:
+        cache = object_caches.setdefault(resource_type, MemoryCache(MAX_OBJECTS))
+    return cache
+
+
+def clear_objects():
+    """Removes every object cached by id"""
+    for cache in list(object_caches.values()):
+        cache.clear()
+
+
+def by_ids(function, resource_type: str, ids, **params) -> Found:
+    """Fetches objects of one resource type by id with as few requests as the URL length allows.
+
+    Ids cached from an earlier lookup are served from memory for the TTL of their type. The rest are requested
+    through filter[id], split into chunks of at most MAX_FILTER_LENGTH characters that are requested concurrently.
+    Objects are only cached when no params are given, since fields or include change what an object holds.
+
+    :param function: list function of the resource type accepting filter_id, e.g. stops
+    :param resource_type: type of the resources, e.g. "stop"
+    :param ids: ids to fetch, as a list or comma-separated string. Repeated ids are requested once
+    :param params: other parameters passed to function, e.g. include
+    """
+    if isinstance(ids, str):
+        ids = ids.split(",")
+    ids = [str(item) for item in ids]
+    params = {name: value for name, value in params.items() if value is not None}
+    ttl = TTLS.get(resource_type) if not params else None
+    cache = object_cache(resource_type) if ttl is not None else None
+
+    found = {}
+    wanted = []
+    for item in dict.fromkeys(ids):
+        obj = cache.get(item) if cache is not None else None
+        if obj is None:
+            wanted.append(item)
+        else:
+            found[item] = obj
+
+    chunks = chunk_ids(wanted)
+    if len(chunks) == 1:
+        results = [function(filter_id=",".join(chunks[0]), **params)]
+    else:
+        futures = [fetcher.submit(function, filter_id=",".join(chunk), **params) for chunk in chunks]
+        results = [future.result() for future in futures]
+
+    for objects in results:
+        for obj in objects:
+            found[obj.id] = obj
+            if cache is not None:
+                cache.put(obj.id, obj, ttl)
+
+    return Found([found.get(item) for item in ids], [item for item in dict.fromkeys(ids) if item not in found])
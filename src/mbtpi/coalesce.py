@@ -0,0 +1,195 @@
+from alert import alerts
+from prediction import predictions
+from schedule import schedules
+from stop import STOP  # registers the class included stops are built into
+from universals import chunk_ids, MAX_FILTER_LENGTH
+from threading import Event, Lock
+from time import sleep
+import asyncio
+
+# seconds a batch stays open for more ids after its first call
+WINDOW = 0.01
+
+
+def related_ids(name: str):
+    """Returns a function giving the ids an object's relationship of the given name refers to, whether the
+    relationship holds an id, a linked object, linkage dicts or the raw relationships JSON. The parent station of a
+    linked stop counts as referred to as well."""
+    def ids(obj):
+        value = getattr(obj, name, None)
+        if value is None:
+            value = (getattr(obj, "relationships", None) or {}).get(name, {}).get("data")
+        if value is None:
+            return
+        for item in value if isinstance(value, list) else [value]:
+            if isinstance(item, str):
+                yield item
+            elif isinstance(item, dict):
+                yield item["id"]
+            else:
+                yield item.id
+                parent = getattr(item, "parent_station", None)
+                if parent is not None:
+                    yield getattr(parent, "id", parent)
+    return ids
+
+
+def with_include(params: dict, include: str) -> dict:
+    """Returns the params with the comma-separated relationships of include added to their own include, if any"""
+    if not include:
+        return params
+    requested = params.get("include") or []
+    if isinstance(requested, str):
+        requested = requested.split(",")
+    return dict(params, include=",".join(dict.fromkeys([*requested, *include.split(",")])))
+
+
+def informed_ids(name: str):
+    """Returns a function giving the ids of the given kind (e.g. 'stop') in an alert's informed entities"""
+    def ids(alert):
+        return [entity[name] for entity in alert.informed_entity or () if entity.get(name) is not None]
+    return ids
+
+
+class Batch(object):
+    """Ids collected from the calls sharing the same other parameters, and the objects returned for them"""
+    __slots__ = ("ids", "results", "error", "done")
+
+    def __init__(self, done):
+        """Starts an empty batch, finished when done is set"""
+        self.ids = {}
+        self.results = None
+        self.error = None
+        self.done = done
+
+    def demultiplex(self, objects, keys):
+        """Sorts the objects returned for the batch into a list per requested id"""
+        self.results = {item: [] for item in self.ids}
+        for obj in objects:
+            for item in set(keys(obj)):
+                if item in self.results:
+                    self.results[item].append(obj)
+
+    def result(self, item):
+        """Returns the objects for one id, or raises the error the batch failed with"""
+        if self.error is not None:
+            raise self.error
+        return list(self.results[item])
+
+
+class Coalescer(object):
+    """Merges concurrent single-id calls of a list function into combined requests.
+
+    The first call for a set of parameters opens a batch, waits WINDOW seconds for other threads to add their ids,
+    then requests every id at once, split into chunks of at most MAX_FILTER_LENGTH characters. Each object returned
+    is handed to the callers whose id it refers to, so every caller gets the same objects as a request of its own.
+    An error fails every call in the batch.
+
+    Objects are matched by the ids they refer to. The API answers a parent station's id with the objects of its child
+    stops, so coalesced_predictions and coalesced_schedules always include the stop, whose parent station matches too.
+    AsyncCoalescer does the same for the coroutine functions of the aio module."""
+
+    def __init__(self, function, name: str, keys, window: float = WINDOW, max_length: int = MAX_FILTER_LENGTH,
+                 include: str = None):
+        """Stores the function calls are merged into
+
+        :param function: list function taking comma-joined ids as the keyword name, e.g. predictions
+        :param name: keyword of the filter merged, e.g. "stop"
+        :param keys: function returning the ids an object refers to, e.g. related_ids("stop")
+        :param window: seconds a batch waits for more calls
+        :param max_length: longest comma-joined id list per request
+        :param include: relationships always included in requests, e.g. "stop" so that keys can see parent stations
+        """
+        self.function = function
+        self.name = name
+        self.keys = keys
+        self.window = window
+        self.max_length = max_length
+        self.include = include
+
+        self.__batches = {}
+        self.__lock = Lock()
+
+    def __call__(self, item: str, **params) -> list:
+        """Returns the objects the function returns for a single id, e.g. coalesced_predictions("place-sstat").
+        Other parameters are passed to the function; only calls with the same ones are merged."""
+        key = tuple(sorted((name, repr(value)) for name, value in params.items()))
+        with self.__lock:
+            batch = self.__batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = self.__batches[key] = Batch(Event())
+            batch.ids[item] = None
+
+        if leader:
+            sleep(self.window)
+            with self.__lock:
+                del self.__batches[key]
+            try:
+                params = with_include(params, self.include)
+                objects = []
+                for chunk in chunk_ids(batch.ids, self.max_length):
+                    objects.extend(self.function(**{self.name: ",".join(chunk)}, **params))
+                batch.demultiplex(objects, self.keys)
+            except Exception as error:
+                batch.error = error
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+        return batch.result(item)
+
+
+class AsyncCoalescer(object):
+    """Coalescer for the coroutine functions of the aio module, merging calls made concurrently on one event loop,
+    e.g. AsyncCoalescer(aio.predictions, "stop", related_ids("stop"), include="stop"). A cancelled call leaves the
+    others' request running."""
+
+    def __init__(self, function, name: str, keys, window: float = WINDOW, max_length: int = MAX_FILTER_LENGTH,
+                 include: str = None):
+        """Stores the coroutine function calls are merged into. Parameters are the same as Coalescer's"""
+        self.function = function
+        self.name = name
+        self.keys = keys
+        self.window = window
+        self.max_length = max_length
+        self.include = include
+
+        self.__batches = {}
+
+    async def __call__(self, item: str, **params) -> list:
+        """Returns the objects the coroutine function returns for a single id"""
+        key = (asyncio.get_running_loop(), tuple(sorted((name, repr(value)) for name, value in params.items())))
+        batch = self.__batches.get(key)
+        if batch is not None:
+            batch.ids[item] = None
+            # shielded so a cancelled caller doesn't cancel the request of the others
+            await asyncio.shield(batch.done)
+            return batch.result(item)
+
+        batch = self.__batches[key] = Batch(asyncio.get_running_loop().create_future())
+        batch.ids[item] = None
+        task = asyncio.ensure_future(self.__send(key, batch, params))
+        await asyncio.shield(task)
+        return batch.result(item)
+
+    async def __send(self, key, batch: Batch, params: dict):
+        """Waits for the batch to fill, then requests it and finishes it"""
+        try:
+            await asyncio.sleep(self.window)
+            del self.__batches[key]
+            params = with_include(params, self.include)
+            chunks = chunk_ids(batch.ids, self.max_length)
+            pages = await asyncio.gather(*(self.function(**{self.name: ",".join(chunk)}, **params)
+                                           for chunk in chunks))
+            batch.demultiplex([obj for page in pages for obj in page], self.keys)
+        except BaseException as error:
+            self.__batches.pop(key, None)
+            batch.error = error if isinstance(error, Exception) else asyncio.CancelledError()
+        finally:
+            batch.done.set_result(None)
+
+
+coalesced_predictions = Coalescer(predictions, "stop", related_ids("stop"), include="stop")
+coalesced_schedules = Coalescer(schedules, "stop", related_ids("stop"), include="stop")
+coalesced_alerts = Coalescer(alerts, "stop", informed_ids("stop"))
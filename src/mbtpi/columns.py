@@ -0,0 +1,86 @@
+from datetime import datetime
+from sys import intern
+
+# value stored for absent times (epoch seconds) and absent integers
+MISSING_TIME = -1
+MISSING_INT = -1
+
+# resource type -> attribute -> column kind. Relationship ids and the resource id are always included as strings
+COLUMNS = {
+    "prediction": {"arrival_time": "time", "departure_time": "time", "direction_id": "int", "stop_sequence": "int",
+                   "schedule_relationship": "str", "status": "str"},
+    "schedule": {"arrival_time": "time", "departure_time": "time", "direction_id": "int", "stop_sequence": "int",
+                 "pickup_type": "int", "drop_off_type": "int", "timepoint": "bool", "stop_headsign": "str"},
+    "stop": {"latitude": "float", "longitude": "float", "location_type": "int", "vehicle_type": "int",
+             "wheelchair_boarding": "int", "name": "str", "platform_code": "str", "municipality": "str"},
+    "vehicle": {"latitude": "float", "longitude": "float", "bearing": "float", "speed": "float",
+                "direction_id": "int", "current_stop_sequence": "int", "current_status": "str", "label": "str",
+                "occupancy_status": "str", "updated_at": "time"},
+}
+
+
+def epoch(value, parsed):
+    """Returns the ISO 8601 time as epoch seconds, memoizing each distinct string in parsed"""
+    if value is None:
+        return MISSING_TIME
+    seconds = parsed.get(value)
+    if seconds is None:
+        seconds = parsed[value] = int(datetime.fromisoformat(value).timestamp())
+    return seconds
+
+
+def to_columns(resources, resource_type: str) -> dict:
+    """Returns the resources as a struct of arrays: a dict mapping each column to a NumPy array with one row per
+    resource. Times are int64 epoch seconds (MISSING_TIME when absent), coordinates, bearing and speed are float64
+    (NaN when absent), and integers are int64 (MISSING_INT when absent). The id and relationship ids are interned
+    strings in object arrays.
+
+    :param resources: iterable of resource JSON, e.g. the 'data' of a response or a paginated request
+    :param resource_type: type of the resources, one of the keys of COLUMNS
+    """
+    # imported here so that importing the resource modules doesn't import numpy
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError("Columnar results require numpy. Install it with 'pip install numpy'.")
+
+    kinds = COLUMNS[resource_type]
+    values = {"id": []}
+    values.update({name: [] for name in kinds})
+    relationships = {}
+    parsed = {}
+
+    for row, resource in enumerate(resources):
+        values["id"].append(intern(resource["id"]))
+
+        attributes = resource["attributes"]
+        for name, kind in kinds.items():
+            value = attributes.get(name)
+            if kind == "time":
+                value = epoch(value, parsed)
+            elif kind == "int" and value is None:
+                value = MISSING_INT
+            elif kind == "float" and value is None:
+                value = np.nan
+            elif kind == "str" and value is not None:
+                value = intern(value)
+            values[name].append(value)
+
+        for name, relationship in resource.get("relationships", {}).items():
+            data = relationship.get("data")
+            if isinstance(data, list):
+                continue
+            if name not in relationships:
+                relationships[name] = [None] * row
+            relationships[name].append(intern(data["id"]) if data is not None else None)
+        for name, column in relationships.items():
+            if len(column) <= row:
+                column.append(None)
+
+    dtypes = {"time": np.int64, "int": np.int64, "float": np.float64, "bool": np.bool_, "str": object}
+    columns = {"id": np.array(values["id"], dtype=object)}
+    for name, kind in kinds.items():
+        columns[name] = np.array(values[name], dtype=dtypes[kind])
+    for name, column in relationships.items():
+        columns[name] = np.array(column, dtype=object)
+    return columns
@@ -0,0 +1,236 @@
+from prediction import predictions
+from schedule import schedules
+from stop import STOP  # registers the classes included stops and trips are built into
+from trip import TRIP
+from servicetime import SERVICE_TIME_ZONE, service_date
+from universals import chunk_ids, related_id
+from datetime import datetime, timedelta
+from threading import Lock
+from time import monotonic
+
+# default number of seconds ahead a board covers
+WINDOW = 60 * 60
+
+# seconds between schedule requests. Predictions are requested on every update
+SCHEDULE_REFRESH = 5 * 60
+
+
+def row_key(obj):
+    """Returns the key a schedule and the prediction for it share: the trip, stop and stop sequence"""
+    return related_id(obj, "trip"), related_id(obj, "stop"), obj.stop_sequence
+
+
+class Departure(object):
+    """Row of a departure board: a scheduled or predicted departure of a trip from a stop, with the SCHEDULE and
+    PREDICTION objects it joins (either may be None)"""
+    __slots__ = ("schedule", "prediction", "__time")
+
+    def __init__(self, schedule=None, prediction=None):
+        """Stores the joined schedule and prediction"""
+        self.schedule = schedule
+        self.prediction = prediction
+        self.__time = None
+
+    def __str__(self):
+        """Returns the departure time, route and headsign"""
+        return str(self.departure_time) + " " + str(self.route) + " " + str(self.headsign)
+
+    def __source(self, name):
+        """Returns the relationship from the prediction if there is one, otherwise from the schedule"""
+        for obj in (self.prediction, self.schedule):
+            if obj is not None and getattr(obj, name, None) is not None:
+                return getattr(obj, name)
+        return None
+
+    @property
+    def trip(self):
+        """Returns the trip, as a TRIP object when included by the request"""
+        return self.__source("trip")
+
+    @property
+    def route(self) -> str:
+        """Returns the id of the route"""
+        return related_id(self.prediction or self.schedule, "route")
+
+    @property
+    def stop(self) -> str:
+        """Returns the id of the stop"""
+        return related_id(self.prediction or self.schedule, "stop")
+
+    @property
+    def stop_object(self):
+        """Returns the STOP object of the stop when included by the request, otherwise None"""
+        stop = getattr(self.prediction or self.schedule, "stop", None)
+        return stop if not isinstance(stop, str) else None
+
+    @property
+    def headsign(self) -> str:
+        """Returns the headsign of the trip, or the headsign shown at this stop if the trip wasn't included"""
+        headsign = getattr(self.trip, "headsign", None)
+        if headsign is None and self.schedule is not None:
+            headsign = self.schedule.stop_headsign
+        return headsign
+
+    @property
+    def scheduled_time(self) -> str:
+        """Returns the scheduled departure time, or None for an added trip"""
+        return self.schedule.departure_time if self.schedule is not None else None
+
+    @property
+    def predicted_time(self) -> str:
+        """Returns the predicted departure time, or None without a prediction"""
+        return self.prediction.departure_time if self.prediction is not None else None
+
+    @property
+    def departure_time(self) -> datetime:
+        """Returns the predicted departure time, or the scheduled one without a prediction"""
+        value = self.predicted_time or self.scheduled_time
+        if self.__time is None or self.__time[0] != value:
+            self.__time = (value, datetime.fromisoformat(value) if value is not None else None)
+        return self.__time[1]
+
+    @property
+    def cancelled(self) -> bool:
+        """Returns whether the prediction reports the trip cancelled or the stop skipped"""
+        return self.prediction is not None and self.prediction.schedule_relationship in ("CANCELLED", "SKIPPED")
+
+
+class DepartureBoard(object):
+    """Departures from a set of stops over a sliding window, merged from schedules and predictions.
+
+    Every stop is served from the same requests: one for schedules and one for predictions, with the stop ids split
+    into chunks only when the list is long. Rows are hash-joined on trip, stop and stop sequence, so a prediction
+    lands on the row of its schedule and a prediction without one (an added trip) gets a row of its own. Trips are
+    included to resolve headsigns.
+
+    update() requests predictions each time and schedules every SCHEDULE_REFRESH seconds, updating rows in place.
+    Rows are kept by stop id and by parent station id."""
+
+    def __init__(self, stop_ids: list[str], window: float = WINDOW):
+        """Creates an empty board. Call update() to fill it.
+
+        :param stop_ids: stops (or parent stations) to show departures from
+        :param window: seconds ahead of now to show departures for
+        """
+        self.stop_ids = list(stop_ids)
+        self.window = window
+        self.rows = {}
+        self.boards = {}
+        self.upcoming = []
+
+        self.__schedules_at = None
+        self.__lock = Lock()
+
+    def __request(self, function, **params) -> list:
+        """Calls a list function for every chunk of stop ids and returns all the objects"""
+        objects = []
+        for chunk in chunk_ids(self.stop_ids):
+            objects.extend(function(stop=",".join(chunk), include="trip,stop", **params))
+        return objects
+
+    def __fetch_schedules(self, now: datetime) -> list:
+        """Requests the schedules departing within the window, which may run past midnight"""
+        now = now.astimezone(SERVICE_TIME_ZONE)
+        start = now - timedelta(minutes=1)
+        end = now + timedelta(seconds=self.window + SCHEDULE_REFRESH)
+        day = service_date(start)
+
+        # times after midnight are written as hours past 24 of the service date
+        def service_time(time):
+            return "%02d:%02d" % ((time.date() - day).days * 24 + time.hour, time.minute)
+
+        return self.__request(schedules, date=day.isoformat(), min_time=service_time(start),
+                              max_time=service_time(end))
+
+    def update(self, now: datetime = None) -> list[Departure]:
+        """Requests predictions (and schedules when due), updates the rows, and returns every departure in the window
+
+        :param now: time the window starts at, for replaying a board. Defaults to the current time
+        """
+        now = now or datetime.now(SERVICE_TIME_ZONE)
+        refresh = self.__schedules_at is None or monotonic() - self.__schedules_at >= SCHEDULE_REFRESH
+        fetched_schedules = self.__fetch_schedules(now) if refresh else None
+        fetched_predictions = self.__request(predictions)
+
+        with self.__lock:
+            if fetched_schedules is not None:
+                self.__schedules_at = monotonic()
+                self.__join_schedules(fetched_schedules)
+            self.__join_predictions(fetched_predictions)
+            self.__rebuild(now)
+            return list(self.upcoming)
+
+    def __join_schedules(self, fetched):
+        """Replaces the scheduled rows, keeping the prediction of each row still scheduled"""
+        rows = {}
+        for schedule in fetched:
+            key = row_key(schedule)
+            row = self.rows.get(key)
+            if row is None:
+                row = Departure(schedule)
+            else:
+                row.schedule = schedule
+            rows[key] = row
+        for key, row in self.rows.items():
+            if key not in rows and row.schedule is None:
+                rows[key] = row
+        self.rows = rows
+
+    def __join_predictions(self, fetched):
+        """Attaches each prediction to the row of its schedule, adding rows for added trips and dropping rows of
+        added trips no longer predicted"""
+        predicted = {}
+        for prediction in fetched:
+            predicted[row_key(prediction)] = prediction
+
+        for key, row in list(self.rows.items()):
+            row.prediction = predicted.pop(key, None)
+            if row.schedule is None and row.prediction is None:
+                del self.rows[key]
+        for key, prediction in predicted.items():
+            self.rows[key] = Departure(prediction=prediction)
+
+    def __rebuild(self, now: datetime):
+        """Drops departed rows and sorts the rest into a board per stop and parent station"""
+        end = now + timedelta(seconds=self.window)
+        upcoming = []
+        for key, row in list(self.rows.items()):
+            time = row.departure_time
+            if time is None:
+                continue
+            if time < now:
+                if row.prediction is None:
+                    del self.rows[key]
+                continue
+            if time <= end:
+                upcoming.append(row)
+
+        upcoming.sort(key=lambda departure: departure.departure_time)
+        boards = {}
+        for row in upcoming:
+            stop = row.stop
+            boards.setdefault(stop, []).append(row)
+            parent = related_id(row.stop_object, "parent_station")
+            if parent is not None and parent != stop:
+                boards.setdefault(parent, []).append(row)
+        self.upcoming = upcoming
+        self.boards = boards
+
+    def departures(self, stop_id: str) -> list[Departure]:
+        """Returns the departures from a stop or parent station in time order, as of the last update"""
+        with self.__lock:
+            return list(self.boards.get(stop_id, ()))
+
+
+def departures(stop_ids: list[str] | str, window: float = WINDOW) -> DepartureBoard:
+    """Makes requests to the API for the schedules and predictions of the stops.
+    Default behavior returns an updated DepartureBoard for the stops; call update() on it to keep it current.
+
+    :param stop_ids: stop ids (or parent station ids), as a list or comma-separated string
+    :param window: seconds ahead of now to show departures for
+    """
+    if isinstance(stop_ids, str):
+        stop_ids = stop_ids.split(",")
+    board = DepartureBoard(stop_ids, window)
+    board.update()
+    return board
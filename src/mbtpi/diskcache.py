@@ -0,0 +1,115 @@
+from urls import urls, load_environment
+from os import environ
+from threading import local
+from time import time
+
+DAY = 24 * 60 * 60
+
+# endpoint, relative to the root of the API -> seconds a stored response is served without asking the API whether
+# it changed. Covers the list and by-id requests of resources that change at most daily
+TTLS = {
+    "lines/": DAY,
+    "routes/": DAY,
+    "route_patterns/": DAY,
+    "services/": DAY,
+    "shapes/": DAY,
+    "stops/": DAY,
+}
+
+
+class DiskCache(object):
+    """Persistent cache of API responses in a SQLite database, shared by every process using the same file.
+
+    A stored response younger than the TTL of its endpoint is served without a request. An older one is revalidated
+    with If-Modified-Since, so an unchanged resource is still not downloaded again."""
+
+    def __init__(self, path: str, ttls: dict = None):
+        """Opens (or creates) the database
+
+        :param path: file the database is stored in
+        :param ttls: endpoint relative to the root of the API, e.g. "stops/" -> TTL in seconds, replacing the default
+            TTLS
+        """
+        self.path = path
+        self.ttls = dict(TTLS if ttls is None else ttls)
+        self.__local = local()
+
+        self.__connection().execute("CREATE TABLE IF NOT EXISTS responses "
+                                    "(key TEXT PRIMARY KEY, body BLOB, last_modified TEXT, stored_at REAL)")
+
+    def __connection(self):
+        """Returns the connection of the calling thread, as SQLite connections can't be shared between threads"""
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            import sqlite3
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+        return connection
+
+    def ttl(self, path: str):
+        """Returns the TTL of the endpoint the path belongs to, or None if responses from it are not stored"""
+        base_url = urls.base_url
+        for endpoint, ttl in self.ttls.items():
+            if path.startswith(base_url + endpoint):
+                return ttl
+        return None
+
+    def lookup(self, key, ttl: float):
+        """Returns (last_modified, fresh) for a stored response, or None if there is none"""
+        row = self.__connection().execute("SELECT last_modified, stored_at FROM responses WHERE key = ?",
+                                          (repr(key),)).fetchone()
+        if row is None:
+            return None
+        return row[0], time() - row[1] < ttl
+
+    def load(self, key) -> bytes:
+        """Returns the body of a stored response"""
+        row = self.__connection().execute("SELECT body FROM responses WHERE key = ?", (repr(key),)).fetchone()
+        return row[0] if row is not None else None
+
+    def store(self, key, body: bytes, last_modified: str):
+        """Stores the body of a response and its Last-Modified validator"""
+        self.__connection().execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                    (repr(key), body, last_modified, time()))
+
+    def touch(self, key):
+        """Marks a stored response as fresh again, after the API reported it unchanged"""
+        self.__connection().execute("UPDATE responses SET stored_at = ? WHERE key = ?", (time(), repr(key)))
+
+    def clear(self):
+        """Removes every stored response"""
+        self.__connection().execute("DELETE FROM responses")
+
+
+def enable(path: str, ttls: dict = None) -> DiskCache:
+    """Stores responses from static endpoints in the SQLite database at path, and returns the cache"""
+    global disk_cache, configured
+    disk_cache = DiskCache(path, ttls)
+    configured = True
+    return disk_cache
+
+
+def disable():
+    """Stops storing and serving responses from disk"""
+    global disk_cache, configured
+    disk_cache = None
+    configured = True
+
+
+def current() -> DiskCache:
+    """Returns the cache in use, or None. Unless enable() or disable() was called, the first call opens the cache at
+    MBTA_CACHE_PATH if it is set."""
+    global disk_cache, configured
+    if not configured:
+        load_environment()
+        if environ.get('MBTA_CACHE_PATH'):
+            disk_cache = DiskCache(environ['MBTA_CACHE_PATH'])
+        configured = True
+    return disk_cache
+
+
+# the cache in use, and whether it has been set up
+disk_cache = None
+configured = False
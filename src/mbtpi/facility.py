@@ -1,21 +1,26 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
 
 
-class FACILITY(object):
+class FACILITY(Model):
     """Represents a MBTA facility. Takes in json with 'id', 'links', 'type' keys, 'relationships' and 'attributes' dicts"""
+    __slots__ = ("stop",)
+
+    latitude = Attribute()
+    long_name = Attribute()
+    longitude = Attribute()
+    properties = Attribute()
+    short_name = Attribute()
+    facility_type = Attribute("type")
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.id = json["id"]
-        self.links = json["links"]
-        self.type = json["type"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and long name of the facility"""
         return self.id + ": " + self.long_name
@@ -25,14 +30,8 @@ class FACILITY(object):
         if "stop" in json:
             self.stop = json["stop"]["data"]["id"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the facility"""
-        self.latitude = json["latitude"]
-        self.long_name = json["long_name"]
-        self.longitude = json["longitude"]
-        self.properties = json["properties"]
-        self.short_name = json["short_name"]
-        self.facility_type = json["type"]
+
+resource_types["facility"] = FACILITY
 
 
 def facilities(page_offset: int = None,
@@ -42,24 +41,33 @@ def facilities(page_offset: int = None,
                include: list[str] = None,
                stop: list[str] | str = None,
                type: list[str] | str = None,
+               only: list[str] = None,
+               paginate: bool = False,
                json: bool = False):
     """Makes a request to the API.
     Default behavior returns unsorted list of FACILITY objects containing all facilities from API.
     Accepts all parameters that can be passed to the /facilities endpoint.
 
     :param json: return JSON instead of FACILITY object
+    :param only: names of the FACILITY fields to request. Sets fields_facility to match and skips include
+    :param paginate: follow every page of results, lazily yielding FACILITY objects (or JSON) one at a time
     """
-    facility_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                                  fields_facility=fields_facility, include=include, stop=stop, type=type)
-    json_response = get(facility_session, urls.facility_url())
+    if only is not None:
+        fields_facility, include = FACILITY.fields(only), None
+
+    facility_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                                 fields_facility=fields_facility, include=include, stop=stop, type=type)
+    if paginate:
+        if json:
+            return iterate_pages(urls.facility_url(), facility_params)
+        return build_pages(urls.facility_url(), facility_params, FACILITY)
+
+    json_response = get(urls.facility_url(), facility_params)
 
     if json:
         return json_response
     else:
-        facilities = []
-        for json in json_response["data"]:
-            facilities.append(FACILITY(json))
-        return facilities
+        return build_objects(json_response, FACILITY)
 
 
 def facility_by_id(facility_id: str,
@@ -73,13 +81,13 @@ def facility_by_id(facility_id: str,
     :param facility_id: id of facility to return
     :param json: return JSON instead of FACILITY objects
     """
-    facility_session = set_params(session, fields_facility=fields_facility, include=include)
-    json_response = get(facility_session, urls.facility_by_id_url(facility_id))
+    facility_params = set_params(fields_facility=fields_facility, include=include)
+    json_response = get(urls.facility_by_id_url(facility_id), facility_params)
 
     if json:
         return json_response
     else:
-        return FACILITY(json_response["data"])
+        return build_object(json_response, FACILITY)
 
 
 def all_facilities(json: bool = False):
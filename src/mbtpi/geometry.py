@@ -0,0 +1,121 @@
+# mean radius of the earth and meters per degree of latitude
+EARTH_RADIUS = 6_371_008.8
+METERS_PER_DEGREE = 111_320
+
+
+def require_numpy():
+    """Returns numpy, imported on first use so that importing SHAPE doesn't import it. Raises an ImportError if it
+    isn't installed."""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Shape geometry requires numpy. Install it with 'pip install numpy'.")
+    return numpy
+
+
+def decode_polylines(polylines: list[str]) -> list:
+    """Decodes Google encoded polylines in one vectorized pass over all of their characters, and returns a
+    (N, 2) float64 array of [latitude, longitude] rows for each
+
+    :param polylines: encoded polyline strings, e.g. the 'polyline' attribute of shapes
+    """
+    np = require_numpy()
+    if not polylines:
+        return []
+
+    encoded = [polyline.encode("ascii") for polyline in polylines]
+    chars = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64) - 63
+    if not len(chars):
+        return [np.empty((0, 2)) for _ in polylines]
+
+    # each value is a run of 5-bit chunks, least significant first, where every chunk but the last has bit 0x20 set
+    ends = (chars & 0x20) == 0
+    starts = np.flatnonzero(np.concatenate(([True], ends[:-1])))
+    position = np.arange(len(chars)) - np.repeat(starts, np.diff(np.append(starts, len(chars))))
+    values = np.add.reduceat((chars & 0x1f) << (5 * position), starts)
+    values = np.where(values & 1, ~(values >> 1), values >> 1)
+
+    # values alternate latitude and longitude deltas, restarting from zero in each polyline
+    boundaries = np.concatenate(([0], np.cumsum([len(polyline) for polyline in encoded])))
+    offsets = np.concatenate(([0], np.cumsum(ends)))[boundaries]
+
+    coordinates = values.reshape(-1, 2)
+    totals = np.cumsum(coordinates, axis=0)
+    points = []
+    for start, end in zip(offsets[:-1] // 2, offsets[1:] // 2):
+        base = totals[start - 1] if start > 0 else 0
+        points.append((totals[start:end] - base) / 1e5)
+    return points
+
+
+def decode_shapes(shapes) -> list:
+    """Decodes the polylines of many SHAPE objects in one vectorized pass, caching each result on its shape, and
+    returns the (N, 2) [latitude, longitude] arrays in order
+
+    :param shapes: iterable of SHAPE objects
+    """
+    shapes = list(shapes)
+    points = decode_polylines([shape.polyline or "" for shape in shapes])
+    for shape, shape_points in zip(shapes, points):
+        shape._points = shape_points
+    return points
+
+
+def cumulative_distance(points):
+    """Returns the great-circle distance in meters from the first point to each point along the path
+
+    :param points: (N, 2) array of [latitude, longitude] rows, e.g. SHAPE.points
+    """
+    np = require_numpy()
+    points = np.radians(np.asarray(points, dtype=np.float64))
+    if len(points) < 2:
+        return np.zeros(len(points))
+
+    lat, lon = points[:, 0], points[:, 1]
+    a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    steps = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def snap(points, latitudes, longitudes, distances=None) -> tuple:
+    """Snaps positions onto the closest segment of a path, vectorized over every position at once.
+
+    Returns (along, offset, segment) arrays with one entry per position: the distance in meters along the path to the
+    snapped point, the distance in meters from the position to it, and the index of the segment it lies on.
+    Segments are compared on a local equirectangular projection, accurate to well under a meter at transit scale.
+
+    :param points: (N, 2) array of [latitude, longitude] rows, e.g. SHAPE.points, with at least one point
+    :param latitudes: latitude of each position, e.g. of each vehicle on the shape
+    :param longitudes: longitude of each position
+    :param distances: cumulative_distance(points), if already computed
+    """
+    np = require_numpy()
+    points = np.asarray(points, dtype=np.float64)
+    latitudes = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+    if distances is None:
+        distances = cumulative_distance(points)
+    if len(points) == 1:
+        points = np.vstack((points, points))
+        distances = np.zeros(2)
+
+    scale = np.array([METERS_PER_DEGREE, METERS_PER_DEGREE * np.cos(np.radians(points[:, 0].mean()))])
+    path = points * scale
+    positions = np.column_stack((latitudes, longitudes)) * scale
+
+    starts = path[:-1]
+    vectors = path[1:] - starts
+    squared_lengths = (vectors ** 2).sum(axis=1)
+    squared_lengths[squared_lengths == 0] = np.inf
+
+    # (positions, segments) fraction along each segment of the closest point to each position
+    relative = positions[:, None, :] - starts[None, :, :]
+    fractions = np.clip((relative * vectors[None, :, :]).sum(axis=2) / squared_lengths, 0, 1)
+    gaps = relative - fractions[:, :, None] * vectors[None, :, :]
+    squared_gaps = (gaps ** 2).sum(axis=2)
+
+    segment = squared_gaps.argmin(axis=1)
+    rows = np.arange(len(positions))
+    along = distances[segment] + fractions[rows, segment] * np.diff(distances)[segment]
+    offset = np.sqrt(squared_gaps[rows, segment])
+    return along, offset, segment
@@ -0,0 +1,221 @@
+from urls import urls
+from threading import Lock
+
+# upper bounds of the histogram buckets: seconds for request and parse times, bytes for response sizes
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# events reported to hooks: a request sent, its response received, a response body decoded, a response served from
+# a cache ("memory", "disk" or "not_modified") and a rate limited request about to be retried
+EVENTS = ("request", "response", "parse", "cache", "retry")
+
+# prefix of every exported metric name
+PREFIX = "mbta"
+
+
+class Event(object):
+    """Something universals.get or aio.get did for a request. Values that don't apply to the event are None."""
+    __slots__ = ("name", "path", "endpoint", "status", "seconds", "size", "source", "attempt")
+
+    def __init__(self, name, path, status=None, seconds=None, size=None, source=None, attempt=None):
+        """Stores the event and the endpoint of its path"""
+        self.name = name
+        self.path = path
+        self.endpoint = endpoint(path)
+        self.status = status
+        self.seconds = seconds
+        self.size = size
+        self.source = source
+        self.attempt = attempt
+
+    def __str__(self):
+        """Returns the event name, endpoint and the values set"""
+        values = " ".join(name + "=" + str(getattr(self, name)) for name in self.__slots__[3:]
+                          if getattr(self, name) is not None)
+        return (self.name + " " + self.endpoint + " " + values).strip()
+
+
+def endpoint(path: str) -> str:
+    """Returns the endpoint a request path belongs to, relative to the root of the API with any id replaced,
+    e.g. "stops/" or "stops/{id}", so that requests for different ids share metrics"""
+    base_url = urls.base_url
+    if path.startswith(base_url):
+        path = path[len(base_url):]
+    name, _, rest = path.strip("/").partition("/")
+    return name + "/{id}" if rest else name + "/"
+
+
+class Histogram(object):
+    """Counts of observed values falling under each bucket bound, with their sum, as Prometheus histograms keep"""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        """Starts with no observations"""
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        """Adds a value to the first bucket it fits under, or only to the total if it exceeds every bound"""
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        """Returns the cumulative count under each bound, as well as the sum and count"""
+        buckets = {}
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            buckets[bound] = total
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class Metrics(object):
+    """Counters and histograms per endpoint, updated from events. Safe to share between threads."""
+
+    def __init__(self):
+        """Starts with nothing counted"""
+        self.endpoints = {}
+        self.__lock = Lock()
+
+    def __metrics(self, name):
+        """Returns the metrics of an endpoint, creating them on first use"""
+        metrics = self.endpoints.get(name)
+        if metrics is None:
+            metrics = self.endpoints[name] = {
+                "requests": 0, "responses": {}, "cache_hits": {}, "retries": 0, "bytes": 0,
+                "request_seconds": Histogram(SECONDS_BUCKETS), "parse_seconds": Histogram(SECONDS_BUCKETS),
+                "response_bytes": Histogram(BYTES_BUCKETS)}
+        return metrics
+
+    def record(self, event: Event):
+        """Counts an event"""
+        with self.__lock:
+            metrics = self.__metrics(event.endpoint)
+            if event.name == "request":
+                metrics["requests"] += 1
+            elif event.name == "response":
+                metrics["responses"][event.status] = metrics["responses"].get(event.status, 0) + 1
+                metrics["request_seconds"].observe(event.seconds)
+                metrics["response_bytes"].observe(event.size)
+                metrics["bytes"] += event.size
+            elif event.name == "parse":
+                metrics["parse_seconds"].observe(event.seconds)
+            elif event.name == "cache":
+                metrics["cache_hits"][event.source] = metrics["cache_hits"].get(event.source, 0) + 1
+            elif event.name == "retry":
+                metrics["retries"] += 1
+
+    def snapshot(self) -> dict:
+        """Returns endpoint -> its counters, and histograms as dicts, as plain values safe to keep or serialize"""
+        with self.__lock:
+            return {name: {key: value.snapshot() if isinstance(value, Histogram) else
+                           dict(value) if isinstance(value, dict) else value
+                           for key, value in metrics.items()}
+                    for name, metrics in self.endpoints.items()}
+
+    def prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format"""
+        lines = []
+        snapshot = self.snapshot()
+
+        def counter(name, help_text, values):
+            lines.append("# HELP %s_%s %s" % (PREFIX, name, help_text))
+            lines.append("# TYPE %s_%s counter" % (PREFIX, name))
+            for labels, value in values:
+                lines.append("%s_%s{%s} %s" % (PREFIX, name, labels, value))
+
+        def histogram(name, help_text, key):
+            lines.append("# HELP %s_%s %s" % (PREFIX, name, help_text))
+            lines.append("# TYPE %s_%s histogram" % (PREFIX, name))
+            for endpoint_name, metrics in snapshot.items():
+                values = metrics[key]
+                label = 'endpoint="%s"' % endpoint_name
+                for bound, count in values["buckets"].items():
+                    lines.append('%s_%s_bucket{%s,le="%s"} %d' % (PREFIX, name, label, bound, count))
+                lines.append('%s_%s_bucket{%s,le="+Inf"} %d' % (PREFIX, name, label, values["count"]))
+                lines.append("%s_%s_sum{%s} %s" % (PREFIX, name, label, values["sum"]))
+                lines.append("%s_%s_count{%s} %d" % (PREFIX, name, label, values["count"]))
+
+        counter("requests_total", "Requests sent to the API, including retries.",
+                [('endpoint="%s"' % name, metrics["requests"]) for name, metrics in snapshot.items()])
+        counter("responses_total", "Responses received from the API by status code.",
+                [('endpoint="%s",status="%s"' % (name, status), count)
+                 for name, metrics in snapshot.items() for status, count in metrics["responses"].items()])
+        counter("cache_hits_total", "Responses served without downloading them again, by cache.",
+                [('endpoint="%s",source="%s"' % (name, source), count)
+                 for name, metrics in snapshot.items() for source, count in metrics["cache_hits"].items()])
+        counter("retries_total", "Rate limited (429) requests retried.",
+                [('endpoint="%s"' % name, metrics["retries"]) for name, metrics in snapshot.items()])
+        counter("response_bytes_total", "Bytes of response bodies received.",
+                [('endpoint="%s"' % name, metrics["bytes"]) for name, metrics in snapshot.items()])
+        histogram("request_seconds", "Seconds from sending a request to receiving its whole response.",
+                  "request_seconds")
+        histogram("parse_seconds", "Seconds spent decoding response bodies into JSON.", "parse_seconds")
+        histogram("response_size_bytes", "Bytes of each response body.", "response_bytes")
+        return "\n".join(lines) + "\n"
+
+
+def emit(name: str, path: str, **values):
+    """Records an event in the metrics and passes it to every hook subscribed to it. Callers check enabled first,
+    so that nothing is built while instrumentation is off."""
+    event = Event(name, path, **values)
+    if metrics is not None:
+        metrics.record(event)
+    for callback in hooks[name]:
+        callback(event)
+
+
+def enable(collect: bool = True) -> Metrics:
+    """Starts reporting events, and returns the metrics they are counted in
+
+    :param collect: count events in a new Metrics. With False, events only go to hooks
+    """
+    global enabled, metrics
+    metrics = Metrics() if collect else None
+    enabled = True
+    return metrics
+
+
+def disable():
+    """Stops reporting events, keeping the hooks and metrics collected so far"""
+    global enabled
+    enabled = False
+
+
+def subscribe(callback, events=EVENTS):
+    """Registers callback(event) to be called with each Event of the given names, and starts reporting events if
+    they weren't already"""
+    global enabled
+    for name in events:
+        hooks[name].append(callback)
+    enabled = True
+    return callback
+
+
+def unsubscribe(callback):
+    """Removes a callback registered with subscribe"""
+    for callbacks in hooks.values():
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+
+def snapshot() -> dict:
+    """Returns the metrics collected since enable() as a dict, or an empty dict if none are"""
+    return metrics.snapshot() if metrics is not None else {}
+
+
+def prometheus() -> str:
+    """Returns the metrics collected since enable() in the Prometheus text format"""
+    return metrics.prometheus() if metrics is not None else ""
+
+
+# whether events are reported, the metrics they are counted in, and event name -> callbacks
+enabled = False
+metrics = None
+hooks = {name: [] for name in EVENTS}
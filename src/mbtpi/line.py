@@ -1,21 +1,26 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from bulk import by_ids, Found
 
 
-class LINE(object):
+class LINE(Model):
     """Represents a MBTA line. Takes in json with 'id', 'links', 'type' keys, 'relationships' and 'attributes' dicts"""
+    __slots__ = ("routes",)
+
+    color = Attribute()
+    long_name = Attribute()
+    short_name = Attribute()
+    sort_order = Attribute()
+    text_color = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.id = json["id"]
-        self.links = json["links"]
-        self.type = json["type"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and long name of the line"""
         return self.id + ": " + self.long_name
@@ -25,13 +30,8 @@ class LINE(object):
         if "routes" in json:
             self.routes = json["routes"]["data"]["id"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the line"""
-        self.color = json["color"]
-        self.long_name = json["long_name"]
-        self.short_name = json["short_name"]
-        self.sort_order = json["sort_order"]
-        self.text_color = json["text_color"]
+
+resource_types["line"] = LINE
 
 
 def lines(page_offset: int = None,
@@ -40,24 +40,33 @@ def lines(page_offset: int = None,
           fields_line: list[str] | str = None,
           include: list[str] = None,
           filter_id: list[str] = None,
+          only: list[str] = None,
+          paginate: bool = False,
           json: bool = False):
     """Makes a request to the API.
     Default behavior returns unsorted list of LINE objects containing all lines from API.
     Accepts all parameters that can be passed to the /lines endpoint.
 
     :param json: return JSON instead of LINE objects
+    :param only: names of the LINE fields to request. Sets fields_line to match and skips include
+    :param paginate: follow every page of results, lazily yielding LINE objects (or JSON) one at a time
     """
-    line_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                              fields_line=fields_line, include=include, filter_id=filter_id)
-    json_response = get(line_session, urls.line_url())
+    if only is not None:
+        fields_line, include = LINE.fields(only), None
+
+    line_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                             fields_line=fields_line, include=include, filter_id=filter_id)
+    if paginate:
+        if json:
+            return iterate_pages(urls.line_url(), line_params)
+        return build_pages(urls.line_url(), line_params, LINE)
+
+    json_response = get(urls.line_url(), line_params)
 
     if json:
         return json_response
     else:
-        lines = []
-        for json in json_response["data"]:
-            lines.append(LINE(json))
-        return lines
+        return build_objects(json_response, LINE)
 
 
 def line_by_id(line_id: int,
@@ -71,13 +80,26 @@ def line_by_id(line_id: int,
     :param line_id: id of line to return
     :param json: return JSON instead of LINE object
     """
-    line_session = set_params(session, fields_line=fields_line, include=include)
-    json_response = get(line_session, urls.line_by_id_url(line_id))
+    line_params = set_params(fields_line=fields_line, include=include)
+    json_response = get(urls.line_by_id_url(line_id), line_params)
 
     if json:
         return json_response
     else:
-        return LINE(json_response["data"])
+        return build_object(json_response, LINE)
+
+
+def lines_by_ids(line_ids: list[str] | str,
+                 fields_line: list[str] | str = None,
+                 include: list[str] = None) -> Found:
+    """Makes requests to the API for many lines at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of LINE objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param line_ids: ids of lines to return, as a list or comma-separated string
+    """
+    return by_ids(lines, "line", line_ids, fields_line=fields_line, include=include)
 
 
 def all_lines(json: bool = False):
@@ -1,21 +1,24 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import (set_params, get, iterate_pages, build_pages, build_objects, build_object,
+                        resource_types)
+from bulk import by_ids, Found
 
 
-class LIVE_FACILITY(object):
+class LIVE_FACILITY(Model):
     """Represents a MBTA live facility. Takes in json with 'id', 'links', 'type' keys, 'relationships' and 'attributes' dicts"""
+    __slots__ = ("facility",)
+
+    updated_at = Attribute()
+    properties = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.links = json["links"]
-        self.id = json["id"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and last update time of the live facility"""
         return self.id + ": " + self.updated_at
@@ -25,10 +28,8 @@ class LIVE_FACILITY(object):
         if "facility" in json:
             self.facility = json["facility"]["data"]["id"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the live facility"""
-        self.updated_at = json["updated_at"]
-        self.properties = json["properties"]
+
+resource_types["live_facility"] = LIVE_FACILITY
 
 
 def live_facilities(filter_id: list[str] | str,
@@ -36,23 +37,27 @@ def live_facilities(filter_id: list[str] | str,
                     page_limit: int = None,
                     sort: str = None,
                     include: str = None,
+                    paginate: bool = False,
                     json: bool = False):
     """Makes a request to the API. Requires at least one filter[]. Returns live data about specific parking facilities.
     Accepts all parameters that can be passed to the /live_facilities endpoint.
 
     :param json: return JSON instead of LIVE_FACILITY objects
+    :param paginate: follow every page of results, lazily yielding LIVE_FACILITY objects (or JSON) one at a time
     """
-    facility_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                                  include=include, filter_id=filter_id)
-    json_response = get(facility_session, urls.live_facility_url())
+    facility_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                                 include=include, filter_id=filter_id)
+    if paginate:
+        if json:
+            return iterate_pages(urls.live_facility_url(), facility_params)
+        return build_pages(urls.live_facility_url(), facility_params, LIVE_FACILITY)
+
+    json_response = get(urls.live_facility_url(), facility_params)
 
     if json:
         return json_response
     else:
-        live_facilities = []
-        for json in json_response["data"]:
-            live_facilities.append(LIVE_FACILITY(json))
-        return live_facilities
+        return build_objects(json_response, LIVE_FACILITY)
 
 
 def live_facility_by_id(facility_id: str,
@@ -65,10 +70,22 @@ def live_facility_by_id(facility_id: str,
     :param facility_id: id of facility to return
     :param json: return JSON instead of LIVE_FACILITY object
     """
-    facility_session = set_params(session, include=include)
-    json_response = get(facility_session, urls.live_facility_by_id_url(facility_id))
+    facility_params = set_params(include=include)
+    json_response = get(urls.live_facility_by_id_url(facility_id), facility_params)
 
     if json:
         return json_response
     else:
-        return LIVE_FACILITY(json_response["data"])
+        return build_object(json_response, LIVE_FACILITY)
+
+
+def live_facilities_by_ids(facility_ids: list[str] | str,
+                           include: list[str] = None) -> Found:
+    """Makes requests to the API for many live facilities at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of LIVE_FACILITY objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param facility_ids: ids of live facilities to return, as a list or comma-separated string
+    """
+    return by_ids(live_facilities, "live_facility", facility_ids, include=include)
@@ -0,0 +1,129 @@
+from urls import urls, load_environment
+from collections import OrderedDict
+from os import environ
+from threading import Lock
+from time import monotonic
+
+MINUTE = 60
+DAY = 24 * 60 * MINUTE
+
+# endpoint, relative to the root of the API -> seconds a response is served from memory. Endpoints left out are
+# never cached
+TTLS = {
+    "vehicles/": 5,
+    "predictions/": 10,
+    "alerts/": 30,
+    "facilities/": DAY,
+    "lines/": DAY,
+    "routes/": DAY,
+    "route_patterns/": DAY,
+    "services/": DAY,
+    "stops/": DAY,
+    "shapes/": 7 * DAY,
+}
+
+# most responses kept at once
+MAX_ENTRIES = 1024
+
+
+class MemoryCache(object):
+    """In-process cache of API responses with a TTL per endpoint, evicting the least recently used response once
+    max_entries are held. Safe to share between threads."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttls: dict = None):
+        """Creates an empty cache
+
+        :param max_entries: most responses kept at once
+        :param ttls: endpoint relative to the root of the API, e.g. "stops/" -> TTL in seconds, replacing the default
+            TTLS
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(TTLS if ttls is None else ttls)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+
+    def __len__(self):
+        """Returns the number of responses held"""
+        return len(self.__entries)
+
+    def ttl(self, path: str):
+        """Returns the TTL of the endpoint the path belongs to, or None if responses from it are not cached"""
+        base_url = urls.base_url
+        for endpoint, ttl in self.ttls.items():
+            if path.startswith(base_url + endpoint):
+                return ttl
+        return None
+
+    def get(self, key):
+        """Returns the cached response for a request key, or None if there is none or it has expired"""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] <= monotonic():
+                del self.__entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, json_response, ttl: float):
+        """Caches a response for ttl seconds, evicting the least recently used responses beyond max_entries"""
+        with self.__lock:
+            self.__entries[key] = (json_response, monotonic() + ttl)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes every response, keeping the stats"""
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> dict:
+        """Returns the hits, misses, evictions (responses dropped to stay within max_entries), expirations and
+        number of entries of the cache"""
+        with self.__lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "expirations": self.expirations, "entries": len(self.__entries)}
+
+
+def enable(max_entries: int = MAX_ENTRIES, ttls: dict = None) -> MemoryCache:
+    """Caches responses in memory, and returns the cache"""
+    global memory_cache, configured
+    memory_cache = MemoryCache(max_entries, ttls)
+    configured = True
+    return memory_cache
+
+
+def disable():
+    """Stops caching responses in memory"""
+    global memory_cache, configured
+    memory_cache = None
+    configured = True
+
+
+def current() -> MemoryCache:
+    """Returns the cache in use, or None. Unless enable() or disable() was called, the first call creates a cache of
+    MBTA_MEMORY_CACHE_SIZE entries if it is set."""
+    global memory_cache, configured
+    if not configured:
+        load_environment()
+        if environ.get('MBTA_MEMORY_CACHE_SIZE'):
+            memory_cache = MemoryCache(int(environ['MBTA_MEMORY_CACHE_SIZE']))
+        configured = True
+    return memory_cache
+
+
+# the cache in use, and whether it has been set up
+memory_cache = None
+configured = False
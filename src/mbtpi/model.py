@@ -0,0 +1,98 @@
+from operator import itemgetter
+
+# keep each resource's 'links' dict on the objects built from it. Set to False to save memory on large results
+KEEP_LINKS = True
+
+
+def stripped(value):
+    """Returns the value with surrounding whitespace removed"""
+    return value.strip() if value is not None else value
+
+
+class Attribute(object):
+    """Field of a model holding one value of the resource's 'attributes' JSON. Values are stored together in a tuple
+    on the object, and any conversion of the raw value happens on access rather than when the object is built."""
+    __slots__ = ("name", "key", "convert", "index")
+
+    def __init__(self, key: str = None, convert=None):
+        """Stores how to read the field
+
+        :param key: name of the attribute in the JSON, if it differs from the field name
+        :param convert: function applied to the JSON value on access
+        """
+        self.name = None
+        self.key = key
+        self.convert = convert
+        self.index = None
+
+    def __set_name__(self, owner, name):
+        """Defaults the JSON key to the field name"""
+        self.name = name
+        if self.key is None:
+            self.key = name
+
+    def __get__(self, obj, owner=None):
+        """Returns the value of the attribute"""
+        if obj is None:
+            return self
+        value = obj._values[self.index]
+        return self.convert(value) if self.convert is not None else value
+
+    def __set__(self, obj, value):
+        """Overrides the value of the attribute on this object"""
+        values = list(obj._values)
+        values[self.index] = value
+        obj._values = tuple(values)
+
+
+class Model(object):
+    """Base of the MBTA resource classes. Objects have no per-instance __dict__: the id and type are stored in
+    slots, relationships in the slots each class declares, and attribute values in a single tuple read through the
+    Attribute fields of the class. The resource JSON itself is not kept."""
+    __slots__ = ("type", "id", "links", "_values")
+
+    def __init_subclass__(cls, **kwargs):
+        """Numbers the Attribute fields of the class and builds the function extracting their values from JSON"""
+        super().__init_subclass__(**kwargs)
+        fields = [field for field in vars(cls).values() if isinstance(field, Attribute)]
+        for index, field in enumerate(fields):
+            field.index = index
+
+        cls._keys = tuple(field.key for field in fields)
+        if len(fields) == 1:
+            key = cls._keys[0]
+            cls._getter = staticmethod(lambda attributes: (attributes[key],))
+        elif fields:
+            cls._getter = staticmethod(itemgetter(*cls._keys))
+        else:
+            cls._getter = staticmethod(lambda attributes: ())
+
+    @classmethod
+    def fields(cls, names: list[str]) -> str:
+        """Returns the sparse fieldset requesting the named fields of the class, with each attribute translated to
+        its JSON key. Raises a ValueError for a name that is neither an attribute nor a relationship."""
+        keys = []
+        for name in names:
+            field = getattr(cls, name, None)
+            if isinstance(field, Attribute):
+                keys.append(field.key)
+            elif name in cls.__slots__:
+                keys.append(name)
+            else:
+                raise ValueError(cls.__name__ + " has no field " + name)
+        return ",".join(keys)
+
+    def __init__(self, json):
+        """Stores the id, type and attribute values of the resource, and its links unless KEEP_LINKS is False"""
+        self.type = json["type"]
+        self.id = json["id"]
+
+        # attributes left out of a sparse fieldset read as None
+        attributes = json.get("attributes", {})
+        try:
+            self._values = self._getter(attributes)
+        except KeyError:
+            self._values = tuple(attributes.get(key) for key in self._keys)
+
+        if KEEP_LINKS and "links" in json:
+            self.links = json["links"]
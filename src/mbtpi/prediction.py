@@ -1,47 +1,51 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, resource_types
+from columns import to_columns
+from stream import Stream
 
 
-class PREDICTION(object):
+class PREDICTION(Model):
     """Represents a MBTA prediction. Takes in json with 'id', 'type' keys, 'relationships' and 'attributes' dicts"""
+    __slots__ = ("vehicle", "trip", "stop", "schedule", "route", "alerts")
+
+    stop_sequence = Attribute()
+    status = Attribute()
+    schedule_relationship = Attribute()
+    direction_id = Attribute()
+    departure_time = Attribute()
+    arrival_time = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.id = json["id"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and route of the prediction"""
-        return self.id + ": " + self.route
+        return self.id + ": " + getattr(self.route, "id", self.route)
 
     def __set_relationships(self, json):
-        """Sets each given relationship"""
+        """Sets each given relationship. Predictions without a vehicle or schedule have null ones, set to None"""
         if "vehicle" in json:
-            self.vehicle = json["vehicle"]["data"]["id"]
+            data = json["vehicle"]["data"]
+            self.vehicle = data["id"] if data is not None else None
         if "trip" in json:
             self.trip = json["trip"]["data"]["id"]
         if "stop" in json:
             self.stop = json["stop"]["data"]["id"]
         if "schedule" in json:
-            self.schedule = json["schedule"]["data"]["id"]
+            data = json["schedule"]["data"]
+            self.schedule = data["id"] if data is not None else None
         if "route" in json:
             self.route = json["route"]["data"]["id"]
         if "alerts" in json:
             self.alerts = json["alerts"]["data"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the prediction"""
-        self.stop_sequence = json["stop_sequence"]
-        self.status = json["status"]
-        self.schedule_relationship = json["schedule_relationship"]
-        self.direction_id = json["direction_id"]
-        self.departure_time = json["departure_time"]
-        self.arrival_time = json["arrival_time"]
+
+resource_types["prediction"] = PREDICTION
 
 
 def predictions(page_offset: int = None,
@@ -58,12 +62,19 @@ def predictions(page_offset: int = None,
                 route: list[str] | str = None,
                 trip: list[str] | str = None,
                 route_pattern: list[str] | str = None,
+                only: list[str] = None,
+                format: str = None,
+                paginate: bool = False,
                 json: bool = False):
     """Makes a request to the API. A filter[] must be applied.
     Default behavior returns unsorted list of PREDICTION objects containing all predictions from API.
     Accepts all parameters that can be passed to the /predictions endpoint.
 
     :param json: return JSON instead of PREDICTION objects
+    :param only: names of the PREDICTION fields to request. Sets fields_prediction to match and skips include
+    :param paginate: follow every page of results, lazily yielding PREDICTION objects (or JSON) one at a time
+    :param format: "columns" to return a dict of NumPy arrays, one per field, instead of PREDICTION objects.
+        With paginate, every page is read into the arrays
     """
     filters = [latitude, longitude, radius, direction_id, route_type, stop, route, trip, route_pattern]
     if filters.count(None) == len(filters):
@@ -72,17 +83,60 @@ def predictions(page_offset: int = None,
     if latitude and not longitude or longitude and not latitude:
         raise ValueError("If setting latitude or longitude filters, both must be provided.")
 
-    prediction_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                                    fields_prediction=fields_prediction, include=include, latitude=latitude,
-                                    longitude=longitude, radius=radius, direction_id=direction_id,
-                                    route_type=route_type, stop=stop,
-                                    route=route, trip=trip, route_pattern=route_pattern)
-    json_response = get(prediction_session, urls.predictions_url())
+    if only is not None:
+        fields_prediction, include = PREDICTION.fields(only), None
+
+    prediction_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                                   fields_prediction=fields_prediction, include=include, latitude=latitude,
+                                   longitude=longitude, radius=radius, direction_id=direction_id,
+                                   route_type=route_type, stop=stop,
+                                   route=route, trip=trip, route_pattern=route_pattern)
+    if paginate:
+        if format == "columns":
+            return to_columns(iterate_pages(urls.predictions_url(), prediction_params), "prediction")
+        elif json:
+            return iterate_pages(urls.predictions_url(), prediction_params)
+        return build_pages(urls.predictions_url(), prediction_params, PREDICTION)
+
+    json_response = get(urls.predictions_url(), prediction_params)
 
-    if json:
+    if format == "columns":
+        return to_columns(json_response["data"], "prediction")
+    elif json:
         return json_response
     else:
-        prediction_list = []
-        for json in json_response["data"]:
-            prediction_list.append(PREDICTION(json))
-        return prediction_list
+        return build_objects(json_response, PREDICTION)
+
+
+def stream_predictions(fields_prediction: list[str] | str = None,
+                       include: list[str] = None,
+                       latitude: str = None,
+                       longitude: str = None,
+                       radius: str = None,
+                       direction_id: str = None,
+                       route_type: list[str] | str = None,
+                       stop: list[str] | str = None,
+                       route: list[str] | str = None,
+                       trip: list[str] | str = None,
+                       route_pattern: list[str] | str = None,
+                       start: bool = True):
+    """Streams predictions from the API as server-sent events. A filter[] must be applied.
+    Default behavior returns a started Stream whose store holds a PREDICTION object for each prediction, kept up to
+    date as the API reports changes. Accepts all filter parameters that can be passed to the /predictions endpoint.
+
+    :param start: connect immediately. Otherwise, call start() on the returned Stream
+    """
+    filters = [latitude, longitude, radius, direction_id, route_type, stop, route, trip, route_pattern]
+    if filters.count(None) == len(filters):
+        raise ValueError("At least one filter[] must be present for predictions to be returned.")
+
+    if latitude and not longitude or longitude and not latitude:
+        raise ValueError("If setting latitude or longitude filters, both must be provided.")
+
+    prediction_params = set_params(fields_prediction=fields_prediction, include=include, latitude=latitude,
+                                   longitude=longitude, radius=radius, direction_id=direction_id,
+                                   route_type=route_type, stop=stop,
+                                   route=route, trip=trip, route_pattern=route_pattern)
+    prediction_stream = Stream(urls.predictions_url(), prediction_params, PREDICTION)
+
+    return prediction_stream.start() if start else prediction_stream
@@ -0,0 +1,106 @@
+from threading import Lock
+from time import monotonic, sleep, time
+import random
+
+# seconds to keep retrying a rate limited (429) request before raising TooManyRequestsError
+RETRY_DEADLINE = 30
+
+# most requests sent back to back once the rate limit is known; the rest are spread over the window
+BURST = 2
+
+# first and largest backoff between retries of a rate limited request, in seconds
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8
+
+
+class RateLimiter(object):
+    """Process-wide token bucket pacing requests to the MBTA API. Safe to share between threads and event loops.
+
+    The bucket starts unlimited and is sized from the x-ratelimit-remaining and x-ratelimit-reset headers of each
+    response, so the requests left in the current window are spread evenly until it resets rather than spent at once:
+    the bucket holds at most BURST tokens, refilled at the remaining requests over the time left."""
+
+    def __init__(self):
+        """Sets an unlimited bucket until the first response headers are seen"""
+        self.tokens = float("inf")
+        self.rate = float("inf")
+        self.capacity = float("inf")
+
+        self.__updated = monotonic()
+        self.__reset_at = float("inf")
+        self.__lock = Lock()
+
+    def __refill(self, now):
+        """Adds the tokens earned since the last refill, or refills the bucket once the window has reset"""
+        if now >= self.__reset_at:
+            self.tokens = self.capacity
+            self.rate = float("inf")
+            self.__reset_at = float("inf")
+        elif self.rate != float("inf"):
+            self.tokens = min(self.capacity, self.tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    def delay(self) -> float:
+        """Takes a token and returns how many seconds the caller must wait before sending its request"""
+        with self.__lock:
+            now = monotonic()
+            self.__refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            if self.rate > 0:
+                return min(-self.tokens / self.rate, self.__reset_at - now)
+            return self.__reset_at - now
+
+    def acquire(self):
+        """Blocks until a request may be sent"""
+        wait = self.delay()
+        if wait > 0:
+            sleep(wait)
+
+    def update(self, headers):
+        """Resizes the bucket from the rate limit headers of a response"""
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+
+        window = max(float(reset) - time(), 0.001)
+        with self.__lock:
+            now = monotonic()
+            self.__refill(now)
+            self.capacity = float(min(BURST, max(int(remaining), 0)))
+            self.rate = max(int(remaining), 0) / window
+            self.tokens = min(self.tokens, self.capacity)
+            self.__reset_at = now + window
+
+    def reset(self):
+        """Forgets the rate limit learned from responses"""
+        with self.__lock:
+            self.tokens = self.rate = self.capacity = float("inf")
+            self.__updated = monotonic()
+            self.__reset_at = float("inf")
+
+
+def backoff(attempt: int, headers=None) -> float:
+    """Returns the seconds to wait before retry number attempt of a rate limited request. Uses exponential backoff
+    with full jitter, but never waits less than the time left until the rate limit window resets."""
+    wait = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+    reset = headers.get("x-ratelimit-reset") if headers is not None else None
+    if reset is not None:
+        wait = max(wait, float(reset) - time())
+    return wait
+
+
+def retry_deadline() -> float:
+    """Returns the monotonic time after which a rate limited request is no longer retried"""
+    return monotonic() + RETRY_DEADLINE
+
+
+def can_retry(deadline: float, wait: float) -> bool:
+    """Returns whether waiting the given seconds still retries before the deadline"""
+    return monotonic() + wait <= deadline
+
+
+limiter = RateLimiter()
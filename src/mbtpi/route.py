@@ -1,21 +1,31 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from bulk import by_ids, Found
 
 
-class ROUTE(object):
+class ROUTE(Model):
     """Represents a MBTA route. Takes in json with 'id', 'type', 'links', 'relationships' keys, and 'attributes' list"""
+    __slots__ = ("stop", "line", "route_patterns")
+
+    route_type = Attribute("type")
+    text_color = Attribute()
+    sort_order = Attribute()
+    short_name = Attribute()
+    long_name = Attribute()
+    fare_class = Attribute()
+    direction_names = Attribute()
+    direction_destinations = Attribute()
+    description = Attribute()
+    color = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.links = json["links"]
-        self.id = json["id"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and long name of the route"""
         return self.id + ": " + self.long_name
@@ -29,18 +39,8 @@ class ROUTE(object):
         if "route_patterns" in json:
             self.route_patterns = json["route_patterns"]["data"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the route"""
-        self.route_type = json["type"]
-        self.text_color = json["text_color"]
-        self.sort_order = json["sort_order"]
-        self.short_name = json["short_name"]
-        self.long_name = json["long_name"]
-        self.fare_class = json["fare_class"]
-        self.direction_names = json["direction_names"]
-        self.direction_destinations = json["direction_destinations"]
-        self.description = json["description"]
-        self.color = json["color"]
+
+resource_types["route"] = ROUTE
 
 
 def routes(page_offset: int = None,
@@ -53,25 +53,34 @@ def routes(page_offset: int = None,
            direction_id: str = None,
            date: str = None,
            filter_id: list[str] | str = None,
+           only: list[str] = None,
+           paginate: bool = False,
            json: bool = False):
     """Makes a request to the API.
     Default behavior returns unsorted list of ROUTE objects containing all routes from API.
     Accepts all parameters that can be passed to the /routes endpoint.
 
     :param json: return JSON instead of ROUTE objects
+    :param only: names of the ROUTE fields to request. Sets fields_route to match and skips include
+    :param paginate: follow every page of results, lazily yielding ROUTE objects (or JSON) one at a time
     """
-    route_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                               fields_route=fields_route, include=include, stop=stop, type=type,
-                               direction_id=direction_id, date=date, filter_id=filter_id)
-    json_response = get(route_session, urls.route_url())
+    if only is not None:
+        fields_route, include = ROUTE.fields(only), None
+
+    route_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                              fields_route=fields_route, include=include, stop=stop, type=type,
+                              direction_id=direction_id, date=date, filter_id=filter_id)
+    if paginate:
+        if json:
+            return iterate_pages(urls.route_url(), route_params)
+        return build_pages(urls.route_url(), route_params, ROUTE)
+
+    json_response = get(urls.route_url(), route_params)
 
     if json:
         return json_response
     else:
-        routes = []
-        for json in json_response["data"]:
-            routes.append(ROUTE(json))
-        return routes
+        return build_objects(json_response, ROUTE)
 
 
 def route_by_id(route_id: str,
@@ -85,13 +94,26 @@ def route_by_id(route_id: str,
     :param route_id: id of route to return
     :param json: return JSON instead of ROUTE object
     """
-    route_session = set_params(session, fields_route=fields_route, include=include)
-    json_response = get(route_session, urls.route_by_id_url(route_id))
+    route_params = set_params(fields_route=fields_route, include=include)
+    json_response = get(urls.route_by_id_url(route_id), route_params)
 
     if json:
         return json_response
     else:
-        return ROUTE(json_response["data"])
+        return build_object(json_response, ROUTE)
+
+
+def routes_by_ids(route_ids: list[str] | str,
+                  fields_route: list[str] | str = None,
+                  include: list[str] = None) -> Found:
+    """Makes requests to the API for many routes at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of ROUTE objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param route_ids: ids of routes to return, as a list or comma-separated string
+    """
+    return by_ids(routes, "route", route_ids, fields_route=fields_route, include=include)
 
 
 def all_routes(json: bool = False):
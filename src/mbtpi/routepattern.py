@@ -1,22 +1,29 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import (set_params, get, iterate_pages, build_pages, build_objects, build_object,
+                        resource_types)
+from bulk import by_ids, Found
 
 
-class ROUTE_PATTERN(object):
+class ROUTE_PATTERN(Model):
     """Represents a MBTA route pattern. Takes in json with 'id', 'type', 'links', 'relationships' keys,
     and 'attributes' dict"""
+    __slots__ = ("route", "representative_trip")
+
+    canonical = Attribute()
+    direction_id = Attribute()
+    name = Attribute()
+    sort_order = Attribute()
+    time_desc = Attribute()
+    typicality = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.links = json["links"]
-        self.id = json["id"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and name of the route pattern"""
         return self.id + ": " + self.name
@@ -28,14 +35,8 @@ class ROUTE_PATTERN(object):
         if "representative_trip" in json:
             self.representative_trip = json["representative_trip"]["data"]["id"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the route pattern"""
-        self.canonical = json["canonical"]
-        self.direction_id = json["direction_id"]
-        self.name = json["name"]
-        self.sort_order = json["sort_order"]
-        self.time_desc = json["time_desc"]
-        self.typicality = json["typicality"]
+
+resource_types["route_pattern"] = ROUTE_PATTERN
 
 
 def route_patterns(page_offset: int = None,
@@ -48,25 +49,34 @@ def route_patterns(page_offset: int = None,
                    direction_id: str = None,
                    stop: list[str] | str = None,
                    canonical: bool = None,
+                   only: list[str] = None,
+                   paginate: bool = False,
                    json: bool = False):
     """Makes a request to the API.
     Default behavior returns unsorted list of ROUTE_PATTERN objects containing all route patterns from API.
     Accepts all parameters that can be passed to the /route_patterns endpoint.
 
     :param json: return JSON instead of ROUTE_PATTERN objects
+    :param only: names of the ROUTE_PATTERN fields to request. Sets fields_route_pattern to match and skips include
+    :param paginate: follow every page of results, lazily yielding ROUTE_PATTERN objects (or JSON) one at a time
     """
-    route_pattern_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                                       fields_route_pattern=fields_route_pattern, include=include, filter_id=filter_id,
-                                       route=route, direction_id=direction_id, stop=stop, canonical=canonical)
-    json_response = get(route_pattern_session, urls.route_pattern_url())
+    if only is not None:
+        fields_route_pattern, include = ROUTE_PATTERN.fields(only), None
+
+    route_pattern_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                                      fields_route_pattern=fields_route_pattern, include=include, filter_id=filter_id,
+                                      route=route, direction_id=direction_id, stop=stop, canonical=canonical)
+    if paginate:
+        if json:
+            return iterate_pages(urls.route_pattern_url(), route_pattern_params)
+        return build_pages(urls.route_pattern_url(), route_pattern_params, ROUTE_PATTERN)
+
+    json_response = get(urls.route_pattern_url(), route_pattern_params)
 
     if json:
         return json_response
     else:
-        route_patterns = []
-        for json in json_response["data"]:
-            route_patterns.append(ROUTE_PATTERN(json))
-        return route_patterns
+        return build_objects(json_response, ROUTE_PATTERN)
 
 
 def route_pattern_by_id(route_pattern_id: str,
@@ -80,13 +90,27 @@ def route_pattern_by_id(route_pattern_id: str,
     :param route_pattern_id: id of route pattern to return
     :param json: return JSON instead of ROUTE_PATTERN object
     """
-    route_pattern_session = set_params(session, fields_route_pattern=fields_route_pattern, include=include)
-    json_response = get(route_pattern_session, urls.route_pattern_by_id_url(route_pattern_id))
+    route_pattern_params = set_params(fields_route_pattern=fields_route_pattern, include=include)
+    json_response = get(urls.route_pattern_by_id_url(route_pattern_id), route_pattern_params)
 
     if json:
         return json_response
     else:
-        return ROUTE_PATTERN(json_response["data"])
+        return build_object(json_response, ROUTE_PATTERN)
+
+
+def route_patterns_by_ids(route_pattern_ids: list[str] | str,
+                          fields_route_pattern: list[str] | str = None,
+                          include: list[str] = None) -> Found:
+    """Makes requests to the API for many route patterns at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of ROUTE_PATTERN objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param route_pattern_ids: ids of route patterns to return, as a list or comma-separated string
+    """
+    return by_ids(route_patterns, "route_pattern", route_pattern_ids, fields_route_pattern=fields_route_pattern,
+                  include=include)
 
 
 def all_route_patterns(json: bool = False):
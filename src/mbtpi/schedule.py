@@ -1,24 +1,35 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, resource_types
+from columns import to_columns
 
 
-class SCHEDULE(object):
+class SCHEDULE(Model):
     """Represents a MBTA schedule. Takes in json with 'id', 'type' keys, 'relationships' and 'attributes' dict"""
+    __slots__ = ("trip", "stop", "route", "prediction")
+
+    timepoint = Attribute()
+    stop_sequence = Attribute()
+    stop_headsign = Attribute()
+    pickup_type = Attribute()
+    drop_off_type = Attribute()
+    direction_id = Attribute()
+    departure_time = Attribute()
+    arrival_time = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.id = json["id"]
+        super().__init__(json)
 
         if "relationships" in json:
-            self.relationships = json["relationships"]
-        self.__set_attributes(json["attributes"])
+            self.__set_relationships(json["relationships"])
 
     def __str__(self):
         """Returns the id and route of the schedule"""
-        return self.id + ": " + self.route
+        return self.id + ": " + getattr(self.route, "id", self.route)
 
     def __set_relationships(self, json):
+        """Sets each given relationship. A schedule without a prediction has a null 'prediction', set to None"""
         if "trip" in json:
             self.trip = json["trip"]["data"]["id"]
         if "stop" in json:
@@ -26,18 +37,11 @@ class SCHEDULE(object):
         if "route" in json:
             self.route = json["route"]["data"]["id"]
         if "prediction" in json:
-            self.prediction = json["prediction"]["data"]["id"]
+            data = json["prediction"]["data"]
+            self.prediction = data["id"] if data is not None else None
+
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the schedule"""
-        self.timepoint = json["timepoint"]
-        self.stop_sequence = json["stop_sequence"]
-        self.stop_headsign = json["stop_headsign"]
-        self.pickup_type = json["pickup_type"]
-        self.drop_off_type = json["drop_off_type"]
-        self.direction_id = json["direction_id"]
-        self.departure_time = json["departure_time"]
-        self.arrival_time = json["arrival_time"]
+resource_types["schedule"] = SCHEDULE
 
 
 def schedules(page_offset: int = None,
@@ -54,27 +58,43 @@ def schedules(page_offset: int = None,
               stop: list[str] | str = None,
               trip: list[str] | str = None,
               stop_sequence: str = None,
+              only: list[str] = None,
+              format: str = None,
+              paginate: bool = False,
               json: bool = False):
     """Makes a request to the API. A filter[] must be applied.
     Default behavior returns unsorted list of SCHEDULE objects containing all schedules from API.
     Accepts all parameters that can be passed to the /schedules endpoint.
 
     :param json: return JSON instead of SCHEDULE objects
+    :param only: names of the SCHEDULE fields to request. Sets fields_schedule to match and skips include
+    :param paginate: follow every page of results, lazily yielding SCHEDULE objects (or JSON) one at a time
+    :param format: "columns" to return a dict of NumPy arrays, one per field, instead of SCHEDULE objects.
+        With paginate, every page is read into the arrays
     """
     primary_filters = [route, stop, trip]
     if primary_filters.count(None) == len(primary_filters):
         raise ValueError("At least one route, stop, or trip filter[] must be present for predictions to be returned.")
 
-    schedule_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                                  fields_schedule=fields_schedule, include=include, date=date,
-                                  direction_id=direction_id, route_type=route_type, min_time=min_time,
-                                  max_time=max_time, route=route, stop=stop, trip=trip, stop_sequence=stop_sequence)
-    json_response = get(schedule_session, urls.schedules_url())
+    if only is not None:
+        fields_schedule, include = SCHEDULE.fields(only), None
+
+    schedule_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                                 fields_schedule=fields_schedule, include=include, date=date,
+                                 direction_id=direction_id, route_type=route_type, min_time=min_time,
+                                 max_time=max_time, route=route, stop=stop, trip=trip, stop_sequence=stop_sequence)
+    if paginate:
+        if format == "columns":
+            return to_columns(iterate_pages(urls.schedules_url(), schedule_params), "schedule")
+        elif json:
+            return iterate_pages(urls.schedules_url(), schedule_params)
+        return build_pages(urls.schedules_url(), schedule_params, SCHEDULE)
+
+    json_response = get(urls.schedules_url(), schedule_params)
 
-    if json:
+    if format == "columns":
+        return to_columns(json_response["data"], "schedule")
+    elif json:
         return json_response
     else:
-        schedule_list = []
-        for json in json_response["data"]:
-            schedule_list.append(SCHEDULE(json))
-        return schedule_list
+        return build_objects(json_response, SCHEDULE)
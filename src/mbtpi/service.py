@@ -1,42 +1,42 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from bulk import by_ids, Found
 
 
-class SERVICE(object):
+class SERVICE(Model):
     """Represents a MBTA service. Takes in json with 'id', 'links', 'type', 'relationships' keys,
     and 'attributes' dict"""
+    __slots__ = ("relationships",)
+
+    valid_days = Attribute()
+    start_date = Attribute()
+    schedule_typicality = Attribute()
+    schedule_type = Attribute()
+    schedule_name = Attribute()
+    removed_dates_notes = Attribute()
+    removed_dates = Attribute()
+    rating_start_date = Attribute()
+    rating_end_date = Attribute()
+    rating_description = Attribute()
+    end_date = Attribute()
+    description = Attribute()
+    added_dates_notes = Attribute()
+    added_dates = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.links = json["links"]
-        self.id = json["id"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.relationships = json["relationships"]
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and description of the service"""
         return self.id + ": " + self.description
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the service"""
-        self.valid_days = json["valid_days"]
-        self.start_date = json["start_date"]
-        self.schedule_typicality = json["schedule_typicality"]
-        self.schedule_type = json["schedule_type"]
-        self.schedule_name = json["schedule_name"]
-        self.removed_dates_notes = json["removed_dates_notes"]
-        self.removed_dates = json["removed_dates"]
-        self.rating_start_date = json["rating_start_date"]
-        self.rating_end_date = json["rating_end_date"]
-        self.rating_description = json["rating_description"]
-        self.end_date = json["end_date"]
-        self.description = json["description"]
-        self.added_dates_notes = json["added_dates_notes"]
-        self.added_dates = json["added_dates"]
+
+resource_types["service"] = SERVICE
 
 
 def services(page_offset: int = None,
@@ -45,28 +45,37 @@ def services(page_offset: int = None,
              fields_service: list[str] | str = None,
              filter_id: list[str] | str = None,
              route: list[str] | str = None,
+             only: list[str] = None,
+             paginate: bool = False,
              json: bool = False):
     """Makes a request to the API. A filter[] must be applied.
     Default behavior returns unsorted list of SERVICE objects containing all services from API.
     Accepts all parameters that can be passed to the /services endpoint.
 
     :param json: return JSON instead of SERVICE objects
+    :param only: names of the SERVICE fields to request. Sets fields_service to match
+    :param paginate: follow every page of results, lazily yielding SERVICE objects (or JSON) one at a time
     """
     filters = [filter_id, route]
     if filters.count(None) == len(filters):
         raise ValueError("At least one filter[] must be present for services to be returned.")
 
-    service_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                                 fields_service=fields_service, filter_id=filter_id, route=route)
-    json_response = get(service_session, urls.service_url())
+    if only is not None:
+        fields_service = SERVICE.fields(only)
+
+    service_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                                fields_service=fields_service, filter_id=filter_id, route=route)
+    if paginate:
+        if json:
+            return iterate_pages(urls.service_url(), service_params)
+        return build_pages(urls.service_url(), service_params, SERVICE)
+
+    json_response = get(urls.service_url(), service_params)
 
     if json:
         return json_response
     else:
-        services = []
-        for json in json_response["data"]:
-            services.append(SERVICE(json))
-        return services
+        return build_objects(json_response, SERVICE)
 
 
 def service_by_id(service_id: str,
@@ -79,10 +88,22 @@ def service_by_id(service_id: str,
     :param service_id: id of service to return
     :param json: return JSON instead of SERVICE object
     """
-    service_session = set_params(session, fields_service=fields_service)
-    json_response = get(service_session, urls.service_by_id_url(service_id))
+    service_params = set_params(fields_service=fields_service)
+    json_response = get(urls.service_by_id_url(service_id), service_params)
 
     if json:
         return json_response
     else:
-        return SERVICE(json_response["data"])
+        return build_object(json_response, SERVICE)
+
+
+def services_by_ids(service_ids: list[str] | str,
+                    fields_service: list[str] | str = None) -> Found:
+    """Makes requests to the API for many services at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of SERVICE objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param service_ids: ids of services to return, as a list or comma-separated string
+    """
+    return by_ids(services, "service", service_ids, fields_service=fields_service)
@@ -0,0 +1,16 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# time zone of the times in schedules and predictions. Only the modules working in service time import this one, so
+# the rest of the package needs no time zone database
+SERVICE_TIME_ZONE = ZoneInfo("America/New_York")
+
+# hour a service date starts at. Trips after midnight belong to the previous service date
+SERVICE_DAY_START = 3
+
+
+def service_date(now: datetime = None) -> date:
+    """Returns the service date running at a time, by default now, which starts at SERVICE_DAY_START rather than
+    midnight"""
+    now = (now or datetime.now(SERVICE_TIME_ZONE)).astimezone(SERVICE_TIME_ZONE)
+    return (now - timedelta(hours=SERVICE_DAY_START)).date()
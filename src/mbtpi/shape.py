@@ -1,25 +1,30 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from geometry import decode_polylines
 
 
-class SHAPE(object):
+class SHAPE(Model):
     """Represents a MBTA shape. Takes in json with 'id', 'type' keys, 'links' and 'attributes' dict"""
+    __slots__ = ("_points",)
 
-    def __init__(self, json):
-        """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.id = json["id"]
-        self.links = json["links"]
-
-        self.__set_attributes(json["attributes"])
+    polyline = Attribute()
 
     def __str__(self):
         """Returns the id of the shape"""
         return self.id
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the shape"""
-        self.polyline = json["polyline"]
+    @property
+    def points(self):
+        """Returns the decoded polyline as a (N, 2) NumPy array of [latitude, longitude] rows. Decoded on first
+        access and cached; use decode_shapes to decode many shapes at once"""
+        points = getattr(self, "_points", None)
+        if points is None:
+            points = self._points = decode_polylines([self.polyline or ""])[0]
+        return points
+
+
+resource_types["shape"] = SHAPE
 
 
 def shapes(route: list[str] | str,
@@ -27,24 +32,33 @@ def shapes(route: list[str] | str,
            page_limit: int = None,
            sort: str = None,
            fields_shape: list[str] | str = None,
+           only: list[str] = None,
+           paginate: bool = False,
            json: bool = False):
     """Makes a request to the API. A route filter[] must be applied.
     Default behavior returns unsorted list of SHAPE objects containing all shapes from API.
     Accepts all parameters that can be passed to the /shapes endpoint.
 
     :param json: return JSON instead of SHAPE objects
+    :param only: names of the SHAPE fields to request. Sets fields_shape to match
+    :param paginate: follow every page of results, lazily yielding SHAPE objects (or JSON) one at a time
     """
-    shape_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                               fields_shape=fields_shape, route=route)
-    json_response = get(shape_session, urls.shape_url())
+    if only is not None:
+        fields_shape = SHAPE.fields(only)
+
+    shape_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                              fields_shape=fields_shape, route=route)
+    if paginate:
+        if json:
+            return iterate_pages(urls.shape_url(), shape_params)
+        return build_pages(urls.shape_url(), shape_params, SHAPE)
+
+    json_response = get(urls.shape_url(), shape_params)
 
     if json:
         return json_response
     else:
-        shapes = []
-        for json in json_response["data"]:
-            shapes.append(SHAPE(json))
-        return shapes
+        return build_objects(json_response, SHAPE)
 
 
 def shape_by_id(shape_id: str,
@@ -57,10 +71,10 @@ def shape_by_id(shape_id: str,
     :param shape_id: id of shape to return
     :param json: return JSON instead of SHAPE object
     """
-    shape_session = set_params(session, fields_shape=fields_shape)
-    json_response = get(shape_session, urls.shape_by_id_url(shape_id))
+    shape_params = set_params(fields_shape=fields_shape)
+    json_response = get(urls.shape_by_id_url(shape_id), shape_params)
 
     if json:
         return json_response
     else:
-        return SHAPE(json_response["data"])
+        return build_object(json_response, SHAPE)
@@ -0,0 +1,157 @@
+from stop import all_stops
+from facility import all_facilities
+from math import cos, floor, radians, sqrt
+import heapq
+
+# meters per degree of latitude, and the side of a grid cell in meters
+METERS_PER_DEGREE = 111_320
+CELL_SIZE = 250
+
+
+class SpatialIndex(object):
+    """In-memory index of objects with a latitude and longitude, e.g. STOP or FACILITY objects, answering nearest and
+    radius queries locally.
+
+    Coordinates are projected onto a plane around the mean latitude of the objects and bucketed into a grid of
+    CELL_SIZE meter cells. The projection is accurate to well under a meter across a metro area; objects without
+    coordinates are left out."""
+
+    def __init__(self, objects, cell_size: float = CELL_SIZE):
+        """Builds the index
+
+        :param objects: iterable of objects with 'latitude' and 'longitude' fields
+        :param cell_size: side of a grid cell in meters. Roughly the typical query radius works best
+        """
+        located = [(float(obj.latitude), float(obj.longitude), obj) for obj in objects
+                   if obj.latitude is not None and obj.longitude is not None]
+
+        self.cell_size = cell_size
+        self.reference_latitude = sum(lat for lat, _, _ in located) / len(located) if located else 0.0
+        self.__x_scale = METERS_PER_DEGREE * cos(radians(self.reference_latitude))
+        self.__cells = {}
+        self.__size = len(located)
+
+        for lat, lon, obj in located:
+            x, y = self.__project(lat, lon)
+            self.__cells.setdefault(self.__cell(x, y), []).append((x, y, obj))
+
+        if self.__cells:
+            self.__min_x = min(cell[0] for cell in self.__cells)
+            self.__max_x = max(cell[0] for cell in self.__cells)
+            self.__min_y = min(cell[1] for cell in self.__cells)
+            self.__max_y = max(cell[1] for cell in self.__cells)
+
+    def __len__(self):
+        """Returns the number of indexed objects"""
+        return self.__size
+
+    def __project(self, lat: float, lon: float):
+        """Returns the point as (x, y) meters on the plane of the index"""
+        return lon * self.__x_scale, lat * METERS_PER_DEGREE
+
+    def __cell(self, x: float, y: float):
+        """Returns the grid cell containing the projected point"""
+        return floor(x / self.cell_size), floor(y / self.cell_size)
+
+    def __ring(self, cx: int, cy: int, r: int):
+        """Yields the entries of the cells at Chebyshev distance r from cell (cx, cy), visiting only the cells inside
+        the extent of the index"""
+        cells = self.__cells
+        if r == 0:
+            yield from cells.get((cx, cy), ())
+            return
+        xs = range(max(cx - r, self.__min_x), min(cx + r, self.__max_x) + 1)
+        for y in (cy - r, cy + r):
+            if self.__min_y <= y <= self.__max_y:
+                for x in xs:
+                    yield from cells.get((x, y), ())
+        ys = range(max(cy - r + 1, self.__min_y), min(cy + r - 1, self.__max_y) + 1)
+        for x in (cx - r, cx + r):
+            if self.__min_x <= x <= self.__max_x:
+                for y in ys:
+                    yield from cells.get((x, y), ())
+
+    def nearest(self, lat: float, lon: float, k: int = 1, distances: bool = False) -> list:
+        """Returns the k objects closest to the point, nearest first
+
+        :param lat: latitude of the point
+        :param lon: longitude of the point
+        :param k: number of objects to return, fewer if the index holds fewer
+        :param distances: return (meters, object) tuples instead of objects
+        """
+        if k <= 0 or not self.__cells:
+            return []
+
+        x, y = self.__project(lat, lon)
+        cx, cy = self.__cell(x, y)
+        # rings before the first reach no cell of the extent, and rings past the last hold no cells
+        first = max(self.__min_x - cx, cx - self.__max_x, self.__min_y - cy, cy - self.__max_y, 0)
+        last = max(cx - self.__min_x, self.__max_x - cx, cy - self.__min_y, self.__max_y - cy)
+
+        best = []  # max-heap of (-squared distance, tiebreak, object)
+        tiebreak = 0
+        for r in range(first, last + 1):
+            for px, py, obj in self.__ring(cx, cy, r):
+                d = (px - x) ** 2 + (py - y) ** 2
+                tiebreak += 1
+                if len(best) < k:
+                    heapq.heappush(best, (-d, tiebreak, obj))
+                elif d < -best[0][0]:
+                    heapq.heapreplace(best, (-d, tiebreak, obj))
+            # everything in ring r + 1 is at least r cells away along one axis
+            if len(best) == k and -best[0][0] <= (r * self.cell_size) ** 2:
+                break
+
+        found = sorted((-d, tiebreak, obj) for d, tiebreak, obj in best)
+        if distances:
+            return [(sqrt(d), obj) for d, _, obj in found]
+        return [obj for _, _, obj in found]
+
+    def within(self, lat: float, lon: float, radius: float, distances: bool = False) -> list:
+        """Returns every object within radius meters of the point, nearest first
+
+        :param lat: latitude of the point
+        :param lon: longitude of the point
+        :param radius: distance from the point in meters
+        :param distances: return (meters, object) tuples instead of objects
+        """
+        if not self.__cells:
+            return []
+
+        # cells of the radius box, clamped to the extent of the index
+        x, y = self.__project(lat, lon)
+        min_cx, min_cy = self.__cell(x - radius, y - radius)
+        max_cx, max_cy = self.__cell(x + radius, y + radius)
+        min_cx, min_cy = max(min_cx, self.__min_x), max(min_cy, self.__min_y)
+        max_cx, max_cy = min(max_cx, self.__max_x), min(max_cy, self.__max_y)
+        limit = radius * radius
+
+        found = []
+        cells = self.__cells
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                for px, py, obj in cells.get((cx, cy), ()):
+                    d = (px - x) ** 2 + (py - y) ** 2
+                    if d <= limit:
+                        found.append((d, len(found), obj))
+
+        found.sort()
+        if distances:
+            return [(sqrt(d), obj) for d, _, obj in found]
+        return [obj for _, _, obj in found]
+
+
+def stop_index(cell_size: float = CELL_SIZE) -> SpatialIndex:
+    """Makes a request to the API for all stops and returns a SpatialIndex over them
+
+    :param cell_size: side of a grid cell in meters
+    """
+    return SpatialIndex(all_stops(), cell_size)
+
+
+def facility_index(cell_size: float = CELL_SIZE) -> SpatialIndex:
+    """Makes a request to the API for all facilities and returns a SpatialIndex over them
+
+    :param cell_size: side of a grid cell in meters
+    """
+    return SpatialIndex(all_facilities(), cell_size)
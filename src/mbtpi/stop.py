@@ -1,21 +1,35 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from bulk import by_ids, Found
+from columns import to_columns
 
 
-class STOP(object):
+class STOP(Model):
     """Represents a MBTA stop. Takes in json with 'id', 'type' keys, 'links', 'relationships' and 'attributes' dict"""
+    __slots__ = ("child_stops", "connecting_stops", "facilities", "parent_station", "route")
+
+    wheelchair_boarding = Attribute()
+    vehicle_type = Attribute()
+    platform_name = Attribute()
+    platform_code = Attribute()
+    on_street = Attribute()
+    name = Attribute()
+    municipality = Attribute()
+    longitude = Attribute()
+    location_type = Attribute()
+    latitude = Attribute()
+    description = Attribute()
+    at_street = Attribute()
+    address = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.id = json["id"]
-        self.links = json["links"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and name of the stop, and a line/route description"""
         return self.id + ": " + self.name + " " + self.description
@@ -29,31 +43,18 @@ class STOP(object):
         if "facilities" in json:
             self.facilities = json["facilities"]["data"]
         if "parent_station" in json:
-            self.route = json["parent_station"]["data"]["id"]
+            self.parent_station = json["parent_station"]["data"]["id"]
         if "route" in json:
             self.route = json["route"]["data"]["id"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the stop"""
-        self.wheelchair_boarding = json["wheelchair_boarding"]
-        self.vehicle_type = json["vehicle_type"]
-        self.platform_name = json["platform_name"]
-        self.platform_code = json["platform_code"]
-        self.on_street = json["on_street"]
-        self.name = json["name"]
-        self.municipality = json["municipality"]
-        self.longitude = json["longitude"]
-        self.location_type = json["location_type"]
-        self.latitude = json["latitude"]
-        self.description = json["description"]
-        self.at_street = json["at_street"]
-        self.address = json["address"]
-
     def coordinates(self) -> list[float]:
         """Returns the [latitude, longitude] of the stop"""
         return [float(self.latitude), float(self.longitude)]
 
 
+resource_types["stop"] = STOP
+
+
 def stops(page_offset: int = None,
           page_limit: int = None,
           sort: str = None,
@@ -69,26 +70,42 @@ def stops(page_offset: int = None,
           route: list[str] | str = None,
           service: list[str] | str = None,
           location_type: list[str] | str = None,
+          only: list[str] = None,
+          format: str = None,
+          paginate: bool = False,
           json: bool = None):
     """Makes a request to the API.
     Default behavior returns unsorted list of STOP objects containing all stops from API.
     Accepts all parameters that can be passed to the /stops endpoint.
 
     :param json: return JSON instead of STOP objects
+    :param only: names of the STOP fields to request. Sets fields_stop to match and skips include
+    :param paginate: follow every page of results, lazily yielding STOP objects (or JSON) one at a time
+    :param format: "columns" to return a dict of NumPy arrays, one per field, instead of STOP objects.
+        With paginate, every page is read into the arrays
     """
-    stop_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                              fields_stop=fields_stop, include=include, date=date, direction_id=direction_id,
-                              latitude=latitude, longitude=longitude, radius=radius, filter_id=filter_id,
-                              route_type=route_type, route=route, service=service, location_type=location_type)
-    json_response = get(stop_session, urls.stop_url())
-
-    if json:
+    if only is not None:
+        fields_stop, include = STOP.fields(only), None
+
+    stop_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                             fields_stop=fields_stop, include=include, date=date, direction_id=direction_id,
+                             latitude=latitude, longitude=longitude, radius=radius, filter_id=filter_id,
+                             route_type=route_type, route=route, service=service, location_type=location_type)
+    if paginate:
+        if format == "columns":
+            return to_columns(iterate_pages(urls.stop_url(), stop_params), "stop")
+        elif json:
+            return iterate_pages(urls.stop_url(), stop_params)
+        return build_pages(urls.stop_url(), stop_params, STOP)
+
+    json_response = get(urls.stop_url(), stop_params)
+
+    if format == "columns":
+        return to_columns(json_response["data"], "stop")
+    elif json:
         return json_response
     else:
-        stops = []
-        for json in json_response["data"]:
-            stops.append(STOP(json))
-        return stops
+        return build_objects(json_response, STOP)
 
 
 def stop_by_id(stop_id: str,
@@ -102,13 +119,26 @@ def stop_by_id(stop_id: str,
     :param stop_id: id of stop to return
     :param json: return JSON instead of STOP object
     """
-    stop_session = set_params(session, fields_stop=fields_stop, include=include)
-    json_response = get(stop_session, urls.stop_by_id_url(stop_id))
+    stop_params = set_params(fields_stop=fields_stop, include=include)
+    json_response = get(urls.stop_by_id_url(stop_id), stop_params)
 
     if json:
         return json_response
     else:
-        return STOP(json_response["data"])
+        return build_object(json_response, STOP)
+
+
+def stops_by_ids(stop_ids: list[str] | str,
+                 fields_stop: list[str] | str = None,
+                 include: list[str] = None) -> Found:
+    """Makes requests to the API for many stops at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of STOP objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param stop_ids: ids of stops to return, as a list or comma-separated string
+    """
+    return by_ids(stops, "stop", stop_ids, fields_stop=fields_stop, include=include)
 
 
 def all_stops(json: bool = False):
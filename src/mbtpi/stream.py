@@ -0,0 +1,165 @@
+from urls import get_session
+import universals
+from threading import Event, Lock, Thread
+import socket
+
+# seconds to wait for an event before reconnecting, and before retrying a dropped connection
+READ_TIMEOUT = 60
+RECONNECT_DELAY = 1
+
+
+class Stream(object):
+    """Keeps an in-memory store of objects up to date from a server-sent event stream of the MBTA API.
+
+    The API answers requests with an 'Accept: text/event-stream' header with 'reset', 'add', 'update' and 'remove'
+    events. Each event is applied to the store, then passed to every subscribed callback as (event, objects).
+
+    Resources of other types sent because the request has an include are kept apart in included, keyed by
+    (type, id) and built into their own classes, so that the store only ever holds objects of the streamed type."""
+
+    def __init__(self, path: str, params: dict, cls):
+        """Stores the request to stream and the class objects are built with. Call start() to connect.
+
+        :param path: url of the endpoint to stream
+        :param params: params of the request, as returned by set_params
+        :param cls: class each resource is built into, e.g. VEHICLE
+        """
+        self.path = path
+        self.params = params
+        self.cls = cls
+        self.type = next((name for name, value in universals.resource_types.items() if value is cls), None)
+        self.store = {}
+        self.included = {}
+        self.error = None
+
+        self.__callbacks = []
+        self.__lock = Lock()
+        self.__stopped = Event()
+        self.__response = None
+        self.__thread = None
+
+    def __len__(self):
+        """Returns the number of objects in the store"""
+        return len(self.store)
+
+    def subscribe(self, callback):
+        """Registers callback(event, objects) to be called after each event is applied to the store. 'objects' is
+        every object in the store for 'reset', and the added, updated or removed object for the other events."""
+        self.__callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """Removes a callback registered with subscribe"""
+        self.__callbacks.remove(callback)
+
+    def objects(self) -> list:
+        """Returns a snapshot of every object in the store"""
+        with self.__lock:
+            return list(self.store.values())
+
+    def start(self):
+        """Connects to the stream on a background thread, reconnecting whenever the connection drops"""
+        if self.__thread is not None and self.__thread.is_alive():
+            return self
+
+        self.__stopped.clear()
+        self.__thread = Thread(target=self.__run, name="mbtpi-stream", daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """Closes the stream and waits for the background thread to finish"""
+        self.__stopped.set()
+        response = self.__response
+        if response is not None:
+            # shutting the socket down unblocks the read the background thread is waiting on
+            sock = getattr(getattr(response.raw, "connection", None), "sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            response.close()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def apply(self, event: str, data):
+        """Applies a single event with its decoded JSON data to the store and notifies subscribers"""
+        with self.__lock:
+            if event == "reset":
+                self.store = {}
+                self.included = {}
+                for resource in data:
+                    if self.__own(resource):
+                        self.store[resource["id"]] = self.cls(resource)
+                    else:
+                        self.__include(resource)
+                objects = list(self.store.values())
+            elif event == "add" or event == "update":
+                if not self.__own(data):
+                    self.__include(data)
+                    return
+                obj = self.cls(data)
+                self.store[obj.id] = obj
+                objects = [obj]
+            elif event == "remove":
+                if not self.__own(data):
+                    self.included.pop((data.get("type"), data["id"]), None)
+                    return
+                obj = self.store.pop(data["id"], None)
+                objects = [obj] if obj is not None else []
+            else:
+                return
+
+        for callback in list(self.__callbacks):
+            callback(event, objects)
+
+    def __own(self, resource) -> bool:
+        """Returns whether a resource is of the streamed type rather than included with it"""
+        return self.type is None or resource.get("type", self.type) == self.type
+
+    def __include(self, resource):
+        """Keeps an included resource, built into the class registered for its type if there is one"""
+        cls = universals.resource_types.get(resource["type"])
+        self.included[(resource["type"], resource["id"])] = cls(resource) if cls is not None else resource
+
+    def __run(self):
+        """Reads events from the stream until stopped"""
+        while not self.__stopped.is_set():
+            try:
+                self.__response = get_session().get(self.path, params=self.params, stream=True,
+                                                    timeout=READ_TIMEOUT, headers={"Accept": "text/event-stream"})
+                with self.__response:
+                    self.__response.raise_for_status()
+                    self.error = None
+                    lines = self.__response.iter_lines(chunk_size=None, decode_unicode=True)
+                    for event, data in read_events(lines):
+                        self.apply(event, universals.decoder(data))
+            except Exception as error:
+                if self.__stopped.is_set():
+                    break
+                self.error = error
+            self.__stopped.wait(RECONNECT_DELAY)
+        self.__response = None
+
+
+def read_events(lines):
+    """Yields (event, data) for each event in an iterable of server-sent event lines"""
+    event = None
+    data = []
+    for line in lines:
+        if not line:
+            if event is not None and data:
+                yield event, "\n".join(data)
+            event = None
+            data = []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
@@ -0,0 +1,193 @@
+from schedule import SCHEDULE, schedules
+from servicetime import SERVICE_TIME_ZONE, service_date
+from universals import related_id
+from array import array
+from bisect import bisect_left
+from datetime import date as Date, datetime
+from heapq import merge
+from itertools import islice
+from operator import attrgetter, itemgetter
+from threading import Lock
+
+
+def epoch(value) -> float:
+    """Returns a datetime, or a datetime without a time zone taken as service time, as seconds since the epoch.
+    Numbers are returned as they are."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=SERVICE_TIME_ZONE)
+        return value.timestamp()
+    return float(value)
+
+
+class ServiceDay(object):
+    """Schedules of one service date, indexed for lookups: the stops of each trip ordered by stop sequence, and the
+    departures from each stop as an array of epoch seconds sorted alongside the SCHEDULE objects"""
+    __slots__ = ("date", "trips", "stops", "visits")
+
+    def __init__(self, date: str, rows: list[SCHEDULE]):
+        """Indexes the schedules. Each distinct time string is parsed once.
+
+        :param date: service date of the schedules, as YYYY-MM-DD
+        :param rows: every schedule of the date for the filters of the index
+        """
+        self.date = date
+        self.trips = {}
+        self.visits = {}
+        departures = {}
+        parsed = {}
+        for schedule in rows:
+            trip = related_id(schedule, "trip")
+            stop = related_id(schedule, "stop")
+            self.trips.setdefault(trip, []).append(schedule)
+            self.visits.setdefault((trip, stop), schedule)
+
+            time = schedule.departure_time
+            if time is None:
+                continue
+            seconds = parsed.get(time)
+            if seconds is None:
+                seconds = parsed[time] = datetime.fromisoformat(time).timestamp()
+            departures.setdefault(stop, []).append((seconds, schedule))
+
+        for stop_times in self.trips.values():
+            stop_times.sort(key=attrgetter("stop_sequence"))
+
+        self.stops = {}
+        for stop, stop_departures in departures.items():
+            stop_departures.sort(key=itemgetter(0))
+            self.stops[stop] = (array("d", [row[0] for row in stop_departures]),
+                                [row[1] for row in stop_departures])
+
+    def __len__(self):
+        """Returns the number of trips"""
+        return len(self.trips)
+
+    def departures(self, stop_id: str, start: float, end: float = None):
+        """Yields (epoch seconds, SCHEDULE) for the departures from a stop at or after start, and before end if given,
+        in time order"""
+        entry = self.stops.get(stop_id)
+        if entry is None:
+            return
+        times, rows = entry
+        last = len(times) if end is None else bisect_left(times, end)
+        for index in range(bisect_left(times, start), last):
+            yield times[index], rows[index]
+
+
+class ScheduleIndex(object):
+    """Schedules of one or more service dates, pulled in one request per date and indexed for lookups that would
+    otherwise scan the rows and parse their times on every question.
+
+    Each trip keeps its schedules ordered by stop sequence, and each stop its departures sorted by time as epoch
+    seconds, so the next departures after a time are found by bisection in O(log n). Dates are loaded, refreshed and
+    dropped independently: refresh() rebuilds a date off to the side and swaps it in, so lookups never wait on a
+    request."""
+
+    def __init__(self, **filters):
+        """Creates an empty index. Call load() for each service date to cover.
+
+        :param filters: parameters passed to schedules() for every date, which needs a route, stop or trip filter,
+            e.g. route="Red,Orange"
+        """
+        self.filters = filters
+        self.days = {}
+        self.__lock = Lock()
+
+    def __len__(self):
+        """Returns the number of service dates loaded"""
+        return len(self.days)
+
+    @property
+    def dates(self) -> list[str]:
+        """Returns the service dates loaded, in order"""
+        return sorted(self.days)
+
+    def load(self, date: Date | str = None) -> ServiceDay:
+        """Makes a request to the API for the schedules of a service date and indexes them, replacing the date if
+        it was already loaded
+
+        :param date: service date, as a date or YYYY-MM-DD. Defaults to the service date running now
+        """
+        date = str(date or service_date())
+        day = ServiceDay(date, schedules(date=date, **self.filters))
+        with self.__lock:
+            days = dict(self.days)
+            days[date] = day
+            self.days = days
+        return day
+
+    def refresh(self, dates: list[Date | str] = None):
+        """Reloads service dates, by default every date loaded"""
+        for date in dates if dates is not None else self.dates:
+            self.load(date)
+
+    def drop(self, before: Date | str):
+        """Forgets the service dates earlier than a date, e.g. the current service date once the previous ended"""
+        before = str(before)
+        with self.__lock:
+            self.days = {date: day for date, day in self.days.items() if date >= before}
+
+    def __day(self, trip_id: str, date):
+        """Returns the service day of the given date, or the first loaded one running the trip"""
+        days = self.days
+        if date is not None:
+            return days.get(str(date))
+        for key in sorted(days):
+            if trip_id in days[key].trips:
+                return days[key]
+        return None
+
+    def trip(self, trip_id: str, date: Date | str = None) -> list[SCHEDULE]:
+        """Returns the schedules of a trip ordered by stop sequence, or an empty list if it isn't loaded
+
+        :param date: service date to look in. Defaults to the first date loaded running the trip
+        """
+        day = self.__day(trip_id, date)
+        return list(day.trips.get(trip_id, ())) if day is not None else []
+
+    def at(self, trip_id: str, stop_id: str, date: Date | str = None) -> SCHEDULE:
+        """Returns the schedule of a trip at a stop, the first visit if the trip stops there twice, or None
+
+        :param date: service date to look in. Defaults to the first date loaded running the trip
+        """
+        day = self.__day(trip_id, date)
+        return day.visits.get((trip_id, stop_id)) if day is not None else None
+
+    def departures(self, stop_ids: list[str] | str, start=None, end=None, count: int = None) -> list[SCHEDULE]:
+        """Returns the departures from stops at or after a time in time order, across every date loaded
+
+        :param stop_ids: stop ids, as a list or comma-separated string
+        :param start: datetime or epoch seconds to search from. Defaults to now
+        :param end: datetime or epoch seconds to stop before, if any
+        :param count: most departures to return, if any
+        """
+        if isinstance(stop_ids, str):
+            stop_ids = stop_ids.split(",")
+        start = epoch(start) if start is not None else datetime.now(SERVICE_TIME_ZONE).timestamp()
+        end = epoch(end) if end is not None else None
+
+        streams = [day.departures(stop_id, start, end) for day in self.days.values() for stop_id in stop_ids]
+        rows = merge(*streams, key=itemgetter(0))
+        return [row[1] for row in islice(rows, count)]
+
+    def next_departure(self, stop_ids: list[str] | str, after=None) -> SCHEDULE:
+        """Returns the first departure from stops at or after a time, or None
+
+        :param stop_ids: stop ids, as a list or comma-separated string
+        :param after: datetime or epoch seconds to search from. Defaults to now
+        """
+        found = self.departures(stop_ids, after, count=1)
+        return found[0] if found else None
+
+
+def schedule_index(dates: list[Date | str] = None, **filters) -> ScheduleIndex:
+    """Makes a request to the API for the schedules of each service date matching the filters.
+    Default behavior returns a ScheduleIndex of the service date running now; call refresh() on it to reload.
+
+    :param dates: service dates to load, as dates or YYYY-MM-DD
+    :param filters: parameters passed to schedules(), which needs a route, stop or trip filter, e.g. route="Red"
+    """
+    index = ScheduleIndex(**filters)
+    index.refresh(dates if dates is not None else [service_date()])
+    return index
@@ -0,0 +1,140 @@
+from vehicle import VEHICLE, vehicles
+from universals import related_id
+from threading import Lock
+
+# relationships of a vehicle kept in secondary indexes
+INDEXES = ("route", "trip", "stop")
+
+
+class Delta(object):
+    """Changes made to a VehicleTracker by one snapshot: the VEHICLE objects added, updated and removed"""
+    __slots__ = ("added", "updated", "removed")
+
+    def __init__(self):
+        """Starts with no changes"""
+        self.added = []
+        self.updated = []
+        self.removed = []
+
+    def __bool__(self):
+        """Returns whether anything changed"""
+        return bool(self.added or self.updated or self.removed)
+
+    def __str__(self):
+        """Returns the number of each kind of change"""
+        return "+%d ~%d -%d" % (len(self.added), len(self.updated), len(self.removed))
+
+
+class VehicleTracker(object):
+    """Live store of VEHICLE objects keyed by id, updated in place from successive snapshots of the /vehicles
+    endpoint.
+
+    Each snapshot is compared against the store by id and updated_at: unchanged vehicles are skipped without building
+    an object, changed vehicles are refreshed in the same VEHICLE object, and vehicles missing from the snapshot are
+    removed. Vehicles are also indexed by route, trip and stop id, kept current with every change."""
+
+    def __init__(self, **filters):
+        """Creates an empty tracker. Call update() to poll the API, or apply() to load a snapshot.
+
+        :param filters: parameters passed to vehicles() on every update(), e.g. route="Red"
+        """
+        self.filters = filters
+        self.vehicles = {}
+        self.indexes = {name: {} for name in INDEXES}
+
+        self.__callbacks = []
+        self.__lock = Lock()
+
+    def __len__(self):
+        """Returns the number of vehicles tracked"""
+        return len(self.vehicles)
+
+    def subscribe(self, callback):
+        """Registers callback(delta) to be called after each snapshot that changed anything"""
+        self.__callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """Removes a callback registered with subscribe"""
+        self.__callbacks.remove(callback)
+
+    def update(self) -> Delta:
+        """Makes a request to the API for the current vehicles and applies them as a snapshot"""
+        return self.apply(vehicles(json=True, **self.filters)["data"])
+
+    def apply(self, resources) -> Delta:
+        """Applies a full snapshot of vehicle JSON, e.g. the 'data' of a /vehicles response, and returns the changes
+
+        :param resources: every vehicle currently reported; tracked vehicles not in it are removed
+        """
+        delta = Delta()
+        with self.__lock:
+            seen = set()
+            for resource in resources:
+                vehicle_id = resource["id"]
+                seen.add(vehicle_id)
+                obj = self.vehicles.get(vehicle_id)
+                if obj is None:
+                    obj = self.vehicles[vehicle_id] = VEHICLE(resource)
+                    self.__index(obj)
+                    delta.added.append(obj)
+                    continue
+
+                updated_at = resource.get("attributes", {}).get("updated_at")
+                if updated_at is not None and updated_at == obj.updated_at:
+                    continue
+                self.__unindex(obj)
+                # relationships missing from the new JSON must not keep their old values
+                for name in VEHICLE.__slots__:
+                    if hasattr(obj, name):
+                        delattr(obj, name)
+                obj.__init__(resource)
+                self.__index(obj)
+                delta.updated.append(obj)
+
+            if len(seen) < len(self.vehicles):
+                for vehicle_id in [vehicle_id for vehicle_id in self.vehicles if vehicle_id not in seen]:
+                    obj = self.vehicles.pop(vehicle_id)
+                    self.__unindex(obj)
+                    delta.removed.append(obj)
+
+        if delta:
+            for callback in list(self.__callbacks):
+                callback(delta)
+        return delta
+
+    def __index(self, obj):
+        """Adds the vehicle to the index of each of its relationships"""
+        for name, index in self.indexes.items():
+            key = related_id(obj, name)
+            if key is not None:
+                index.setdefault(key, {})[obj.id] = obj
+
+    def __unindex(self, obj):
+        """Removes the vehicle from the index of each of its relationships"""
+        for name, index in self.indexes.items():
+            key = related_id(obj, name)
+            entries = index.get(key)
+            if entries is not None:
+                entries.pop(obj.id, None)
+                if not entries:
+                    del index[key]
+
+    def vehicle(self, vehicle_id: str) -> VEHICLE:
+        """Returns the tracked vehicle with the given id, or None"""
+        return self.vehicles.get(vehicle_id)
+
+    def on_route(self, route_id: str) -> list[VEHICLE]:
+        """Returns the tracked vehicles on the route"""
+        with self.__lock:
+            return list(self.indexes["route"].get(route_id, {}).values())
+
+    def on_trip(self, trip_id: str) -> list[VEHICLE]:
+        """Returns the tracked vehicles serving the trip"""
+        with self.__lock:
+            return list(self.indexes["trip"].get(trip_id, {}).values())
+
+    def at_stop(self, stop_id: str) -> list[VEHICLE]:
+        """Returns the tracked vehicles at or approaching the stop"""
+        with self.__lock:
+            return list(self.indexes["stop"].get(stop_id, {}).values())
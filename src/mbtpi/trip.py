@@ -1,19 +1,26 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from bulk import by_ids, Found
 
 
-class TRIP(object):
+class TRIP(Model):
     """Represents a MBTA trip. Takes in json with 'id', 'type' keys, 'links', 'relationships' and 'attributes' dict"""
+    __slots__ = ("route", "vehicle", "service", "shape", "predictions", "route_pattern", "stops", "occupancy")
+
+    wheelchair_accessible = Attribute()
+    name = Attribute()
+    headsign = Attribute()
+    direction_id = Attribute()
+    block_id = Attribute()
+    bikes_allowed = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.id = json["id"]
-        self.links = json["links"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
-        self.__set_attributes(json["attributes"])
 
     def __str__(self):
         """Returns the id and name of the trip, and the headsign"""
@@ -40,14 +47,8 @@ class TRIP(object):
         if "occupancy" in json:
             self.occupancy = json["occupancy"]["data"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the trip"""
-        self.wheelchair_accessible = json["wheelchair_accessible"]
-        self.name = json["name"]
-        self.headsign = json["headsign"]
-        self.direction_id = json["direction_id"]
-        self.block_id = json["block_id"]
-        self.bikes_allowed = json["bikes_allowed"]
+
+resource_types["trip"] = TRIP
 
 
 def trips(page_offset: int = None,
@@ -61,30 +62,39 @@ def trips(page_offset: int = None,
           route_pattern: list[str] | str = None,
           filter_id: list[str] | str = None,
           name: list[str] | str = None,
+          only: list[str] = None,
+          paginate: bool = False,
           json: bool = False):
     """Makes a request to the API. At least one id, route, route_pattern, or name filter[] must be applied.
     Default behavior returns unsorted list of TRIP objects containing all trips from API.
     Accepts all parameters that can be passed to the /trips endpoint.
 
     :param json: return JSON instead of TRIP objects
+    :param only: names of the TRIP fields to request. Sets fields_trip to match and skips include
+    :param paginate: follow every page of results, lazily yielding TRIP objects (or JSON) one at a time
     """
     primary_filters = [filter_id, route, route_pattern, name]
     if primary_filters.count(None) == len(primary_filters):
         raise ValueError(
             "At least one id, route, route_pattern, or name filter[] must be present for trips to be returned.")
 
-    trip_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                              fields_trip=fields_trip, include=include, date=date, direction_id=direction_id,
-                              route=route, route_pattern=route_pattern, filter_id=filter_id, name=name)
-    json_response = get(trip_session, urls.trip_url())
+    if only is not None:
+        fields_trip, include = TRIP.fields(only), None
+
+    trip_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                             fields_trip=fields_trip, include=include, date=date, direction_id=direction_id,
+                             route=route, route_pattern=route_pattern, filter_id=filter_id, name=name)
+    if paginate:
+        if json:
+            return iterate_pages(urls.trip_url(), trip_params)
+        return build_pages(urls.trip_url(), trip_params, TRIP)
+
+    json_response = get(urls.trip_url(), trip_params)
 
     if json:
         return json_response
     else:
-        trips = []
-        for json in json_response["data"]:
-            trips.append(TRIP(json))
-        return trips
+        return build_objects(json_response, TRIP)
 
 
 def trip_by_id(trip_id: str,
@@ -98,10 +108,23 @@ def trip_by_id(trip_id: str,
     :param trip_id: id of trip to return
     :param json: return JSON instead of TRIP object
     """
-    trip_session = set_params(session, fields_trip=fields_trip, include=include)
-    json_response = get(trip_session, urls.trip_by_id_url(trip_id))
+    trip_params = set_params(fields_trip=fields_trip, include=include)
+    json_response = get(urls.trip_by_id_url(trip_id), trip_params)
 
     if json:
         return json_response
     else:
-        return TRIP(json_response["data"])
+        return build_object(json_response, TRIP)
+
+
+def trips_by_ids(trip_ids: list[str] | str,
+                 fields_trip: list[str] | str = None,
+                 include: list[str] = None) -> Found:
+    """Makes requests to the API for many trips at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of TRIP objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param trip_ids: ids of trips to return, as a list or comma-separated string
+    """
+    return by_ids(trips, "trip", trip_ids, fields_trip=fields_trip, include=include)
@@ -18,22 +18,85 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from urls import MBTA_API_KEY
+from urls import api_key, client
+from ratelimit import limiter, backoff, retry_deadline, can_retry
+import diskcache
+import memcache
+import instrument
 from errors import BadRequestError, ForbiddenError, NotFoundError, NotAcceptableError, TooManyRequestsError
-from os import environ
-from dotenv import load_dotenv
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter, sleep
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+import json as jsonlib
 
-load_dotenv()
-OK = int(environ.get('OK'))
-BAD_REQUEST = int(environ.get('BAD_REQUEST'))
-FORBIDDEN = int(environ.get('FORBIDDEN'))
-NOT_FOUND = int(environ.get('NOT_FOUND'))
-NOT_ACCEPTABLE = int(environ.get('NOT_ACCEPTABLE'))
-TOO_MANY_REQUESTS = int(environ.get('TOO_MANY_REQUESTS'))
+# HTTP status codes of API responses
+OK = 200
+NOT_MODIFIED = 304
+BAD_REQUEST = 400
+FORBIDDEN = 403
+NOT_FOUND = 404
+NOT_ACCEPTABLE = 406
+TOO_MANY_REQUESTS = 429
 
+# page size used when paginating without an explicit page_limit
+DEFAULT_PAGE_LIMIT = 100
 
-def set_params(session,
-               page_offset: int = None,
+# longest comma-joined id list per filtered request, which keeps request URLs well under the limits of servers and
+# proxies
+MAX_FILTER_LENGTH = 2000
+
+# fetches the next page of a paginated request while the current one is being consumed
+prefetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mbtpi-prefetch")
+
+
+def default_decoder():
+    """Returns the fastest available function decoding a JSON response body: orjson if installed, then msgspec, then
+    the standard library"""
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        return msgspec.json.Decoder().decode
+    except ImportError:
+        return jsonlib.loads
+
+
+# decodes every response body from bytes
+decoder = default_decoder()
+
+# resource type -> class its resources are built into, filled in by each resource module
+resource_types = {}
+
+# number of responses kept for conditional (If-Modified-Since) requests
+CONDITIONAL_CACHE_SIZE = 256
+
+
+class CachedResponse(dict):
+    """JSON response that was served with a Last-Modified validator. Also holds the objects parsed from it, so an
+    unchanged response is never parsed twice."""
+    __slots__ = ("last_modified", "objects")
+
+    def __init__(self, json, last_modified):
+        """Copies the response JSON and stores its validator"""
+        super().__init__(json)
+        self.last_modified = last_modified
+        self.objects = {}
+
+
+conditional_cache = OrderedDict()
+conditional_cache_lock = Lock()
+
+# request key -> Future of the request in flight, shared by every thread making the same request at once
+in_flight = {}
+in_flight_lock = Lock()
+
+
+def set_params(page_offset: int = None,
                page_limit: int = None,
                sort: str = None,
                fields_alert: list[str] | str = None,
@@ -75,126 +138,453 @@ def set_params(session,
                location_type: list[str] | str = None,
                name: list[str] | str = None,
                label: list[str] | str = None):
-    """Adds params to the session passed in. Supports all parameters for any endpoint of the MBTA API
-    listed at https://api-v3.mbta.com/docs/swagger/index.html."""
+    """Returns a new dict of request params. Supports all parameters for any endpoint of the MBTA API
+    listed at https://api-v3.mbta.com/docs/swagger/index.html.
 
-    session.params = {}
-    session.params['api_key'] = MBTA_API_KEY
+    Each call builds its own params rather than mutating the shared session, so concurrent requests made from
+    several threads never see each other's filters."""
+
+    params = {}
+    params['api_key'] = api_key()
 
     if page_offset:
-        session.params["page[offset]"] = page_offset
+        params["page[offset]"] = page_offset
     if page_limit:
-        session.params["page[limit]"] = page_limit
+        params["page[limit]"] = page_limit
     if sort:
-        session.params["sort"] = sort
+        params["sort"] = sort
 
     # choose fields
     if fields_alert:
-        session.params["fields[alert]"] = fields_alert
+        params["fields[alert]"] = fields_alert
     if fields_facility:
-        session.params["fields[facility]"] = fields_facility
+        params["fields[facility]"] = fields_facility
     if fields_line:
-        session.params["fields[line]"] = fields_line
+        params["fields[line]"] = fields_line
     if fields_prediction:
-        session.params["fields[prediction]"] = fields_prediction
+        params["fields[prediction]"] = fields_prediction
     if fields_route:
-        session.params["fields[route]"] = fields_route
+        params["fields[route]"] = fields_route
     if fields_route_pattern:
-        session.params["fields[route_pattern]"] = fields_route_pattern
+        params["fields[route_pattern]"] = fields_route_pattern
     if fields_schedule:
-        session.params["fields[schedule]"] = fields_schedule
+        params["fields[schedule]"] = fields_schedule
     if fields_service:
-        session.params["fields[service]"] = fields_service
+        params["fields[service]"] = fields_service
     if fields_shape:
-        session.params["fields[shape]"] = fields_shape
+        params["fields[shape]"] = fields_shape
     if fields_stop:
-        session.params["fields[stop]"] = fields_stop
+        params["fields[stop]"] = fields_stop
     if fields_trip:
-        session.params["fields[trip]"] = fields_trip
+        params["fields[trip]"] = fields_trip
     if fields_vehicle:
-        session.params["fields[vehicle]"] = fields_vehicle
+        params["fields[vehicle]"] = fields_vehicle
 
     if include:
-        session.params["include"] = include
+        params["include"] = include
     if activity:
-        session.params["filter[activity]"] = activity
+        params["filter[activity]"] = activity
     if route_type:
-        session.params["filter[route_type]"] = route_type
+        params["filter[route_type]"] = route_type
     if direction_id:
-        session.params["filter[direction_id"] = direction_id
+        params["filter[direction_id]"] = direction_id
     if route:
-        session.params["filter[route]"] = route
+        params["filter[route]"] = route
     if stop:
-        session.params["filter[stop]"] = stop
+        params["filter[stop]"] = stop
     if trip:
-        session.params["filter[trip]"] = trip
+        params["filter[trip]"] = trip
     if facility:
-        session.params["filter[facility]"] = facility
+        params["filter[facility]"] = facility
     if filter_id:
-        session.params["filter[id]"] = filter_id
+        params["filter[id]"] = filter_id
     if banner:
-        session.params["filter[banner]"] = banner
+        params["filter[banner]"] = banner
     if datetime:
-        session.params["filter[datetime]"] = datetime
+        params["filter[datetime]"] = datetime
     if lifecycle:
-        session.params["filter[lifecycle]"] = lifecycle
+        params["filter[lifecycle]"] = lifecycle
     if severity:
-        session.params["filter[severity]"] = severity
+        params["filter[severity]"] = severity
     if type:
-        session.params["filter[type]"] = type
+        params["filter[type]"] = type
     if latitude:
-        session.params["filter[latitude]"] = latitude
+        params["filter[latitude]"] = latitude
     if longitude:
-        session.params["filter[longitude]"] = longitude
+        params["filter[longitude]"] = longitude
     if radius:
-        session.params["filter[radius]"] = radius
+        params["filter[radius]"] = radius
     if route_pattern:
-        session.params["filter[route_pattern]"] = route_pattern
+        params["filter[route_pattern]"] = route_pattern
     if date:
-        session.params["filter[date]"] = date
+        params["filter[date]"] = date
     if canonical:
-        session.params["filter[canonical]"] = canonical
+        params["filter[canonical]"] = canonical
 
     # schedules
     if min_time:
-        session.params["filter[min_time]"] = min_time
+        params["filter[min_time]"] = min_time
     if max_time:
-        session.params["filter[max_time]"] = max_time
+        params["filter[max_time]"] = max_time
     if stop_sequence:
-        session.params["filter[stop_sequence]"] = stop_sequence
+        params["filter[stop_sequence]"] = stop_sequence
 
     if service:
-        session.params["filter[service]"] = service
+        params["filter[service]"] = service
     if location_type:
-        session.params["filter[location_type]"] = location_type
+        params["filter[location_type]"] = location_type
     if name:
-        session.params["filter[name]"] = name
+        params["filter[name]"] = name
     if label:
-        session.params["filter[label]"] = label
+        params["filter[label]"] = label
+
+    return params
+
+
+def chunk_ids(ids, max_length: int = MAX_FILTER_LENGTH) -> list[list[str]]:
+    """Splits ids into lists whose comma-joined length is at most max_length, keeping a longer id on its own"""
+    chunks = []
+    chunk = []
+    length = -1
+    for item in ids:
+        if chunk and length + 1 + len(item) > max_length:
+            chunks.append(chunk)
+            chunk = []
+            length = -1
+        chunk.append(item)
+        length += 1 + len(item)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
 
-    return session
 
+def related_id(obj, name):
+    """Returns the id of an object's relationship, whether it holds an id or a linked object, or None if unset"""
+    value = getattr(obj, name, None)
+    return getattr(value, "id", value)
 
-def get(session, path):
-    """Makes a request to the given path with the given session. Returns response in a JSON format if request is valid.
-    Otherwise, raises an error."""
-    response = session.get(path)
-    status = response.status_code
 
-    if status == OK:
-        return response.json()
+def set_decoder(function=None):
+    """Sets the function decoding every response body from bytes (or str, for streamed events) into JSON.
+    Passing None restores the default decoder."""
+    global decoder
+    decoder = function if function is not None else default_decoder()
+
+
+def cache_key(path, params):
+    """Returns a hashable key for a request, made of the path and its sorted params. The API key is left out, so that
+    it is never written to the disk cache and rotating it keeps cached responses valid."""
+    return path, tuple(sorted((key, str(value)) for key, value in (params or {}).items() if key != "api_key"))
+
+
+def cached_response(key):
+    """Returns the cached response for a request key, or None if there is none"""
+    with conditional_cache_lock:
+        cached = conditional_cache.get(key)
+        if cached is not None:
+            conditional_cache.move_to_end(key)
+    return cached
+
+
+def cache_response(key, json, last_modified):
+    """Caches a response served with a Last-Modified header and returns it as a CachedResponse"""
+    json_response = CachedResponse(json, last_modified)
+    with conditional_cache_lock:
+        conditional_cache[key] = json_response
+        conditional_cache.move_to_end(key)
+        while len(conditional_cache) > CONDITIONAL_CACHE_SIZE:
+            conditional_cache.popitem(last=False)
+    return json_response
+
+
+def raise_error(status, json):
+    """Raises the error matching the status code of an unsuccessful response"""
+    error = json["errors"][0]
+
+    if status == BAD_REQUEST:
+        raise BadRequestError(error)
+    elif status == FORBIDDEN:
+        raise ForbiddenError(error)
+    elif status == NOT_FOUND:
+        raise NotFoundError(error)
+    elif status == NOT_ACCEPTABLE:
+        raise NotAcceptableError(error)
+    elif status == TOO_MANY_REQUESTS:
+        raise TooManyRequestsError(error)
     else:
-        error = response.json()["errors"][0]
-
-        if status == BAD_REQUEST:
-            raise BadRequestError(error)
-        elif status == FORBIDDEN:
-            raise ForbiddenError(error)
-        elif status == NOT_FOUND:
-            raise NotFoundError(error)
-        elif status == NOT_ACCEPTABLE:
-            raise NotAcceptableError(error)
-        elif status == TOO_MANY_REQUESTS:
-            raise TooManyRequestsError(error)
+        raise RuntimeError("Invalid request")
+
+
+class PendingRequest(object):
+    """Request being made by get(), shared by the threaded and asyncio clients. Checks the conditional and disk caches
+    before the request is sent, and turns the response into JSON once it is received."""
+
+    def __init__(self, path, params):
+        """Looks up the caches for the request. If result is set, it can be returned without any request."""
+        self.path = path
+        self.params = params
+        self.key = cache_key(path, params)
+        self.cached = None
+        self.result = None
+        self.stored = False
+
+        memory = memcache.current()
+        self.ttl = memory.ttl(path) if memory is not None else None
+        if self.ttl is not None:
+            self.result = memory.get(self.key)
+            if self.result is not None:
+                if instrument.enabled:
+                    instrument.emit("cache", path, source="memory")
+                return
+
+        self.cached = cached_response(self.key)
+
+        disk = diskcache.current()
+        ttl = disk.ttl(path) if disk is not None else None
+        if ttl is not None:
+            stored = disk.lookup(self.key, ttl)
+            if stored is not None:
+                last_modified, fresh = stored
+                self.stored = True
+                if self.cached is None or self.cached.last_modified != last_modified:
+                    self.cached = cache_response(self.key, self.decode(disk.load(self.key)), last_modified)
+                if fresh:
+                    self.result = self.remember(self.cached)
+                    if instrument.enabled:
+                        instrument.emit("cache", path, source="disk")
+
+    def headers(self):
+        """Returns the headers making the request conditional on a cached response, if there is one"""
+        if self.cached is not None and self.cached.last_modified is not None:
+            return {"If-Modified-Since": self.cached.last_modified}
+        return None
+
+    def sending(self, attempt):
+        """Reports the request about to be sent if instrumentation is enabled, and returns the time it was sent"""
+        if instrument.enabled:
+            instrument.emit("request", self.path, attempt=attempt)
+            return perf_counter()
+        return None
+
+    def received(self, response, sent):
+        """Reports the response to a request reported sent at the given time"""
+        if sent is not None:
+            instrument.emit("response", self.path, status=response.status_code, seconds=perf_counter() - sent,
+                            size=len(response.content))
+
+    def retrying(self, wait, attempt):
+        """Reports a rate limited request about to be retried after waiting the given seconds"""
+        if instrument.enabled:
+            instrument.emit("retry", self.path, seconds=wait, attempt=attempt)
+
+    def decode(self, content):
+        """Decodes a response body, timing it if instrumentation is enabled"""
+        if not instrument.enabled:
+            return decoder(content)
+        start = perf_counter()
+        json_response = decoder(content)
+        instrument.emit("parse", self.path, seconds=perf_counter() - start, size=len(content))
+        return json_response
+
+    def remember(self, json_response):
+        """Caches the JSON in memory if the endpoint has a TTL, and returns it"""
+        memory = memcache.current()
+        if self.ttl is not None and memory is not None:
+            if not isinstance(json_response, CachedResponse):
+                json_response = CachedResponse(json_response, None)
+            memory.put(self.key, json_response, self.ttl)
+        return json_response
+
+    def finish(self, response):
+        """Returns the JSON of the response, or the cached JSON if unchanged. Otherwise, raises an error."""
+        status = response.status_code
+
+        if status == NOT_MODIFIED and self.cached is not None:
+            if self.stored:
+                diskcache.current().touch(self.key)
+            if instrument.enabled:
+                instrument.emit("cache", self.path, source="not_modified")
+            return self.remember(self.cached)
+        elif status == OK:
+            last_modified = response.headers.get("Last-Modified")
+            disk = diskcache.current()
+            if disk is not None and disk.ttl(self.path) is not None:
+                disk.store(self.key, response.content, last_modified)
+
+            if last_modified is None:
+                return self.remember(self.decode(response.content))
+            return self.remember(cache_response(self.key, self.decode(response.content), last_modified))
         else:
-            raise RuntimeError("Invalid request")
+            raise_error(status, self.decode(response.content))
+
+
+def get(path, params=None):
+    """Makes a request to the given path with the given params over the shared session. Returns response in a JSON
+    format if request is valid. Otherwise, raises an error.
+
+    Identical requests made by several threads at once are sent once: the others wait for the first, and get its
+    JSON or its error. The JSON is shared between them, so it must not be modified.
+
+    Responses served with a Last-Modified header are cached, and repeating the request sends If-Modified-Since.
+    If the API answers 304 Not Modified, the cached response is returned without downloading or parsing it again.
+    Responses from static endpoints are also stored on disk when diskcache is enabled, and responses from endpoints
+    with a TTL are kept in memory when memcache is enabled.
+
+    Requests are paced by the shared rate limiter, and rate limited (429) requests are retried with jittered
+    exponential backoff until ratelimit.RETRY_DEADLINE has passed. While instrument is enabled, each request,
+    response, decode, cache hit and retry is reported to it."""
+    key = cache_key(path, params)
+    while True:
+        with in_flight_lock:
+            future = in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = in_flight[key] = Future()
+        if leader:
+            break
+        try:
+            return future.result()
+        except CancelledError:
+            # the first thread was interrupted before finishing; make the request again
+            continue
+
+    try:
+        json_response = send(path, params)
+    except Exception as error:
+        future.set_exception(error)
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    else:
+        future.set_result(json_response)
+    finally:
+        with in_flight_lock:
+            del in_flight[key]
+    return json_response
+
+
+def send(path, params):
+    """Makes the request of get(), without sharing it with other threads"""
+    request = PendingRequest(path, params)
+    if request.result is not None:
+        return request.result
+
+    deadline = retry_deadline()
+    attempt = 0
+    while True:
+        limiter.acquire()
+        sent = request.sending(attempt)
+        response = client().get(path, params=params, headers=request.headers())
+        request.received(response, sent)
+        limiter.update(response.headers)
+
+        if response.status_code != TOO_MANY_REQUESTS:
+            break
+        wait = backoff(attempt, response.headers)
+        if not can_retry(deadline, wait):
+            break
+        request.retrying(wait, attempt)
+        sleep(wait)
+        attempt += 1
+
+    return request.finish(response)
+
+
+def link_included(json_response, objects, resources):
+    """Replaces the relationship ids of the objects, and of the objects built from the 'included' resources of the
+    response, with the objects they refer to. Every resource is built once, so objects referring to the same
+    resource share a single instance."""
+    included = json_response.get("included")
+    if not included:
+        return
+
+    identity = {}
+    pairs = list(zip(objects, resources))
+    for obj, resource in pairs:
+        identity[(resource["type"], resource["id"])] = obj
+    for resource in included:
+        key = (resource["type"], resource["id"])
+        cls = resource_types.get(resource["type"])
+        if cls is not None and key not in identity:
+            identity[key] = cls(resource)
+            pairs.append((identity[key], resource))
+
+    for obj, resource in pairs:
+        for name, relationship in resource.get("relationships", {}).items():
+            data = relationship.get("data")
+            if not hasattr(obj, name) or data is None:
+                continue
+            if isinstance(data, list):
+                setattr(obj, name, [identity.get((linkage["type"], linkage["id"]), linkage) for linkage in data])
+            elif (data["type"], data["id"]) in identity:
+                setattr(obj, name, identity[(data["type"], data["id"])])
+
+
+def build_objects(json_response, cls):
+    """Returns a list of cls objects built from each resource in the 'data' of the response, with relationships to
+    'included' resources resolved to objects. Objects built from a cached response are reused whenever the API
+    reports that response as unchanged."""
+    objects = getattr(json_response, "objects", None)
+    if objects is not None and cls in objects:
+        return list(objects[cls])
+
+    built = [cls(json) for json in json_response["data"]]
+    link_included(json_response, built, json_response["data"])
+    if objects is not None:
+        objects[cls] = built
+    return list(built)
+
+
+def build_object(json_response, cls):
+    """Returns a cls object built from the 'data' of the response, with relationships to 'included' resources
+    resolved to objects. As with build_objects, the object built from a cached response is reused."""
+    objects = getattr(json_response, "objects", None)
+    if objects is not None and cls in objects:
+        return objects[cls]
+
+    obj = cls(json_response["data"])
+    link_included(json_response, [obj], [json_response["data"]])
+    if objects is not None:
+        objects[cls] = obj
+    return obj
+
+
+def next_page(next_url, params):
+    """Returns the path and params requesting the 'next' link of a page: the link's query as params, with the API key
+    of the first request added. httpx clients have no default API key param, and replace the query of a URL requested
+    with params, so the key can't be left to the client."""
+    parts = urlsplit(next_url)
+    next_params = dict(parse_qsl(parts.query))
+    if "api_key" in params:
+        next_params.setdefault("api_key", params["api_key"])
+    return urlunsplit(parts._replace(query="")), next_params
+
+
+def iterate_responses(path, params):
+    """Lazily yields the JSON of every page of results, following the 'next' link of each response. The next page is
+    requested in the background while the current one is consumed."""
+    if "page[limit]" not in params:
+        params = dict(params)
+        params["page[limit]"] = DEFAULT_PAGE_LIMIT
+
+    page = prefetcher.submit(get, path, params)
+    while page is not None:
+        json_response = page.result()
+        next_url = json_response.get("links", {}).get("next")
+        page = prefetcher.submit(get, *next_page(next_url, params)) if next_url else None
+
+        yield json_response
+
+
+def iterate_pages(path, params):
+    """Lazily yields each resource in the 'data' of every page of results"""
+    for json_response in iterate_responses(path, params):
+        yield from json_response["data"]
+
+
+def build_pages(path, params, cls):
+    """Lazily yields a cls object for each resource of every page of results. As with build_objects, relationships
+    to the 'included' resources of a page are resolved to objects, shared within that page."""
+    for json_response in iterate_responses(path, params):
+        yield from build_objects(json_response, cls)
@@ -19,18 +19,44 @@
 # SOFTWARE.
 
 
-import requests
 from os import environ
-from dotenv import load_dotenv
+from threading import Lock
+
+# root of the API when MBTA_API_URL isn't set
+DEFAULT_BASE_URL = "https://api-v3.mbta.com/"
+
+# connections kept open per host, and seconds to wait for a connection and for each read of a response, when
+# MBTA_POOL_SIZE, MBTA_CONNECT_TIMEOUT and MBTA_READ_TIMEOUT aren't set
+POOL_SIZE = 32
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+
+def load_environment():
+    """Loads the .env file into the environment the first time a setting is needed"""
+    if not transport["environment"]:
+        from dotenv import load_dotenv
+        load_dotenv()
+        transport["environment"] = True
+
+
+def api_key() -> str:
+    """Returns the MBTA API key from the environment"""
+    load_environment()
+    return environ.get('MBTA_API_KEY', "No api key set")
 
 
 class URLs:
     """
     Class with functions to access MBTA API urls. Docstrings quoted from API swagger docs
     """
-    def __init__(self):
-        """Sets each url field for construction within methods"""
-        self.__base_url = "https://api-v3.mbta.com/"
+    def __init__(self, base_url: str = None):
+        """Sets each url field for construction within methods
+
+        :param base_url: root of the API, e.g. a local stand-in server for testing. Defaults to MBTA_API_URL, read
+            from the environment on first use, or else the MBTA API
+        """
+        self.__base_url = base_url.rstrip("/") + "/" if base_url is not None else None
 
         self.__alerts = "alerts/"
         self.__facilities = "facilities/"
@@ -46,9 +72,17 @@ class URLs:
         self.__trips = "trips/"
         self.__vehicles = "vehicles/"
 
+    @property
+    def base_url(self) -> str:
+        """Returns the root of the API"""
+        if self.__base_url is None:
+            load_environment()
+            self.__base_url = environ.get('MBTA_API_URL', DEFAULT_BASE_URL).rstrip("/") + "/"
+        return self.__base_url
+
     def alert_url(self):
         """List active and upcoming system alerts"""
-        return self.__base_url + self.__alerts
+        return self.base_url + self.__alerts
 
     def alert_by_id_url(self, alert_id: int):
         """Show a particular alert by the alert’s id"""
@@ -56,7 +90,7 @@ class URLs:
 
     def facility_url(self):
         """List Escalators and Elevators"""
-        return self.__base_url + self.__facilities
+        return self.base_url + self.__facilities
 
     def facility_by_id_url(self, facility_id: str):
         """Specific Escalator or Elevator"""
@@ -64,7 +98,7 @@ class URLs:
 
     def line_url(self):
         """List of lines. A line is a combination of routes."""
-        return self.__base_url + self.__lines
+        return self.base_url + self.__lines
 
     def line_by_id_url(self, line_id: str):
         """Single line, which represents a combination of routes."""
@@ -72,7 +106,7 @@ class URLs:
 
     def live_facility_url(self):
         """Live data about a given facility."""
-        return self.__base_url + self.__live_facilities
+        return self.base_url + self.__live_facilities
 
     def live_facility_by_id_url(self, live_facility_id: int):
         """List live parking data for specific parking facility"""
@@ -81,11 +115,11 @@ class URLs:
     def predictions_url(self):
         """List of predictions for trips. To get the scheduled times instead of the predictions, use /schedules.
         A filter must be present for any predictions to be returned"""
-        return self.__base_url + self.__predictions
+        return self.base_url + self.__predictions
 
     def route_url(self):
         """List of routes."""
-        return self.__base_url + self.__routes
+        return self.base_url + self.__routes
 
     def route_by_id_url(self, route_id: str):
         """Show a particular route by the route’s id."""
@@ -94,20 +128,20 @@ class URLs:
     def route_pattern_url(self):
         """List of route patterns. Route patterns are used to describe the subsets of a route,
         representing different possible patterns of where trips may serve."""
-        return self.__base_url + self.__route_patterns
+        return self.base_url + self.__route_patterns
 
-    def route_pattern_by_id(self, route_pattern_id: str):
+    def route_pattern_by_id_url(self, route_pattern_id: str):
         """Show a particular route_pattern by the route’s id."""
         return self.route_pattern_url() + str(route_pattern_id)
 
     def schedules_url(self):
         """List of schedules. To get a realtime prediction instead of the scheduled times, use /predictions.
         A route, stop, or trip filter must be present for any schedules to be returned"""
-        return self.__base_url + self.__schedules
+        return self.base_url + self.__schedules
 
     def service_url(self):
         """List of services. Service represents the days of the week, as well as extra days, that a trip is valid."""
-        return self.__base_url + self.__services
+        return self.base_url + self.__services
 
     def service_by_id_url(self, service_id: str):
         """Single service, which represents the days of the week, as well as extra days, that a trip is valid."""
@@ -115,7 +149,7 @@ class URLs:
 
     def shape_url(self):
         """List of shapes. A route filter must be present for any shapes to be returned"""
-        return self.__base_url + self.__shapes
+        return self.base_url + self.__shapes
 
     def shape_by_id_url(self, shape_id: str):
         """Detail of a particular shape."""
@@ -123,7 +157,7 @@ class URLs:
 
     def stop_url(self):
         """List stops."""
-        return self.__base_url + self.__stops
+        return self.base_url + self.__stops
 
     def stop_by_id_url(self, stop_id: str):
         """Detail for a specific stop."""
@@ -133,7 +167,7 @@ class URLs:
         """List of trips, the journies of a particular vehicle through a set of stops on a primary route and zero or
         more alternative routes that can be filtered on. An id, route, route_pattern, or name filter must be present for
         any trips to be returned."""
-        return self.__base_url + self.__trips
+        return self.base_url + self.__trips
 
     def trip_by_id_url(self, trip_id: str):
         """Single trip - the journey of a particular vehicle through a set of stops"""
@@ -141,18 +175,109 @@ class URLs:
 
     def vehicle_url(self):
         """List of vehicles (buses, ferries, and trains)"""
-        return self.__base_url + self.__vehicles
+        return self.base_url + self.__vehicles
 
     def vehicle_by_id_url(self, vehicle_id: str):
         """Single vehicle (bus, ferry, or train)"""
         return self.vehicle_url() + str(vehicle_id)
 
 
-load_dotenv()
-MBTA_API_KEY = environ.get('MBTA_API_KEY', "No api key set")
-
-session = requests.Session()
-session.params = {}
-session.params['api_key'] = MBTA_API_KEY
+def configure(pool_size: int = None,
+              connect_timeout: float = None,
+              read_timeout: float = None,
+              keep_alive: bool = True,
+              gzip: bool = True,
+              http2: bool = False):
+    """Configures the connections requests are made over. Called with the defaults on the first request.
+
+    :param pool_size: connections kept open per host. Threads beyond it open connections that are discarded after
+        their request. Defaults to MBTA_POOL_SIZE, or POOL_SIZE
+    :param connect_timeout: seconds to wait for a connection before raising. Defaults to MBTA_CONNECT_TIMEOUT, or
+        CONNECT_TIMEOUT
+    :param read_timeout: seconds to wait for each read of a response before raising. Defaults to MBTA_READ_TIMEOUT,
+        or READ_TIMEOUT
+    :param keep_alive: reuse connections between requests
+    :param gzip: ask for gzip compressed responses
+    :param http2: send requests (except streams) over HTTP/2 with httpx, multiplexing concurrent requests over one
+        connection. Requires 'pip install httpx[http2]'
+    """
+    load_environment()
+    pool_size = pool_size or int(environ.get('MBTA_POOL_SIZE', POOL_SIZE))
+    connect_timeout = connect_timeout or float(environ.get('MBTA_CONNECT_TIMEOUT', CONNECT_TIMEOUT))
+    read_timeout = read_timeout or float(environ.get('MBTA_READ_TIMEOUT', READ_TIMEOUT))
+    headers = {"Accept-Encoding": "gzip, deflate" if gzip else "identity",
+               "Connection": "keep-alive" if keep_alive else "close"}
+
+    http2_client = None
+    if http2:
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("The HTTP/2 transport requires httpx. Install it with 'pip install httpx[http2]'.")
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size if keep_alive else 0)
+        http2_client = httpx.Client(http2=True, limits=limits, headers=headers,
+                                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+
+    if transport["http2"] is not None:
+        transport["http2"].close()
+    transport.update(configured=True, http2=http2_client, pool_size=pool_size, headers=headers,
+                     timeout=(connect_timeout, read_timeout), keep_alive=keep_alive)
+    if transport["session"] is not None:
+        apply_settings(transport["session"])
+
+
+def apply_settings(session):
+    """Mounts an adapter with the configured pool size and timeouts on a requests session and sets its headers"""
+    from adapter import TimeoutAdapter
+    adapter = TimeoutAdapter(transport["timeout"], pool_connections=transport["pool_size"],
+                             pool_maxsize=transport["pool_size"])
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(transport["headers"])
+
+
+def settings() -> dict:
+    """Returns the settings of the last configure() call, configuring with the defaults if there was none"""
+    if not transport["configured"]:
+        with transport_lock:
+            if not transport["configured"]:
+                configure()
+    return transport
+
+
+def get_session():
+    """Returns the requests session shared by every request, creating it on first use"""
+    if transport["session"] is None:
+        settings()
+        with transport_lock:
+            if transport["session"] is None:
+                import requests
+                session = requests.Session()
+                session.params = {}
+                session.params['api_key'] = api_key()
+                apply_settings(session)
+                transport["session"] = session
+    return transport["session"]
+
+
+def client():
+    """Returns what requests are sent with: the HTTP/2 client if configured, otherwise the requests session"""
+    session = get_session()
+    return transport["http2"] or session
+
+
+def __getattr__(name):
+    """Creates the session, or reads the API key, when first accessed as urls.session or urls.MBTA_API_KEY"""
+    if name == "session":
+        return get_session()
+    if name == "MBTA_API_KEY":
+        return api_key()
+    raise AttributeError("module 'urls' has no attribute " + repr(name))
+
+
+# the session and the settings of the last configure() call, read by the async client too. Nothing is loaded, and
+# no session created, until the first request
+transport = {"environment": False, "configured": False, "session": None, "http2": None}
+transport_lock = Lock()
 
 urls = URLs()
@@ -1,21 +1,34 @@
-from urls import urls, session
-from universals import set_params, get
+from urls import urls
+from model import Model, Attribute
+from universals import set_params, get, iterate_pages, build_pages, build_objects, build_object, resource_types
+from bulk import by_ids, Found
+from columns import to_columns
+from stream import Stream
 
 
-class VEHICLE(object):
+class VEHICLE(Model):
     """Represents a MBTA vehicle. Takes in json with 'id', 'type' keys, 'links', 'relationships' and 'attributes' dict"""
+    __slots__ = ("route", "stop", "trip")
+
+    bearing = Attribute()
+    carriages = Attribute()
+    current_status = Attribute()
+    current_stop_sequence = Attribute()
+    label = Attribute()
+    direction_id = Attribute()
+    latitude = Attribute()
+    longitude = Attribute()
+    occupancy_status = Attribute()
+    speed = Attribute()
+    updated_at = Attribute()
 
     def __init__(self, json):
         """Stores each value returned from the MBTA API as a field"""
-        self.type = json["type"]
-        self.id = json["id"]
-        self.links = json["links"]
+        super().__init__(json)
 
         if "relationships" in json:
             self.__set_relationships(json["relationships"])
 
-        self.__set_attributes(json["attributes"])
-
     def __str__(self):
         """Returns the id and label of the vehicle"""
         return self.id + ": " + self.label
@@ -29,19 +42,8 @@ class VEHICLE(object):
         if "trip" in json:
             self.trip = json["trip"]["data"]["id"]
 
-    def __set_attributes(self, json):
-        """Sets each given attribute of the vehicle"""
-        self.bearing = json["bearing"]
-        self.carriages = json["carriages"]
-        self.current_status = json["current_status"]
-        self.current_stop_sequence = json["current_stop_sequence"]
-        self.label = json["label"]
-        self.direction_id = json["direction_id"]
-        self.latitude = json["latitude"]
-        self.longitude = json["longitude"]
-        self.occupancy_status = json["occupancy_status"]
-        self.speed = json["speed"]
-        self.updated_at = json["updated_at"]
+
+resource_types["vehicle"] = VEHICLE
 
 
 def vehicles(page_offset: int = None,
@@ -55,25 +57,41 @@ def vehicles(page_offset: int = None,
              route: list[str] | str = None,
              direction_id: str = None,
              route_type: list[str] | str = None,
+             only: list[str] = None,
+             format: str = None,
+             paginate: bool = False,
              json: bool = False):
     """Makes a request to the API.
     Default behavior returns unsorted list of VEHICLE objects containing all vehicles from API.
     Accepts all parameters that can be passed to the /vehicles endpoint.
 
     :param json: return JSON instead of VEHICLE objects
+    :param only: names of the VEHICLE fields to request. Sets fields_vehicle to match and skips include
+    :param paginate: follow every page of results, lazily yielding VEHICLE objects (or JSON) one at a time
+    :param format: "columns" to return a dict of NumPy arrays, one per field, instead of VEHICLE objects.
+        With paginate, every page is read into the arrays
     """
-    vehicle_session = set_params(session, page_offset=page_offset, page_limit=page_limit, sort=sort,
-                                 fields_vehicle=fields_vehicle, include=include, filter_id=filter_id, trip=trip,
-                                 label=label, route=route, direction_id=direction_id, route_type=route_type)
-    json_response = get(vehicle_session, urls.vehicle_url())
-
-    if json:
+    if only is not None:
+        fields_vehicle, include = VEHICLE.fields(only), None
+
+    vehicle_params = set_params(page_offset=page_offset, page_limit=page_limit, sort=sort,
+                                fields_vehicle=fields_vehicle, include=include, filter_id=filter_id, trip=trip,
+                                label=label, route=route, direction_id=direction_id, route_type=route_type)
+    if paginate:
+        if format == "columns":
+            return to_columns(iterate_pages(urls.vehicle_url(), vehicle_params), "vehicle")
+        elif json:
+            return iterate_pages(urls.vehicle_url(), vehicle_params)
+        return build_pages(urls.vehicle_url(), vehicle_params, VEHICLE)
+
+    json_response = get(urls.vehicle_url(), vehicle_params)
+
+    if format == "columns":
+        return to_columns(json_response["data"], "vehicle")
+    elif json:
         return json_response
     else:
-        vehicles = []
-        for json in json_response["data"]:
-            vehicles.append(VEHICLE(json))
-        return vehicles
+        return build_objects(json_response, VEHICLE)
 
 
 def vehicle_by_id(vehicle_id: str,
@@ -87,13 +105,26 @@ def vehicle_by_id(vehicle_id: str,
     :param vehicle_id: id of vehicle to return
     :param json: return JSON instead of VEHICLE object
     """
-    vehicle_session = set_params(session, fields_vehicle=fields_vehicle, include=include)
-    json_response = get(vehicle_session, urls.vehicle_by_id_url(vehicle_id))
+    vehicle_params = set_params(fields_vehicle=fields_vehicle, include=include)
+    json_response = get(urls.vehicle_by_id_url(vehicle_id), vehicle_params)
 
     if json:
         return json_response
     else:
-        return VEHICLE(json_response["data"])
+        return build_object(json_response, VEHICLE)
+
+
+def vehicles_by_ids(vehicle_ids: list[str] | str,
+                    fields_vehicle: list[str] | str = None,
+                    include: list[str] = None) -> Found:
+    """Makes requests to the API for many vehicles at once, in concurrent filter[id] requests chunked by URL
+    length. Default behavior returns a list of VEHICLE objects in the order of the ids given, with None for each id
+    not found and the ids not found in its missing attribute. Objects requested without fields or include are cached
+    by id.
+
+    :param vehicle_ids: ids of vehicles to return, as a list or comma-separated string
+    """
+    return by_ids(vehicles, "vehicle", vehicle_ids, fields_vehicle=fields_vehicle, include=include)
 
 
 def all_vehicles(json: bool = False):
@@ -102,3 +133,25 @@ def all_vehicles(json: bool = False):
     :param json: return JSON instead of VEHICLE objects
     """
     return vehicles(json=json)
+
+
+def stream_vehicles(fields_vehicle: list[str] | str = None,
+                    include: list[str] = None,
+                    filter_id: list[str] | str = None,
+                    trip: list[str] | str = None,
+                    label: list[str] | str = None,
+                    route: list[str] | str = None,
+                    direction_id: str = None,
+                    route_type: list[str] | str = None,
+                    start: bool = True):
+    """Streams vehicles from the API as server-sent events.
+    Default behavior returns a started Stream whose store holds a VEHICLE object for each vehicle, kept up to date as
+    the API reports changes. Accepts all filter parameters that can be passed to the /vehicles endpoint.
+
+    :param start: connect immediately. Otherwise, call start() on the returned Stream
+    """
+    vehicle_params = set_params(fields_vehicle=fields_vehicle, include=include, filter_id=filter_id, trip=trip,
+                                label=label, route=route, direction_id=direction_id, route_type=route_type)
+    vehicle_stream = Stream(urls.vehicle_url(), vehicle_params, VEHICLE)
+
+    return vehicle_stream.start() if start else vehicle_stream
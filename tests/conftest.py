@@ -0,0 +1,140 @@
+"""Local stand-in for the MBTA API that the package is pointed at through MBTA_API_URL for every test.
+
+The stand-in records each request, can hold responses for a delay, and answers:
+  /predictions/  two predictions per stop in filter[stop], at the child platform of a parent station ('place-X' has
+                 the child 'child-X'), with the stops included when include has 'stop'
+  /vehicles/     three vehicles of the route 'Red', paged by page[offset] and page[limit] with a links.next that
+                 repeats the query without the API key, and with the route included when include has 'route'
+  /limited/      429 Too Many Requests while limited is above zero, then the vehicles
+  /routes/       two routes served with Last-Modified: last_modified, or 304 Not Modified when If-Modified-Since
+                 matches it
+  /stops/        the stops in filter[id] in reverse order, leaving out ids starting with 'missing'
+  /stops/<id>    the stop, or 404 Not Found for 'missing'
+Tests can set responses[endpoint] to a JSON body the endpoint answers instead, or to a function of the query
+returning one."""
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "mbtpi"))
+
+
+def resource(kind, item, **relationships):
+    return {"id": item, "type": kind, "attributes": {},
+            "relationships": {name: {"data": {"id": value, "type": name}} for name, value in relationships.items()}}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers requests as described in the module docstring"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    lock = Lock()
+    requests = []
+    delay = 0
+    limited = 0
+    responses = {}
+    last_modified = "Sat, 17 Oct 2026 08:00:00 GMT"
+    not_modified = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        with StandIn.lock:
+            StandIn.requests.append((parts[0], query))
+            limited = StandIn.limited > 0 and parts[0] == "limited"
+            if limited:
+                StandIn.limited -= 1
+        time.sleep(StandIn.delay)
+
+        if limited:
+            self.reply(429, {"errors": [{"status": "429", "code": "rate_limited", "detail": "Too many requests"}]})
+        elif parts[0] in StandIn.responses:
+            body = StandIn.responses[parts[0]]
+            self.reply(200, body(query) if callable(body) else body)
+        elif parts[0] == "predictions":
+            stops = query.get("filter[stop]", "").split(",")
+            children = [stop.replace("place-", "child-") for stop in stops]
+            body = {"data": [resource("prediction", "%s-%d" % (child, k), stop=child, trip="trip-%d" % k)
+                             for child in children for k in range(2)]}
+            if "stop" in query.get("include", "").split(","):
+                body["included"] = [resource("stop", child, parent_station=stop) if stop != child
+                                    else resource("stop", child) for stop, child in zip(stops, children)]
+            self.reply(200, body)
+        elif parts[0] == "routes":
+            if self.headers.get("If-Modified-Since") == StandIn.last_modified:
+                StandIn.not_modified += 1
+                self.reply(304, None)
+            else:
+                self.reply(200, {"data": [resource("route", "Red"), resource("route", "Orange")]},
+                           {"Last-Modified": StandIn.last_modified})
+        elif parts[0] in ("vehicles", "limited"):
+            offset = int(query.get("page[offset]", 0))
+            limit = int(query.get("page[limit]", 3))
+            body = {"data": [resource("vehicle", "y%d" % i, route="Red")
+                             for i in range(offset, min(offset + limit, 3))]}
+            if offset + limit < 3:
+                following = {name: value for name, value in query.items() if name != "api_key"}
+                following["page[offset]"] = offset + limit
+                body["links"] = {"next": "%s%s/?%s" % (os.environ["MBTA_API_URL"], parts[0], urlencode(following))}
+            if "route" in query.get("include", "").split(","):
+                body["included"] = [resource("route", "Red")]
+            self.reply(200, body)
+        elif parts == ["stops"]:
+            ids = [item for item in query.get("filter[id]", "").split(",") if item and not item.startswith("missing")]
+            self.reply(200, {"data": [resource("stop", item) for item in reversed(ids)]})
+        elif parts[0] == "stops" and len(parts) > 1 and parts[1] != "missing":
+            self.reply(200, {"data": resource("stop", parts[1])})
+        else:
+            self.reply(404, {"errors": [{"status": "404", "code": "not_found", "title": "Resource Not Found",
+                                     "source": {"parameter": "id"}}]})
+
+    def reply(self, status, body, headers=None):
+        body = json.dumps(body).encode() if body is not None else b""
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/vnd.api+json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            # the client gave up on the request, e.g. every task awaiting it was cancelled
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+Thread(target=server.serve_forever, daemon=True).start()
+os.environ["MBTA_API_URL"] = "http://127.0.0.1:%d/" % server.server_port
+os.environ["MBTA_API_KEY"] = "stand-in-key"
+for name in ("MBTA_CACHE_PATH", "MBTA_MEMORY_CACHE_SIZE"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def stand_in():
+    """Returns the stand-in with its request log cleared and no delay, rate limiting or canned responses, and forgets
+    the rate limit and conditional responses learned from earlier responses"""
+    import universals
+    from ratelimit import limiter
+    limiter.reset()
+    universals.conditional_cache.clear()
+    StandIn.requests = []
+    StandIn.delay = 0
+    StandIn.limited = 0
+    StandIn.responses = {}
+    StandIn.last_modified = "Sat, 17 Oct 2026 08:00:00 GMT"
+    StandIn.not_modified = 0
+    yield StandIn
+    StandIn.delay = 0
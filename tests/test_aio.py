@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+import route  # registers the class included routes are built into
+from route import ROUTE
+from vehicle import VEHICLE, vehicles
+
+aio = pytest.importorskip("aio")
+pytest.importorskip("httpx")
+
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await aio.aclose()
+    return asyncio.run(main())
+
+
+async def collect(pages):
+    return [item async for item in await pages]
+
+
+def test_api_key_is_sent_with_every_page(stand_in):
+    list(vehicles(page_limit=1, paginate=True, json=True))
+    run(collect(aio.vehicles(page_limit=1, paginate=True, json=True)))
+
+    assert len(stand_in.requests) == 6
+    assert [query.get("api_key") for _, query in stand_in.requests] == ["stand-in-key"] * 6
+
+
+def test_pages_match_the_threaded_client(stand_in):
+    expected = list(vehicles(page_limit=2, paginate=True, json=True))
+    found = run(collect(aio.vehicles(page_limit=2, paginate=True, json=True)))
+    assert found == expected
+
+
+def test_included_resources_are_linked_on_every_page(stand_in):
+    found = run(collect(aio.vehicles(page_limit=2, include="route", paginate=True)))
+
+    assert [obj.id for obj in found] == ["y0", "y1", "y2"]
+    assert all(isinstance(obj, VEHICLE) and isinstance(obj.route, ROUTE) for obj in found)
+    assert found[0].route is found[1].route
+
+
+def test_list_functions_build_objects(stand_in):
+    found = run(aio.vehicles(include="route"))
+    assert [obj.id for obj in found] == ["y0", "y1", "y2"]
+    assert found[0].route is found[2].route
@@ -0,0 +1,67 @@
+import pytest
+
+import bulk
+from stop import STOP, stops_by_ids
+from universals import MAX_FILTER_LENGTH, chunk_ids
+
+
+@pytest.fixture(autouse=True)
+def no_cached_objects():
+    bulk.clear_objects()
+    yield
+    bulk.clear_objects()
+
+
+def requested_ids(stand_in):
+    return [query["filter[id]"].split(",") for name, query in stand_in.requests if name == "stops"]
+
+
+def test_objects_keep_the_order_of_the_ids(stand_in):
+    found = stops_by_ids("s1,missing-1,s2,s1,missing-1")
+
+    assert [getattr(obj, "id", None) for obj in found] == ["s1", None, "s2", "s1", None]
+    assert all(isinstance(obj, STOP) for obj in found if obj is not None)
+    assert found[0] is found[3]
+    assert found.missing == ["missing-1"]
+    # repeated ids are requested once, in one request
+    assert requested_ids(stand_in) == [["s1", "missing-1", "s2"]]
+
+
+def test_long_id_lists_are_split_into_requests(stand_in):
+    ids = ["place-stop-%05d" % i for i in range(400)]
+    found = stops_by_ids(ids)
+
+    assert [obj.id for obj in found] == ids and found.missing == []
+    chunks = requested_ids(stand_in)
+    assert len(chunks) > 1
+    assert sorted(item for chunk in chunks for item in chunk) == ids
+    assert all(len(",".join(chunk)) <= MAX_FILTER_LENGTH for chunk in chunks)
+
+
+def test_objects_are_cached_by_id(stand_in):
+    first = stops_by_ids(["s1", "s2"])
+    second = stops_by_ids(["s2", "s3", "missing-1"])
+
+    assert second[0] is first[1]
+    assert requested_ids(stand_in) == [["s1", "s2"], ["s3", "missing-1"]]
+    # unknown ids are asked for again
+    assert stops_by_ids(["missing-1"]).missing == ["missing-1"]
+    assert len(requested_ids(stand_in)) == 3
+
+
+def test_objects_requested_with_params_are_not_cached(stand_in):
+    stops_by_ids(["s1"], include="parent_station")
+    stops_by_ids(["s1"], include="parent_station")
+    stops_by_ids(["s1"])
+
+    assert len(requested_ids(stand_in)) == 3
+    assert stand_in.requests[0][1]["include"] == "parent_station"
+
+
+def test_chunks_stay_under_the_length_and_keep_the_order():
+    ids = [str(i) * (i % 7 + 1) for i in range(200)]
+    chunks = chunk_ids(ids, max_length=60)
+
+    assert [item for chunk in chunks for item in chunk] == ids
+    assert all(len(",".join(chunk)) <= 60 for chunk in chunks)
+    assert chunk_ids([]) == []
@@ -0,0 +1,71 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from coalesce import AsyncCoalescer, Coalescer, coalesced_predictions, related_ids
+from prediction import predictions
+
+
+def related_stop(obj):
+    return getattr(obj.stop, "id", obj.stop)
+
+
+def test_concurrent_calls_share_one_request(stand_in, monkeypatch):
+    # a window long enough for every thread to join the batch, however slowly the pool starts them
+    monkeypatch.setattr(coalesced_predictions, "window", 0.2)
+    stops = ["stop-%d" % i for i in range(30)]
+    with ThreadPoolExecutor(30) as pool:
+        results = list(pool.map(coalesced_predictions, stops))
+
+    assert len(stand_in.requests) == 1
+    for stop, objects in zip(stops, results):
+        assert len(objects) == 2
+        assert {related_stop(obj) for obj in objects} == {stop}
+
+
+def test_parent_station_ids_match_their_child_stops(stand_in):
+    assert len(coalesced_predictions("place-1")) == 2
+    assert "stop" in stand_in.requests[0][1]["include"].split(",")
+
+
+def test_caller_include_is_kept(stand_in):
+    coalesced_predictions("stop-1", include="trip")
+    assert set(stand_in.requests[0][1]["include"].split(",")) == {"trip", "stop"}
+
+
+def test_long_id_lists_are_split_into_chunks(stand_in):
+    coalescer = Coalescer(predictions, "stop", related_ids("stop"), max_length=50)
+    stops = ["stop-%03d" % i for i in range(20)]
+    with ThreadPoolExecutor(20) as pool:
+        results = list(pool.map(coalescer, stops))
+
+    assert len(stand_in.requests) > 1
+    assert all(len(objects) == 2 for objects in results)
+
+
+def test_error_fails_every_call_in_the_batch(stand_in):
+    def failing(**params):
+        raise RuntimeError("failed")
+
+    coalescer = Coalescer(failing, "stop", related_ids("stop"))
+    with ThreadPoolExecutor(5) as pool:
+        futures = [pool.submit(coalescer, "stop-%d" % i) for i in range(5)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result()
+
+
+def test_async_concurrent_calls_share_one_request(stand_in):
+    pytest.importorskip("httpx")
+    import aio
+
+    async def main():
+        coalescer = AsyncCoalescer(aio.predictions, "stop", related_ids("stop"), include="stop")
+        results = await asyncio.gather(*(coalescer(stop) for stop in ("place-1", "stop-2", "stop-3")))
+        await aio.aclose()
+        return results
+
+    results = asyncio.run(main())
+    assert len(stand_in.requests) == 1
+    assert [len(objects) for objects in results] == [2, 2, 2]
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import pytest
+
+from columns import MISSING_INT, MISSING_TIME, to_columns
+from vehicle import vehicles
+
+np = pytest.importorskip("numpy")
+
+
+def vehicle(item, **attributes):
+    return {"id": item, "type": "vehicle", "attributes": attributes, "relationships": {}}
+
+
+def test_attributes_become_typed_arrays():
+    resources = [vehicle("y1", latitude=42.35, direction_id=1, label="1601", updated_at="2026-10-17T08:00:00-04:00"),
+                 vehicle("y2")]
+    columns = to_columns(resources, "vehicle")
+
+    assert list(columns["id"]) == ["y1", "y2"]
+    assert columns["latitude"].dtype == np.float64 and np.isnan(columns["latitude"][1])
+    assert columns["direction_id"].tolist() == [1, MISSING_INT]
+    assert columns["updated_at"].tolist() == [int(datetime.fromisoformat("2026-10-17T08:00:00-04:00").timestamp()),
+                                              MISSING_TIME]
+    assert columns["label"].tolist() == ["1601", None]
+    assert all(len(column) == 2 for column in columns.values())
+
+
+def test_relationships_become_id_columns_with_gaps():
+    resources = [vehicle("y1"), vehicle("y2"), vehicle("y3")]
+    resources[1]["relationships"] = {"trip": {"data": {"id": "t2", "type": "trip"}}}
+    resources[2]["relationships"] = {"trip": {"data": None}, "stop": {"data": {"id": "s3", "type": "stop"}}}
+    columns = to_columns(resources, "vehicle")
+
+    assert columns["trip"].tolist() == [None, "t2", None]
+    assert columns["stop"].tolist() == [None, None, "s3"]
+
+
+def test_list_functions_return_columns(stand_in):
+    columns = vehicles(format="columns")
+    assert columns["id"].tolist() == ["y0", "y1", "y2"]
+    assert columns["route"].tolist() == ["Red"] * 3
+
+
+def test_paginated_columns_read_every_page(stand_in):
+    columns = vehicles(page_limit=2, paginate=True, format="columns")
+    assert columns["id"].tolist() == ["y0", "y1", "y2"]
+    assert len(stand_in.requests) == 2
@@ -0,0 +1,43 @@
+import universals
+from route import routes
+from urls import urls
+
+
+def test_unchanged_response_is_reused(stand_in):
+    first = universals.get(urls.route_url(), universals.set_params())
+    second = universals.get(urls.route_url(), universals.set_params())
+
+    assert len(stand_in.requests) == 2
+    assert stand_in.not_modified == 1
+    assert second is first
+    assert first.last_modified == stand_in.last_modified
+
+
+def test_objects_of_an_unchanged_response_are_not_built_again(stand_in):
+    first = routes()
+    second = routes()
+
+    assert stand_in.not_modified == 1
+    assert [obj.id for obj in second] == ["Red", "Orange"]
+    assert all(a is b for a, b in zip(first, second))
+    # each call gets its own list
+    assert second is not first
+
+
+def test_changed_response_replaces_the_cached_one(stand_in):
+    first = routes()
+    stand_in.last_modified = "Sun, 18 Oct 2026 08:00:00 GMT"
+    second = routes()
+    third = routes()
+
+    assert stand_in.not_modified == 1
+    assert first[0] is not second[0]
+    assert third[0] is second[0]
+
+
+def test_requests_with_other_params_are_cached_apart(stand_in):
+    routes()
+    routes(type="1")
+
+    assert stand_in.not_modified == 0
+    assert len(universals.conditional_cache) == 2
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+import universals
+from vehicle import vehicles
+
+
+@pytest.fixture
+def restore_decoder():
+    yield
+    universals.set_decoder()
+
+
+def test_default_decoder_reads_bytes_and_str():
+    body = {"data": [{"id": "y1", "attributes": {"speed": 1.5, "label": "ü"}}], "included": None}
+    decode = universals.default_decoder()
+    assert decode(json.dumps(body).encode()) == body
+    assert decode(json.dumps(body)) == body
+
+
+def test_responses_go_through_the_decoder_set(stand_in, restore_decoder):
+    bodies = []
+
+    def decode(content):
+        bodies.append(content)
+        return json.loads(content)
+
+    universals.set_decoder(decode)
+    assert [obj.id for obj in vehicles()] == ["y0", "y1", "y2"]
+    assert len(bodies) == 1 and isinstance(bodies[0], bytes)
+
+
+def test_none_restores_the_default_decoder(restore_decoder):
+    def decode(content):
+        return json.loads(content)
+
+    universals.set_decoder(decode)
+    assert universals.decoder is decode
+    universals.set_decoder(None)
+    assert universals.decoder is not decode
+    assert universals.decoder(b'{"data": []}') == {"data": []}
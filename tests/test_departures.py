@@ -0,0 +1,97 @@
+from datetime import datetime
+
+from departures import DepartureBoard
+from servicetime import SERVICE_TIME_ZONE
+
+
+def linkage(kind, item):
+    return {"data": {"id": item, "type": kind} if item is not None else None}
+
+
+def row(kind, item, trip, stop, time, **attributes):
+    attributes.update(stop_sequence=1, departure_time=time)
+    return {"id": item, "type": kind, "attributes": attributes,
+            "relationships": {"trip": linkage("trip", trip), "stop": linkage("stop", stop),
+                              "route": linkage("route", "Red")}}
+
+
+INCLUDED = [{"id": trip, "type": "trip", "attributes": {"headsign": headsign}}
+            for trip, headsign in (("A", "Alewife"), ("B", "Braintree"), ("D", "Ashmont"))]
+INCLUDED += [{"id": stop, "type": "stop", "attributes": {},
+              "relationships": {"parent_station": linkage("stop", "place-x")}} for stop in ("s1", "s2")]
+
+SCHEDULES = {"data": [row("schedule", "sA", "A", "s1", "2026-10-17T23:55:00-04:00"),
+                      row("schedule", "sB", "B", "s1", "2026-10-18T00:20:00-04:00"),
+                      row("schedule", "sC", "C", "s2", "2026-10-17T23:40:00-04:00"),
+                      row("schedule", "sE", "E", "s2", "2026-10-18T01:30:00-04:00")],
+             "included": INCLUDED}
+
+PREDICTIONS = {"data": [row("prediction", "pA", "A", "s1", "2026-10-17T23:57:00-04:00"),
+                        row("prediction", "pB", "B", "s1", None, schedule_relationship="CANCELLED"),
+                        row("prediction", "pD", "D", "s2", "2026-10-18T00:05:00-04:00")],
+               "included": INCLUDED}
+
+
+def at(*args):
+    return datetime(*args, tzinfo=SERVICE_TIME_ZONE)
+
+
+def requests_to(stand_in, endpoint):
+    return [query for name, query in stand_in.requests if name == endpoint]
+
+
+def test_schedules_and_predictions_are_joined(stand_in):
+    stand_in.responses.update(schedules=SCHEDULES, predictions=PREDICTIONS)
+    board = DepartureBoard(["s1", "s2"])
+    upcoming = board.update(at(2026, 10, 17, 23, 50))
+
+    # C has departed and E is past the window
+    assert [departure.trip.id for departure in upcoming] == ["A", "D", "B"]
+    first, added, cancelled = upcoming
+    assert first.scheduled_time == "2026-10-17T23:55:00-04:00"
+    assert first.predicted_time == "2026-10-17T23:57:00-04:00"
+    assert first.departure_time == at(2026, 10, 17, 23, 57)
+    assert first.headsign == "Alewife" and first.route == "Red" and first.stop == "s1"
+    assert added.schedule is None and added.headsign == "Ashmont"
+    assert cancelled.cancelled and cancelled.departure_time == at(2026, 10, 18, 0, 20)
+
+    assert [departure.trip.id for departure in board.departures("s1")] == ["A", "B"]
+    assert [departure.trip.id for departure in board.departures("s2")] == ["D"]
+    assert [departure.trip.id for departure in board.departures("place-x")] == ["A", "D", "B"]
+
+
+def test_schedules_are_requested_for_the_service_date(stand_in):
+    stand_in.responses.update(schedules=SCHEDULES, predictions=PREDICTIONS)
+    DepartureBoard(["s1", "s2"]).update(at(2026, 10, 17, 23, 50))
+
+    query = requests_to(stand_in, "schedules")[0]
+    assert query["filter[stop]"] == "s1,s2" and query["include"] == "trip,stop"
+    assert query["filter[date]"] == "2026-10-17"
+    # times after midnight are hours past 24 of the service date
+    assert (query["filter[min_time]"], query["filter[max_time]"]) == ("23:49", "24:55")
+
+
+def test_after_midnight_belongs_to_the_previous_service_date(stand_in):
+    stand_in.responses.update(schedules={"data": []}, predictions={"data": []})
+    DepartureBoard(["s1"]).update(at(2026, 10, 18, 1, 10))
+
+    query = requests_to(stand_in, "schedules")[0]
+    assert query["filter[date]"] == "2026-10-17"
+    assert query["filter[min_time]"] == "25:09"
+
+
+def test_updates_reuse_the_schedules_and_drop_departed_rows(stand_in):
+    stand_in.responses.update(schedules=SCHEDULES, predictions=PREDICTIONS)
+    board = DepartureBoard(["s1", "s2"])
+    board.update(at(2026, 10, 17, 23, 50))
+    first = board.departures("s1")[1]
+
+    stand_in.responses["predictions"] = {"data": PREDICTIONS["data"][2:], "included": INCLUDED}
+    upcoming = board.update(at(2026, 10, 17, 23, 56))
+
+    # A lost its prediction and its scheduled time has passed; B is no longer cancelled
+    assert [departure.trip.id for departure in upcoming] == ["D", "B"]
+    assert board.departures("s1")[0] is first
+    assert not first.cancelled and first.prediction is None
+    assert len(requests_to(stand_in, "schedules")) == 1
+    assert len(requests_to(stand_in, "predictions")) == 2
@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+import diskcache
+import universals
+from diskcache import DiskCache
+from route import routes
+from urls import urls
+from vehicle import vehicles
+
+
+@pytest.fixture
+def disk(tmp_path):
+    """Stores responses in a database under the test's directory, and stops afterwards"""
+    yield lambda ttls=None: diskcache.enable(str(tmp_path / "responses.db"), ttls)
+    diskcache.disable()
+
+
+def test_responses_are_stored_and_marked_fresh(tmp_path):
+    cache = DiskCache(str(tmp_path / "responses.db"))
+    key = universals.cache_key(urls.route_url(), {})
+    assert cache.lookup(key, 60) is None
+
+    cache.store(key, b'{"data": []}', "Sat, 17 Oct 2026 08:00:00 GMT")
+    assert cache.load(key) == b'{"data": []}'
+    assert cache.lookup(key, 60) == ("Sat, 17 Oct 2026 08:00:00 GMT", True)
+    assert cache.lookup(key, 0) == ("Sat, 17 Oct 2026 08:00:00 GMT", False)
+
+    # another connection to the same file, as another process would open
+    assert DiskCache(cache.path).load(key) == b'{"data": []}'
+    cache.clear()
+    assert cache.lookup(key, 60) is None
+
+
+def test_only_static_endpoints_are_stored(tmp_path):
+    cache = DiskCache(str(tmp_path / "responses.db"))
+    assert cache.ttl(urls.route_url()) == diskcache.DAY
+    assert cache.ttl(urls.stop_by_id_url("place-sstat")) == diskcache.DAY
+    assert cache.ttl(urls.vehicle_url()) is None
+
+
+def test_fresh_response_is_served_without_a_request(stand_in, disk):
+    disk()
+    routes()
+    # a new process starts without the conditional cache
+    universals.conditional_cache.clear()
+    found = routes()
+
+    assert len(stand_in.requests) == 1
+    assert [obj.id for obj in found] == ["Red", "Orange"]
+
+
+def test_stale_response_is_revalidated(stand_in, disk):
+    cache = disk({"routes/": 0})
+    routes()
+    universals.conditional_cache.clear()
+    found = routes()
+
+    assert len(stand_in.requests) == 2
+    assert stand_in.not_modified == 1
+    assert [obj.id for obj in found] == ["Red", "Orange"]
+    key = universals.cache_key(urls.route_url(), universals.set_params())
+    assert cache.lookup(key, 60)[1]
+
+
+def test_other_endpoints_and_the_api_key_are_not_stored(stand_in, disk):
+    cache = disk()
+    routes()
+    vehicles()
+
+    rows = sqlite3.connect(cache.path).execute("SELECT key FROM responses").fetchall()
+    assert len(rows) == 1
+    assert "routes" in rows[0][0] and "stand-in-key" not in rows[0][0]
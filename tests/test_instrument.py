@@ -0,0 +1,80 @@
+import pytest
+
+import instrument
+import ratelimit
+import universals
+from instrument import Histogram, endpoint
+from route import routes
+from urls import urls
+from vehicle import vehicles
+
+
+@pytest.fixture
+def events():
+    """Returns the list every event is appended to while the test runs, with metrics collected"""
+    seen = []
+    instrument.enable()
+    instrument.subscribe(seen.append)
+    yield seen
+    instrument.unsubscribe(seen.append)
+    instrument.disable()
+    instrument.metrics = None
+
+
+def test_paths_are_grouped_by_endpoint():
+    assert endpoint(urls.vehicle_url()) == "vehicles/"
+    assert endpoint(urls.stop_by_id_url("place-sstat")) == "stops/{id}"
+    assert endpoint(urls.stop_by_id_url("place-sstat") + "?api_key=x") == "stops/{id}"
+
+
+def test_histograms_are_cumulative():
+    histogram = Histogram((1, 10))
+    for value in (0.5, 5, 7, 100):
+        histogram.observe(value)
+    assert histogram.snapshot() == {"buckets": {1: 1, 10: 3}, "sum": 112.5, "count": 4}
+
+
+def test_requests_report_events_and_metrics(stand_in, events):
+    vehicles()
+
+    assert [event.name for event in events] == ["request", "response", "parse"]
+    assert all(event.endpoint == "vehicles/" for event in events)
+    response = events[1]
+    assert response.status == 200 and response.size > 0 and response.seconds >= 0
+    assert str(response).startswith("response vehicles/ status=200")
+
+    metrics = instrument.snapshot()["vehicles/"]
+    assert metrics["requests"] == 1 and metrics["responses"] == {200: 1}
+    assert metrics["bytes"] == response.size
+    assert metrics["request_seconds"]["count"] == 1 and metrics["parse_seconds"]["count"] == 1
+
+
+def test_cache_hits_and_retries_are_reported(stand_in, events, monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.01)
+    routes()
+    routes()
+    stand_in.limited = 1
+    universals.get(urls.base_url + "limited/", {})
+
+    assert [event.source for event in events if event.name == "cache"] == ["not_modified"]
+    assert [event.endpoint for event in events if event.name == "retry"] == ["limited/"]
+    snapshot = instrument.snapshot()
+    assert snapshot["routes/"]["cache_hits"] == {"not_modified": 1}
+    assert snapshot["limited/"]["retries"] == 1 and snapshot["limited/"]["responses"] == {429: 1, 200: 1}
+
+
+def test_metrics_are_exported_for_prometheus(stand_in, events):
+    vehicles()
+    text = instrument.prometheus()
+
+    assert 'mbta_requests_total{endpoint="vehicles/"} 1' in text
+    assert 'mbta_responses_total{endpoint="vehicles/",status="200"} 1' in text
+    assert 'mbta_request_seconds_bucket{endpoint="vehicles/",le="+Inf"} 1' in text
+    assert "# TYPE mbta_response_size_bytes histogram" in text
+
+
+def test_nothing_is_reported_once_disabled(stand_in, events):
+    instrument.disable()
+    vehicles()
+    assert events == []
+    assert instrument.snapshot() == {}
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+import memcache
+import universals
+from memcache import MemoryCache
+from stop import stop_by_id
+from urls import urls
+from vehicle import vehicles
+
+
+@pytest.fixture
+def memory():
+    """Caches responses in memory, and stops afterwards"""
+    yield memcache.enable
+    memcache.disable()
+
+
+def test_entries_expire_after_their_ttl():
+    cache = MemoryCache()
+    cache.put("fresh", {"data": 1}, 60)
+    cache.put("stale", {"data": 2}, 0.05)
+    time.sleep(0.1)
+
+    assert cache.get("fresh") == {"data": 1}
+    assert cache.get("stale") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "expirations": 1, "entries": 1}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = MemoryCache(max_entries=2)
+    cache.put("a", 1, 60)
+    cache.put("b", 2, 60)
+    cache.get("a")
+    cache.put("c", 3, 60)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1 and len(cache) == 2
+
+
+def test_ttls_are_per_endpoint():
+    cache = MemoryCache(ttls={"vehicles/": 5, "stops/": 60})
+    assert cache.ttl(urls.vehicle_url()) == 5
+    assert cache.ttl(urls.vehicle_by_id_url("y1")) == 5
+    assert cache.ttl(urls.stop_by_id_url("place-sstat")) == 60
+    assert cache.ttl(urls.route_url()) is None
+
+
+def test_responses_are_served_from_memory_within_the_ttl(stand_in, memory):
+    cache = memory()
+    first = vehicles()
+    second = vehicles()
+
+    assert len(stand_in.requests) == 1
+    assert [obj.id for obj in second] == ["y0", "y1", "y2"]
+    assert all(a is b for a, b in zip(first, second))
+    assert stop_by_id("place-sstat") is stop_by_id("place-sstat")
+    assert len(stand_in.requests) == 2
+    assert cache.stats()["hits"] == 2
+
+
+def test_expired_and_uncached_endpoints_are_requested(stand_in, memory):
+    memory(ttls={"vehicles/": 0.05})
+    vehicles()
+    time.sleep(0.1)
+    vehicles()
+    universals.get(urls.base_url + "limited/", {})
+    universals.get(urls.base_url + "limited/", {})
+
+    assert len(stand_in.requests) == 4
+
+
+def test_disabled_cache_is_not_consulted(stand_in):
+    memcache.disable()
+    vehicles()
+    vehicles()
+    assert len(stand_in.requests) == 2
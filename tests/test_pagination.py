@@ -0,0 +1,31 @@
+import route  # registers the class included routes are built into
+from route import ROUTE
+from vehicle import VEHICLE, vehicles
+
+
+def test_every_page_is_followed(stand_in):
+    found = list(vehicles(page_limit=1, paginate=True, json=True))
+
+    assert [resource["id"] for resource in found] == ["y0", "y1", "y2"]
+    assert len(stand_in.requests) == 3
+
+
+def test_pages_are_only_requested_as_they_are_consumed(stand_in):
+    pages = vehicles(page_limit=1, paginate=True)
+    assert stand_in.requests == []
+    next(pages)
+    assert len(stand_in.requests) <= 2
+
+
+def test_included_resources_are_linked_on_every_page(stand_in):
+    found = list(vehicles(page_limit=2, include="route", paginate=True))
+
+    assert [obj.id for obj in found] == ["y0", "y1", "y2"]
+    assert all(isinstance(obj, VEHICLE) and isinstance(obj.route, ROUTE) for obj in found)
+    assert found[0].route is found[1].route
+    assert found[2].route.id == "Red"
+
+
+def test_relationships_stay_ids_without_include(stand_in):
+    found = list(vehicles(page_limit=2, paginate=True))
+    assert [getattr(obj.route, "id", obj.route) for obj in found] == ["Red"] * 3
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import ratelimit
+import universals
+from errors import TooManyRequestsError
+from ratelimit import RateLimiter
+from urls import urls
+
+
+def headers(remaining, seconds):
+    return {"x-ratelimit-remaining": str(remaining), "x-ratelimit-reset": str(time.time() + seconds)}
+
+
+def test_unlimited_until_headers_are_seen():
+    limiter = RateLimiter()
+    assert all(limiter.delay() == 0 for _ in range(1000))
+
+
+def test_remaining_requests_are_spread_over_the_window():
+    limiter = RateLimiter()
+    limiter.update(headers(100, 60))
+    delays = [limiter.delay() for _ in range(10)]
+
+    assert delays[:ratelimit.BURST] == [0] * ratelimit.BURST
+    spacing = 60 / 100
+    for previous, delay in zip(delays[ratelimit.BURST:], delays[ratelimit.BURST + 1:]):
+        assert delay - previous == pytest.approx(spacing, rel=0.05)
+
+
+def test_exhausted_budget_waits_for_the_reset():
+    limiter = RateLimiter()
+    limiter.update(headers(0, 5))
+    assert limiter.delay() == pytest.approx(5, abs=0.1)
+
+
+def test_backoff_waits_at_least_until_the_reset():
+    assert ratelimit.backoff(0, headers(10, 3)) >= 2.9
+    assert 0 <= ratelimit.backoff(10) <= ratelimit.BACKOFF_CAP
+
+
+def test_rate_limited_requests_are_retried(stand_in, monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.01)
+    stand_in.limited = 2
+
+    json_response = universals.get(urls.base_url + "limited/", {})
+    assert len(json_response["data"]) == 3
+    assert len(stand_in.requests) == 3
+
+
+def test_retries_stop_at_the_deadline(stand_in, monkeypatch):
+    monkeypatch.setattr(ratelimit, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(ratelimit, "RETRY_DEADLINE", 0.1)
+    stand_in.limited = 1000
+
+    with pytest.raises(TooManyRequestsError):
+        universals.get(urls.base_url + "limited/", {})
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import universals
+from errors import NotFoundError
+from urls import urls
+
+
+def test_concurrent_identical_requests_are_sent_once(stand_in):
+    stand_in.delay = 0.2
+    with ThreadPoolExecutor(20) as pool:
+        results = list(pool.map(lambda _: universals.get(urls.vehicle_url(), {}), range(20)))
+
+    assert len(stand_in.requests) == 1
+    assert all(result is results[0] for result in results)
+    assert not universals.in_flight
+
+
+def test_requests_with_other_params_are_not_shared(stand_in):
+    stand_in.delay = 0.1
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda i: universals.get(urls.vehicle_url(), {"filter[label]": str(i % 2)}), range(4)))
+
+    assert len(stand_in.requests) == 2
+
+
+def test_error_is_shared_by_every_waiting_caller(stand_in):
+    stand_in.delay = 0.2
+
+    def call(_):
+        with pytest.raises(NotFoundError):
+            universals.get(urls.stop_by_id_url("missing"), {})
+
+    with ThreadPoolExecutor(10) as pool:
+        list(pool.map(call, range(10)))
+
+    assert len(stand_in.requests) == 1
+    assert not universals.in_flight
+
+
+def test_waiters_repeat_the_request_when_the_first_caller_is_interrupted(stand_in):
+    key = universals.cache_key(urls.vehicle_url(), {})
+    future = universals.in_flight[key] = universals.Future()
+    with ThreadPoolExecutor(1) as pool:
+        waiter = pool.submit(universals.get, urls.vehicle_url(), {})
+        time.sleep(0.1)
+        assert not waiter.done()
+        # the first caller is interrupted: its future is cancelled and removed
+        del universals.in_flight[key]
+        future.cancel()
+        assert len(waiter.result(timeout=5)["data"]) == 3
+
+    assert len(stand_in.requests) == 1
+
+
+def test_async_identical_requests_are_sent_once(stand_in):
+    pytest.importorskip("httpx")
+    import aio
+
+    async def main():
+        stand_in.delay = 0.2
+        results = await asyncio.gather(*(aio.get(urls.vehicle_url(), {}) for _ in range(20)))
+        await aio.aclose()
+        return results
+
+    results = asyncio.run(main())
+    assert len(stand_in.requests) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_async_cancelled_caller_leaves_the_request_to_the_others(stand_in):
+    pytest.importorskip("httpx")
+    import aio
+
+    async def main():
+        stand_in.delay = 0.3
+        first = asyncio.ensure_future(aio.get(urls.vehicle_url(), {}))
+        second = asyncio.ensure_future(aio.get(urls.vehicle_url(), {}))
+        await asyncio.sleep(0.1)
+        first.cancel()
+        result = await second
+        await aio.aclose()
+        return first, result
+
+    first, result = asyncio.run(main())
+    assert first.cancelled()
+    assert len(result["data"]) == 3
+    assert len(stand_in.requests) == 1
+
+
+def test_async_request_is_cancelled_once_every_caller_is(stand_in):
+    pytest.importorskip("httpx")
+    import aio
+
+    async def main():
+        stand_in.delay = 0.3
+        callers = [asyncio.ensure_future(aio.get(urls.vehicle_url(), {})) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        entry = aio._state["in_flight"][universals.cache_key(urls.vehicle_url(), {})]
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        task_cancelled = entry[0].cancelled()
+        await aio.aclose()
+        return task_cancelled
+
+    assert asyncio.run(main())
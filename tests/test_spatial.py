@@ -0,0 +1,76 @@
+import random
+import time
+from math import cos, radians, sqrt
+from types import SimpleNamespace
+
+import pytest
+
+from spatial import METERS_PER_DEGREE, SpatialIndex
+
+
+def points(count, seed=7):
+    rng = random.Random(seed)
+    objects = [SimpleNamespace(id=str(i), latitude=42.2 + rng.random() * 0.3, longitude=-71.3 + rng.random() * 0.4)
+               for i in range(count)]
+    objects.append(SimpleNamespace(id="nowhere", latitude=None, longitude=None))
+    return objects
+
+
+def brute_force(index, objects, lat, lon):
+    """Returns (meters, id) for every located object, nearest first, on the plane of the index"""
+    x_scale = METERS_PER_DEGREE * cos(radians(index.reference_latitude))
+    found = []
+    for obj in objects:
+        if obj.latitude is None:
+            continue
+        d = sqrt(((obj.longitude - lon) * x_scale) ** 2 + ((obj.latitude - lat) * METERS_PER_DEGREE) ** 2)
+        found.append((d, obj.id))
+    return sorted(found)
+
+
+QUERIES = [(42.35, -71.06), (42.2, -71.3), (42.7, -71.1), (43.5, -70.0), (45.0, -71.0), (0.0, 0.0), (-42.0, 100.0)]
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+def test_nearest_matches_brute_force(lat, lon):
+    objects = points(500)
+    index = SpatialIndex(objects)
+    expected = brute_force(index, objects, lat, lon)
+
+    for k in (1, 5, 40):
+        found = index.nearest(lat, lon, k, distances=True)
+        assert [d for d, _ in found] == pytest.approx([d for d, _ in expected[:k]])
+
+
+@pytest.mark.parametrize("lat, lon", QUERIES)
+def test_within_matches_brute_force(lat, lon):
+    objects = points(500)
+    index = SpatialIndex(objects)
+    expected = brute_force(index, objects, lat, lon)
+
+    for radius in (100, 1000, 5000, 100_000):
+        found = index.within(lat, lon, radius, distances=True)
+        assert sorted(obj.id for _, obj in found) == sorted(item for d, item in expected if d <= radius)
+        assert [d for d, _ in found] == sorted(d for d, _ in found)
+
+
+def test_far_queries_only_visit_the_extent_of_the_data():
+    index = SpatialIndex(points(500))
+    started = time.perf_counter()
+    assert len(index.nearest(0, 0, 2)) == 2
+    assert len(index.nearest(-80, 179, 2)) == 2
+    assert index.within(0, 0, 1_000_000) == []
+    assert len(index.within(42.35, -71.06, 10_000_000)) == 500
+    assert time.perf_counter() - started < 1
+
+
+def test_objects_without_coordinates_are_left_out():
+    index = SpatialIndex(points(10))
+    assert len(index) == 10
+    assert len(index.nearest(42.35, -71.06, 100)) == 10
+
+
+def test_empty_index():
+    index = SpatialIndex([])
+    assert index.nearest(42.35, -71.06) == []
+    assert index.within(42.35, -71.06, 1000) == []
@@ -0,0 +1,51 @@
+from stream import Stream, read_events
+from trip import TRIP
+from vehicle import VEHICLE
+
+
+def test_events_are_split_on_blank_lines():
+    lines = ["event: reset", "data: []", "", ": keep-alive", "", "event: add", "data: {\"id\": 1}", ""]
+    assert list(read_events(lines)) == [("reset", "[]"), ("add", "{\"id\": 1}")]
+
+
+def test_data_lines_are_joined_and_the_leading_space_is_optional():
+    lines = ["event:update", "data: {\"id\":", "data:1}", ""]
+    assert list(read_events(lines)) == [("update", "{\"id\":\n1}")]
+
+
+def test_events_without_data_or_an_unfinished_event_are_skipped():
+    lines = ["event: reset", "", "event: add", "data: {}"]
+    assert list(read_events(lines)) == []
+
+
+def vehicle(item, label):
+    return {"id": item, "type": "vehicle", "attributes": {"label": label}}
+
+
+def test_events_keep_the_store_current():
+    stream = Stream("vehicles", {}, VEHICLE)
+    seen = []
+    stream.subscribe(lambda event, objects: seen.append((event, [obj.id for obj in objects])))
+
+    stream.apply("reset", [vehicle("y1", "1"), vehicle("y2", "2")])
+    stream.apply("update", vehicle("y1", "10"))
+    stream.apply("add", vehicle("y3", "3"))
+    stream.apply("remove", {"id": "y2", "type": "vehicle"})
+
+    assert sorted(stream.store) == ["y1", "y3"]
+    assert stream.store["y1"].label == "10"
+    assert seen == [("reset", ["y1", "y2"]), ("update", ["y1"]), ("add", ["y3"]), ("remove", ["y2"])]
+
+
+def test_included_resources_are_kept_apart():
+    stream = Stream("vehicles", {}, VEHICLE)
+    stream.apply("reset", [vehicle("y1", "1"), {"id": "t1", "type": "trip", "attributes": {"headsign": "A"}}])
+    stream.apply("update", {"id": "t1", "type": "trip", "attributes": {"headsign": "B"}})
+
+    assert list(stream.store) == ["y1"]
+    assert isinstance(stream.included[("trip", "t1")], TRIP)
+    assert stream.included[("trip", "t1")].headsign == "B"
+
+    stream.apply("remove", {"id": "t1", "type": "trip"})
+    assert stream.included == {}
+    assert list(stream.store) == ["y1"]
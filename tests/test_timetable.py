@@ -0,0 +1,88 @@
+from datetime import date, datetime, timezone
+
+from servicetime import SERVICE_TIME_ZONE, service_date
+from timetable import ScheduleIndex, epoch
+
+
+def schedule(item, trip, stop, sequence, time):
+    return {"id": item, "type": "schedule",
+            "attributes": {"stop_sequence": sequence, "departure_time": time},
+            "relationships": {"trip": {"data": {"id": trip, "type": "trip"}},
+                              "stop": {"data": {"id": stop, "type": "stop"}}}}
+
+
+# trips of two service dates, listed out of order. Times after midnight carry the calendar date they fall on
+DAYS = {
+    "2026-10-17": [schedule("a2", "A", "s2", 2, "2026-10-17T23:58:00-04:00"),
+                   schedule("a1", "A", "s1", 1, "2026-10-17T23:50:00-04:00"),
+                   schedule("b1", "B", "s1", 1, "2026-10-18T00:35:00-04:00"),
+                   schedule("b2", "B", "s2", 2, "2026-10-18T00:43:00-04:00"),
+                   schedule("c1", "C", "s1", 1, "2026-10-18T00:05:00-04:00"),
+                   schedule("c9", "C", "s9", 9, None)],
+    "2026-10-18": [schedule("d1", "D", "s1", 1, "2026-10-18T05:10:00-04:00"),
+                   schedule("d2", "D", "s2", 2, "2026-10-18T05:18:00-04:00")],
+}
+
+
+def at(*args):
+    return datetime(*args, tzinfo=SERVICE_TIME_ZONE)
+
+
+def loaded(stand_in, *dates):
+    stand_in.responses["schedules"] = lambda query: {"data": DAYS.get(query["filter[date]"], [])}
+    index = ScheduleIndex(route="Red")
+    index.refresh(list(dates))
+    return index
+
+
+def test_departures_run_past_midnight_in_time_order(stand_in):
+    index = loaded(stand_in, "2026-10-17")
+
+    found = index.departures("s1", at(2026, 10, 17, 23, 45))
+    assert [row.id for row in found] == ["a1", "c1", "b1"]
+    assert [row.id for row in index.departures("s1", at(2026, 10, 18, 0, 0))] == ["c1", "b1"]
+    assert index.next_departure("s1", at(2026, 10, 18, 0, 6)).id == "b1"
+    assert index.next_departure("s1", at(2026, 10, 18, 1, 0)) is None
+
+
+def test_departures_merge_stops_and_dates_with_an_end_and_count(stand_in):
+    index = loaded(stand_in, "2026-10-17", "2026-10-18")
+    assert index.dates == ["2026-10-17", "2026-10-18"]
+
+    found = index.departures("s1,s2", at(2026, 10, 17, 23, 55))
+    assert [row.id for row in found] == ["a2", "c1", "b1", "b2", "d1", "d2"]
+    assert [row.id for row in index.departures(["s1", "s2"], at(2026, 10, 17, 23, 55), count=2)] == ["a2", "c1"]
+    assert [row.id for row in index.departures("s2", at(2026, 10, 17, 23, 55), end=at(2026, 10, 18, 0, 43))] \
+        == ["a2"]
+
+
+def test_trips_are_ordered_by_stop_sequence(stand_in):
+    index = loaded(stand_in, "2026-10-17", "2026-10-18")
+
+    assert [row.id for row in index.trip("A")] == ["a1", "a2"]
+    assert [row.id for row in index.trip("C")] == ["c1", "c9"]
+    assert index.at("B", "s2").id == "b2"
+    assert index.trip("D", date="2026-10-17") == []
+    assert index.at("D", "s1").id == "d1"
+    assert index.trip("Z") == [] and index.at("Z", "s1") is None
+
+
+def test_dates_are_loaded_once_per_request_and_dropped(stand_in):
+    index = loaded(stand_in, "2026-10-17", "2026-10-18")
+    assert [query["filter[date]"] for _, query in stand_in.requests] == ["2026-10-17", "2026-10-18"]
+    assert all(query["filter[route]"] == "Red" for _, query in stand_in.requests)
+
+    index.drop(date(2026, 10, 18))
+    assert index.dates == ["2026-10-18"]
+    assert [row.id for row in index.departures("s1", at(2026, 10, 17, 23, 0))] == ["d1"]
+
+
+def test_service_date_starts_at_three_in_the_morning():
+    assert service_date(at(2026, 10, 18, 2, 59)) == date(2026, 10, 17)
+    assert service_date(at(2026, 10, 18, 3, 0)) == date(2026, 10, 18)
+    assert service_date(datetime(2026, 10, 18, 6, 0, tzinfo=timezone.utc)) == date(2026, 10, 17)
+
+
+def test_epoch_takes_naive_times_as_service_time():
+    assert epoch(datetime(2026, 10, 18, 0, 5)) == at(2026, 10, 18, 0, 5).timestamp()
+    assert epoch(12.5) == 12.5
@@ -0,0 +1,66 @@
+from tracker import VehicleTracker
+
+
+def vehicle(item, updated_at, route="Red", stop=None, label=None):
+    relationships = {"route": {"data": {"id": route, "type": "route"}}}
+    if stop is not None:
+        relationships["stop"] = {"data": {"id": stop, "type": "stop"}}
+    return {"id": item, "type": "vehicle", "attributes": {"updated_at": updated_at, "label": label or item},
+            "relationships": relationships}
+
+
+def test_snapshots_are_diffed_by_id_and_updated_at():
+    tracker = VehicleTracker()
+    first = tracker.apply([vehicle("y1", "08:00"), vehicle("y2", "08:00")])
+    assert [obj.id for obj in first.added] == ["y1", "y2"]
+    y1 = tracker.vehicle("y1")
+
+    delta = tracker.apply([vehicle("y1", "08:01", label="moved"), vehicle("y2", "08:00"), vehicle("y3", "08:01")])
+    assert [obj.id for obj in delta.added] == ["y3"]
+    assert delta.updated == [y1]
+    assert delta.removed == []
+    assert tracker.vehicle("y1") is y1 and y1.label == "moved"
+
+    delta = tracker.apply([vehicle("y3", "08:01")])
+    assert [obj.id for obj in delta.removed] == ["y1", "y2"]
+    assert not delta.added and not delta.updated
+    assert len(tracker) == 1
+
+
+def test_unchanged_snapshot_reports_nothing():
+    tracker = VehicleTracker()
+    calls = []
+    tracker.subscribe(calls.append)
+    tracker.apply([vehicle("y1", "08:00")])
+    delta = tracker.apply([vehicle("y1", "08:00")])
+
+    assert not delta
+    assert str(delta) == "+0 ~0 -0"
+    assert len(calls) == 1
+
+
+def test_indexes_follow_changes():
+    tracker = VehicleTracker()
+    tracker.apply([vehicle("y1", "08:00", stop="70061"), vehicle("y2", "08:00", route="Orange")])
+    assert [obj.id for obj in tracker.on_route("Red")] == ["y1"]
+    assert [obj.id for obj in tracker.at_stop("70061")] == ["y1"]
+
+    # y1 changes route and no longer reports a stop
+    tracker.apply([vehicle("y1", "08:01", route="Orange"), vehicle("y2", "08:00", route="Orange")])
+    assert tracker.on_route("Red") == []
+    assert sorted(obj.id for obj in tracker.on_route("Orange")) == ["y1", "y2"]
+    assert tracker.at_stop("70061") == []
+    assert getattr(tracker.vehicle("y1"), "stop", None) is None
+    assert "Red" not in tracker.indexes["route"] and "70061" not in tracker.indexes["stop"]
+
+    tracker.apply([])
+    assert tracker.indexes == {"route": {}, "trip": {}, "stop": {}}
+
+
+def test_update_polls_the_api(stand_in):
+    tracker = VehicleTracker(route="Red")
+    delta = tracker.update()
+
+    assert [obj.id for obj in delta.added] == ["y0", "y1", "y2"]
+    assert stand_in.requests[0][1]["filter[route]"] == "Red"
+    assert len(tracker.on_route("Red")) == 3
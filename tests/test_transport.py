@@ -0,0 +1,36 @@
+import pytest
+
+import urls
+from vehicle import vehicles
+
+
+@pytest.fixture
+def httpx_client():
+    """Sends requests through an httpx client, as configure(http2=True) does, but over HTTP/1.1"""
+    httpx = pytest.importorskip("httpx")
+    urls.configure()
+    urls.transport["http2"] = httpx.Client(headers=urls.transport["headers"])
+    yield urls.transport["http2"]
+    urls.configure()
+
+
+def test_configure_sets_the_session_headers():
+    urls.configure(gzip=False, keep_alive=False)
+    try:
+        assert urls.session.headers["Accept-Encoding"] == "identity"
+        assert urls.session.headers["Connection"] == "close"
+    finally:
+        urls.configure()
+    assert urls.session.headers["Accept-Encoding"] == "gzip, deflate"
+
+
+def test_requests_use_the_httpx_client_when_configured(stand_in, httpx_client):
+    assert urls.client() is httpx_client
+    assert [obj.id for obj in vehicles()] == ["y0", "y1", "y2"]
+
+
+def test_api_key_is_sent_with_every_page_over_httpx(stand_in, httpx_client):
+    found = list(vehicles(page_limit=1, paginate=True, json=True))
+
+    assert [resource["id"] for resource in found] == ["y0", "y1", "y2"]
+    assert [query.get("api_key") for _, query in stand_in.requests] == ["stand-in-key"] * 3